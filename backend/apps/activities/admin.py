@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Activity, ActivityFile
+from .models import Activity, ActivityFile, ActivityDailyStats
 
 
 class ActivityFileInline(admin.TabularInline):
@@ -41,3 +41,18 @@ class ActivityFileAdmin(admin.ModelAdmin):
     list_filter = ('uploaded_at',)
     search_fields = ('filename', 'activity__code', 'activity__title')
     readonly_fields = ('uploaded_at',)
+
+
+@admin.register(ActivityDailyStats)
+class ActivityDailyStatsAdmin(admin.ModelAdmin):
+    """Read-only admin for the daily statistics rollups."""
+
+    list_display = ('activity', 'date', 'events_total', 'enrollments_total', 'enrollments_attended', 'meetings_total', 'is_dirty')
+    list_filter = ('is_dirty', 'activity')
+    date_hierarchy = 'date'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
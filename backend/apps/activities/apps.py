@@ -5,3 +5,7 @@ class ActivitiesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.activities'
     verbose_name = 'Activities'
+
+    def ready(self):
+        """Import signals when app is ready."""
+        import apps.activities.signals  # noqa
@@ -0,0 +1,22 @@
+from django.db import migrations
+
+from apps.activities.search import install_search_index, uninstall_search_index
+
+
+def create_search_index(apps, schema_editor):
+    install_search_index(schema_editor, apps.get_model('activities', 'Activity'))
+
+
+def drop_search_index(apps, schema_editor):
+    uninstall_search_index(schema_editor, apps.get_model('activities', 'Activity'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("activities", "0003_alter_activityfile_file"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activities', '0004_activity_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatsRollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('value', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'stats_rollup_watermarks',
+            },
+        ),
+        migrations.CreateModel(
+            name='ActivityDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('events_total', models.PositiveIntegerField(default=0)),
+                ('events_scheduled', models.PositiveIntegerField(default=0)),
+                ('events_completed', models.PositiveIntegerField(default=0)),
+                ('events_cancelled', models.PositiveIntegerField(default=0)),
+                ('enrollments_total', models.PositiveIntegerField(default=0)),
+                ('enrollments_enrolled', models.PositiveIntegerField(default=0)),
+                ('enrollments_cancelled', models.PositiveIntegerField(default=0)),
+                ('enrollments_attended', models.PositiveIntegerField(default=0)),
+                ('enrollments_no_show', models.PositiveIntegerField(default=0)),
+                ('meetings_total', models.PositiveIntegerField(default=0)),
+                ('meeting_participants_total', models.PositiveIntegerField(default=0)),
+                ('max_meeting_size', models.PositiveIntegerField(default=0)),
+                ('is_dirty', models.BooleanField(default=False, help_text='Set when source rows were deleted; recomputed on the next refresh')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('activity', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='activities.activity')),
+            ],
+            options={
+                'verbose_name': 'Activity Daily Stats',
+                'verbose_name_plural': 'Activity Daily Stats',
+                'db_table': 'activity_daily_stats',
+                'ordering': ['date'],
+                'indexes': [models.Index(fields=['is_dirty'], name='activity_da_is_dirt_8ae6cd_idx')],
+                'unique_together': {('activity', 'date')},
+            },
+        ),
+    ]
@@ -94,3 +94,62 @@ class ActivityFile(models.Model):
         if not self.filename and self.file:
             self.filename = self.file.name
         super().save(*args, **kwargs)
+
+
+class ActivityDailyStats(models.Model):
+    """
+    Daily per-activity counts rolled up from events, enrollments and meetings.
+
+    Rows are keyed by the UTC date of the events' start and recomputed by
+    the `refresh_activity_rollups` task for the days whose rows changed.
+    """
+
+    activity = models.ForeignKey(
+        Activity,
+        on_delete=models.CASCADE,
+        related_name='daily_stats'
+    )
+    date = models.DateField()
+    events_total = models.PositiveIntegerField(default=0)
+    events_scheduled = models.PositiveIntegerField(default=0)
+    events_completed = models.PositiveIntegerField(default=0)
+    events_cancelled = models.PositiveIntegerField(default=0)
+    enrollments_total = models.PositiveIntegerField(default=0)
+    enrollments_enrolled = models.PositiveIntegerField(default=0)
+    enrollments_cancelled = models.PositiveIntegerField(default=0)
+    enrollments_attended = models.PositiveIntegerField(default=0)
+    enrollments_no_show = models.PositiveIntegerField(default=0)
+    meetings_total = models.PositiveIntegerField(default=0)
+    meeting_participants_total = models.PositiveIntegerField(default=0)
+    max_meeting_size = models.PositiveIntegerField(default=0)
+    is_dirty = models.BooleanField(
+        default=False,
+        help_text="Set when source rows were deleted; recomputed on the next refresh"
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'activity_daily_stats'
+        verbose_name = 'Activity Daily Stats'
+        verbose_name_plural = 'Activity Daily Stats'
+        ordering = ['date']
+        unique_together = [['activity', 'date']]
+        indexes = [
+            models.Index(fields=['is_dirty']),
+        ]
+
+    def __str__(self):
+        return f"{self.activity_id} - {self.date}"
+
+
+class StatsRollupWatermark(models.Model):
+    """Point in time up to which a rollup has processed changed rows."""
+
+    name = models.CharField(max_length=100, unique=True)
+    value = models.DateTimeField()
+
+    class Meta:
+        db_table = 'stats_rollup_watermarks'
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
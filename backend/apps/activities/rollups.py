@@ -0,0 +1,425 @@
+"""
+Incremental daily rollups of activity statistics.
+
+`ActivityDailyStats` holds one row per activity and UTC day (of the events'
+start) with event, enrollment, attendance and meeting counts. The
+`refresh_activity_rollups` task recomputes only the days touched by rows
+whose `updated_at` moved past the stored watermark, plus the days flagged
+dirty by deletions (see signals.py). Statistics endpoints then sum a few
+small rows instead of aggregating every enrollment of the activity.
+
+`summarize_activity` and `dashboard_rows` stay exact between refreshes:
+the days changed since the watermark or flagged dirty are computed live
+and replace their rollup rows, and before the first refresh every day is.
+
+Days are computed from the live tables and the archive tables together,
+so archiving events (apps/events/archive.py) leaves the rollups unchanged.
+"""
+import logging
+from collections import defaultdict
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import ActivityDailyStats, StatsRollupWatermark
+
+logger = logging.getLogger(__name__)
+
+WATERMARK_NAME = 'activity_daily_stats'
+DASHBOARD_VERSION_KEY = 'activity_dashboard:version'
+DASHBOARD_CACHE_TIMEOUT = getattr(settings, 'ACTIVITY_DASHBOARD_CACHE_TIMEOUT', 60 * 60)
+# Rows committed slightly after the previous run started may carry an older
+# updated_at; re-scanning this window makes sure they are not missed.
+WATERMARK_OVERLAP = timedelta(seconds=getattr(settings, 'STATS_ROLLUP_OVERLAP_SECONDS', 120))
+
+ROLLUP_FIELDS = (
+    'events_total',
+    'events_scheduled',
+    'events_completed',
+    'events_cancelled',
+    'enrollments_total',
+    'enrollments_enrolled',
+    'enrollments_cancelled',
+    'enrollments_attended',
+    'enrollments_no_show',
+    'meetings_total',
+    'meeting_participants_total',
+)
+
+
+def utc_date(field):
+    return TruncDate(field, tzinfo=dt_timezone.utc)
+
+
+def get_watermark():
+    """Return the current watermark, or None before the first run."""
+    return StatsRollupWatermark.objects.filter(name=WATERMARK_NAME).values_list('value', flat=True).first()
+
+
+def changed_days(since, activity_ids=None):
+    """
+    Return the set of (activity_id, date) touched by rows updated since `since`,
+    optionally only those of the given activities.
+
+    One query per source table, each served by its `updated_at` index.
+    """
+    from apps.events.models import Event, Enrollment
+    from apps.meetings.models import Meeting, MeetingParticipant
+
+    sources = [
+        (Event.objects.filter(updated_at__gte=since), 'activity_id', 'start_datetime'),
+        (Enrollment.objects.filter(updated_at__gte=since), 'event__activity_id', 'event__start_datetime'),
+        (Meeting.objects.filter(created_at__gte=since), 'event__activity_id', 'event__start_datetime'),
+        (MeetingParticipant.objects.filter(updated_at__gte=since),
+         'meeting__event__activity_id', 'meeting__event__start_datetime'),
+    ]
+
+    days = set()
+    for queryset, activity_field, start_field in sources:
+        if activity_ids is not None:
+            queryset = queryset.filter(**{f'{activity_field}__in': activity_ids})
+        days.update(queryset.values_list(activity_field, utc_date(start_field)).order_by().distinct())
+    return days
+
+
+def days_filter(days):
+    """Return a Q matching the rollup rows of the given (activity_id, date) pairs."""
+    condition = Q()
+    for activity_id, day in days:
+        condition |= Q(activity_id=activity_id, date=day)
+    return condition
+
+
+def pending_days(watermark, activity_ids):
+    """
+    Return the days of the given activities whose rollup rows are stale:
+    changed since `watermark` or flagged dirty.
+    """
+    days = changed_days(watermark - WATERMARK_OVERLAP, activity_ids=activity_ids)
+    days.update(
+        ActivityDailyStats.objects
+        .filter(activity_id__in=activity_ids, is_dirty=True)
+        .values_list('activity_id', 'date')
+    )
+    return days
+
+
+def mark_days_dirty(days):
+    """Flag the rollup rows of the given (activity_id, date) pairs with one UPDATE."""
+    condition = days_filter(days)
+    if not condition:
+        return 0
+    return ActivityDailyStats.objects.filter(condition).update(is_dirty=True)
+
+
+def event_days(queryset, event_field='event'):
+    """
+    Return the set of (activity_id, date) of the events (live or archived)
+    that the rows of `queryset` point to through `event_field`.
+    """
+    days = queryset.values_list(f'{event_field}__activity_id', utc_date(f'{event_field}__start_datetime'))
+    return set(days.order_by().distinct())
+
+
+def mark_enrollment_days_dirty(enrollments):
+    """
+    Flag the days of the events of an Enrollment queryset, before deleting
+    it: one query for the days and one UPDATE, however many rows.
+    """
+    return mark_days_dirty(event_days(enrollments))
+
+
+def compute_daily_stats(days=None, activity_ids=None):
+    """
+    Compute rollup values for the given (activity_id, date) pairs, or for
+    every day (of `activity_ids` only, if given) when `days` is None.
+    Returns {(activity_id, date): {field: value}}.
+    """
+    from apps.events.models import ArchivedEnrollment, ArchivedEvent, Event, Enrollment
+    from apps.meetings.models import ArchivedMeetingParticipant, Meeting
+
+    def scope(queryset, activity_field, start_field):
+        if days is None:
+            if activity_ids is not None:
+                return queryset.filter(**{f'{activity_field}__in': activity_ids})
+            return queryset
+        # Superset filter; pairs outside `days` are dropped below
+        return queryset.filter(**{
+            f'{activity_field}__in': {activity_id for activity_id, _ in days},
+            f'{start_field}__date__in': {day for _, day in days},
+        })
+
+    results = defaultdict(lambda: dict.fromkeys(ROLLUP_FIELDS + ('max_meeting_size',), 0))
+
+    def add(key, row):
+        target = results[key]
+        for field, value in row.items():
+            target[field] += value
+
+    def add_meeting(key, size):
+        row = results[key]
+        row['meeting_participants_total'] += size
+        row['max_meeting_size'] = max(row['max_meeting_size'], size)
+
+    for model in (Event, ArchivedEvent):
+        events = (
+            scope(model.objects.all(), 'activity_id', 'start_datetime')
+            .annotate(day=utc_date('start_datetime'))
+            .values('activity_id', 'day')
+            .order_by()
+            .annotate(
+                events_total=Count('id'),
+                events_scheduled=Count('id', filter=Q(status=Event.Status.SCHEDULED)),
+                events_completed=Count('id', filter=Q(status=Event.Status.COMPLETED)),
+                events_cancelled=Count('id', filter=Q(status=Event.Status.CANCELLED)),
+                **({'meetings_total': Sum('meetings_count')} if model is ArchivedEvent else {}),
+            )
+        )
+        for row in events:
+            add((row.pop('activity_id'), row.pop('day')), row)
+
+    for model in (Enrollment, ArchivedEnrollment):
+        enrollments = (
+            scope(model.objects.all(), 'event__activity_id', 'event__start_datetime')
+            .annotate(activity=F('event__activity_id'), day=utc_date('event__start_datetime'))
+            .values('activity', 'day')
+            .order_by()
+            .annotate(
+                enrollments_total=Count('id'),
+                enrollments_enrolled=Count('id', filter=Q(status=Enrollment.Status.ENROLLED)),
+                enrollments_cancelled=Count('id', filter=Q(status=Enrollment.Status.CANCELLED)),
+                enrollments_attended=Count('id', filter=Q(status=Enrollment.Status.ATTENDED)),
+                enrollments_no_show=Count('id', filter=Q(status=Enrollment.Status.NO_SHOW)),
+            )
+        )
+        for row in enrollments:
+            add((row.pop('activity'), row.pop('day')), row)
+
+    meetings = (
+        scope(Meeting.objects.all(), 'event__activity_id', 'event__start_datetime')
+        .annotate(
+            activity=F('event__activity_id'),
+            day=utc_date('event__start_datetime'),
+            size=Count('participants'),
+        )
+        .values_list('activity', 'day', 'size')
+        .order_by()
+    )
+    for activity_id, day, size in meetings:
+        results[(activity_id, day)]['meetings_total'] += 1
+        add_meeting((activity_id, day), size)
+
+    # Archived meetings are only known through their participants; their
+    # count is already included in ArchivedEvent.meetings_count
+    archived_meetings = (
+        scope(ArchivedMeetingParticipant.objects.all(), 'event__activity_id', 'event__start_datetime')
+        .annotate(activity=F('event__activity_id'), day=utc_date('event__start_datetime'))
+        .values('activity', 'day', 'event_id', 'meeting_id')
+        .order_by()
+        .annotate(size=Count('id'))
+        .values_list('activity', 'day', 'size')
+    )
+    for activity_id, day, size in archived_meetings:
+        add_meeting((activity_id, day), size)
+
+    if days is not None:
+        return {key: value for key, value in results.items() if key in days}
+    return dict(results)
+
+
+def save_daily_stats(values, days=None):
+    """
+    Replace the rollup rows of `days` (or all rows when None) with `values`.
+    """
+    with transaction.atomic():
+        existing = ActivityDailyStats.objects.all()
+        if days is not None:
+            activity_ids = {activity_id for activity_id, _ in days}
+            existing = existing.filter(
+                activity_id__in=activity_ids,
+                date__in={day for _, day in days}
+            )
+            stale = [
+                pk for pk, activity_id, day in existing.values_list('pk', 'activity_id', 'date')
+                if (activity_id, day) in days
+            ]
+            ActivityDailyStats.objects.filter(pk__in=stale).delete()
+        else:
+            existing.delete()
+
+        ActivityDailyStats.objects.bulk_create(
+            [
+                ActivityDailyStats(activity_id=activity_id, date=day, **fields)
+                for (activity_id, day), fields in values.items()
+            ],
+            batch_size=1000
+        )
+
+
+def refresh_rollups(full=False):
+    """
+    Bring `ActivityDailyStats` up to date and advance the watermark.
+
+    Returns the number of (activity, day) pairs recomputed.
+    """
+    started_at = timezone.now()
+    watermark = None if full else get_watermark()
+
+    if watermark is None:
+        days = None
+    else:
+        days = changed_days(watermark - WATERMARK_OVERLAP)
+        days.update(
+            ActivityDailyStats.objects.filter(is_dirty=True).values_list('activity_id', 'date')
+        )
+
+    values = compute_daily_stats(days)
+    save_daily_stats(values, days)
+
+    StatsRollupWatermark.objects.update_or_create(
+        name=WATERMARK_NAME, defaults={'value': started_at}
+    )
+    if values or days:
+        bump_dashboard_version()
+
+    refreshed = len(values) if days is None else len(days)
+    logger.info(f'Refreshed {refreshed} activity daily stats rows (watermark {started_at})')
+    return refreshed
+
+
+def activity_daily_stats(activity):
+    """
+    Return the exact per-day statistics of an activity, ordered by date.
+
+    Rollup rows are used for the days unchanged since the watermark; days
+    changed since then (or flagged dirty) are computed live, and so is
+    every day before the first refresh.
+    """
+    watermark = get_watermark()
+    if watermark is None:
+        days = compute_daily_stats(activity_ids=[activity.id])
+        return sorted(
+            ({'date': day, **fields} for (_, day), fields in days.items()),
+            key=lambda row: row['date']
+        )
+
+    rows = {
+        row['date']: row
+        for row in activity.daily_stats.values('date', 'is_dirty', *ROLLUP_FIELDS, 'max_meeting_size')
+    }
+    pending = changed_days(watermark - WATERMARK_OVERLAP, activity_ids=[activity.id])
+    pending.update((activity.id, day) for day, row in rows.items() if row.pop('is_dirty'))
+    if pending:
+        for _, day in pending:
+            rows.pop(day, None)
+        for (_, day), fields in compute_daily_stats(pending).items():
+            rows[day] = {'date': day, **fields}
+    return [rows[day] for day in sorted(rows)]
+
+
+def summarize_activity(activity, daily=None):
+    """
+    Sum the daily statistics of an activity (see `activity_daily_stats`,
+    or pass its result as `daily`).
+
+    Returns a dict with the totals of every rollup field, the largest
+    meeting, and `as_of` (when the totals were computed).
+    """
+    if daily is None:
+        daily = activity_daily_stats(activity)
+    totals = {field: sum(row[field] for row in daily) for field in ROLLUP_FIELDS}
+    totals['max_meeting_size'] = max((row['max_meeting_size'] for row in daily), default=0)
+    totals['as_of'] = timezone.now()
+    return totals
+
+
+def get_dashboard_version():
+    return cache.get_or_set(DASHBOARD_VERSION_KEY, 1, None)
+
+
+def bump_dashboard_version():
+    """Invalidate every cached dashboard at once."""
+    try:
+        cache.incr(DASHBOARD_VERSION_KEY)
+    except ValueError:
+        cache.set(DASHBOARD_VERSION_KEY, 2, None)
+
+
+def dashboard_cache_key(user):
+    return f'activity_dashboard:{get_dashboard_version()}:{user.pk}'
+
+
+def activity_totals(activity_ids):
+    """
+    Return {activity_id: {field: total}} for the given activities.
+
+    Like `activity_daily_stats`, but summed in the database: one grouped
+    aggregate over the up-to-date rollup rows, plus the stale days (see
+    `pending_days`) computed live. Before the first refresh every day is
+    computed live.
+    """
+    totals = defaultdict(lambda: dict.fromkeys(ROLLUP_FIELDS, 0))
+    if not activity_ids:
+        return totals
+
+    watermark = get_watermark()
+    if watermark is None:
+        live = compute_daily_stats(activity_ids=activity_ids)
+    else:
+        pending = pending_days(watermark, activity_ids)
+        rollups = ActivityDailyStats.objects.filter(activity_id__in=activity_ids)
+        if pending:
+            rollups = rollups.exclude(days_filter(pending))
+        sums = rollups.values('activity_id').order_by().annotate(**{field: Sum(field) for field in ROLLUP_FIELDS})
+        for row in sums:
+            totals[row.pop('activity_id')].update(row)
+        live = compute_daily_stats(pending) if pending else {}
+
+    for (activity_id, _), fields in live.items():
+        target = totals[activity_id]
+        for field in ROLLUP_FIELDS:
+            target[field] += fields[field]
+    return totals
+
+
+def dashboard_rows(activities):
+    """
+    Return one statistics dict per activity, with a fixed number of queries
+    whatever the number of activities (see `activity_totals`).
+    """
+    activities = list(activities.values('id', 'code', 'title', 'is_active', 'created_by_id'))
+    totals = activity_totals([activity['id'] for activity in activities])
+
+    rows = []
+    for activity in activities:
+        stats = totals[activity['id']]
+        enrollments = stats['enrollments_total']
+        rows.append({
+            'activity_code': activity['code'],
+            'activity_title': activity['title'],
+            'is_active': activity['is_active'],
+            'created_by': activity['created_by_id'],
+            'events': {
+                'total': stats['events_total'],
+                'scheduled': stats['events_scheduled'],
+                'completed': stats['events_completed'],
+                'cancelled': stats['events_cancelled'],
+            },
+            'enrollments': {
+                'total': enrollments,
+                'enrolled': stats['enrollments_enrolled'],
+                'cancelled': stats['enrollments_cancelled'],
+                'attended': stats['enrollments_attended'],
+                'no_show': stats['enrollments_no_show'],
+            },
+            'attendance_rate': (
+                round(stats['enrollments_attended'] / enrollments * 100, 2)
+                if enrollments > 0 else 0
+            ),
+        })
+    return rows
@@ -0,0 +1,236 @@
+"""
+Database-native text search for activities and the events that belong to them.
+
+`RankedSearchFilter` replaces DRF's `SearchFilter` (which compiles to
+``ILIKE '%term%'`` over a join and always scans the whole table):
+
+- PostgreSQL: a GIN index over the activity `SearchVector` serves full-text
+  matches and `pg_trgm` GIN indexes serve substring matches on code/title.
+- SQLite: an FTS5 table kept in sync with `activities` by triggers.
+
+Both backends match every term either as a word in the search document or
+as a substring of the code or title, so substrings that `SearchFilter`
+matched (e.g. the middle of an activity code) are still found. Only the
+columns listed in the view's `search_fields` are searched, and both
+backends annotate a `search_rank` that orders the results when the client
+does not request an explicit ordering.
+"""
+from django.db import connections
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce, Upper
+from rest_framework import filters
+from rest_framework.settings import api_settings
+
+SEARCH_FIELDS = ('code', 'title', 'description')
+SEARCH_CONFIG = 'simple'
+
+POSTGRES_SEARCH_INDEX = 'activities_search_vector_idx'
+POSTGRES_TRIGRAM_INDEXES = {
+    'code': 'activities_code_trgm_idx',
+    'title': 'activities_title_trgm_idx',
+}
+
+SQLITE_FTS_TABLE = 'activities_fts'
+# bm25 weights for code, title and description (higher is more relevant)
+SQLITE_FTS_WEIGHTS = (10.0, 5.0, 1.0)
+# Columns that are also matched as substrings (served by the trigram indexes)
+SUBSTRING_FIELDS = ('code', 'title')
+
+
+def activity_search_vector(prefix='', fields=SEARCH_FIELDS):
+    """Return the search document used both by queries and by the GIN index."""
+    from django.contrib.postgres.search import SearchVector
+
+    return SearchVector(*[f'{prefix}{field}' for field in fields], config=SEARCH_CONFIG)
+
+
+def install_search_index(schema_editor, activity_model):
+    """
+    Create the search index for the activities table.
+
+    Called from migrations. On SQLite, any migration that rebuilds the
+    `activities` table drops the sync triggers and must call this again.
+    """
+    vendor = schema_editor.connection.vendor
+
+    if vendor == 'postgresql':
+        from django.contrib.postgres.indexes import GinIndex, OpClass
+
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        schema_editor.add_index(
+            activity_model,
+            GinIndex(activity_search_vector(), name=POSTGRES_SEARCH_INDEX)
+        )
+        for field, index_name in POSTGRES_TRIGRAM_INDEXES.items():
+            # Matches the UPPER(col::text) LIKE UPPER(%s) emitted by `icontains`
+            schema_editor.add_index(
+                activity_model,
+                GinIndex(OpClass(Upper(field), name='gin_trgm_ops'), name=index_name)
+            )
+
+    elif vendor == 'sqlite':
+        table = activity_model._meta.db_table
+        columns = ', '.join(SEARCH_FIELDS)
+        new_values = ', '.join(f'new.{field}' for field in SEARCH_FIELDS)
+        old_values = ', '.join(f'old.{field}' for field in SEARCH_FIELDS)
+
+        uninstall_search_index(schema_editor, activity_model)
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {SQLITE_FTS_TABLE} USING fts5("
+            f"{columns}, content='{table}', tokenize='unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER {SQLITE_FTS_TABLE}_ai AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {SQLITE_FTS_TABLE}(rowid, {columns}) VALUES (new.rowid, {new_values}); "
+            f"END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER {SQLITE_FTS_TABLE}_ad AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}, rowid, {columns}) "
+            f"VALUES ('delete', old.rowid, {old_values}); "
+            f"END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER {SQLITE_FTS_TABLE}_au AFTER UPDATE ON {table} BEGIN "
+            f"INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}, rowid, {columns}) "
+            f"VALUES ('delete', old.rowid, {old_values}); "
+            f"INSERT INTO {SQLITE_FTS_TABLE}(rowid, {columns}) VALUES (new.rowid, {new_values}); "
+            f"END"
+        )
+        schema_editor.execute(f"INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}) VALUES ('rebuild')")
+
+
+def uninstall_search_index(schema_editor, activity_model):
+    """Drop the search index created by `install_search_index`."""
+    vendor = schema_editor.connection.vendor
+
+    if vendor == 'postgresql':
+        for index_name in [POSTGRES_SEARCH_INDEX, *POSTGRES_TRIGRAM_INDEXES.values()]:
+            schema_editor.execute(f'DROP INDEX IF EXISTS {index_name}')
+
+    elif vendor == 'sqlite':
+        for suffix in ('ai', 'ad', 'au'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {SQLITE_FTS_TABLE}_{suffix}')
+        schema_editor.execute(f'DROP TABLE IF EXISTS {SQLITE_FTS_TABLE}')
+
+
+def build_fts_query(terms, fields=SEARCH_FIELDS):
+    """
+    Build an FTS5 MATCH expression where every term must match as a prefix.
+
+    Terms are quoted so user input can never be parsed as FTS5 syntax. When
+    `fields` is a subset of `SEARCH_FIELDS` the match is limited to them.
+    """
+    quoted = ' '.join('"{}"*'.format(term.replace('"', '""')) for term in terms)
+    if tuple(fields) == SEARCH_FIELDS:
+        return quoted
+    return '{{{}}} : ({})'.format(' '.join(fields), quoted)
+
+
+class RankedSearchFilter(filters.SearchFilter):
+    """
+    Search filter backed by the database's text search engine.
+
+    Views set `search_activity_field` to the name of the foreign key that
+    points to `Activity` (e.g. ``'activity'`` for events) or leave it as None
+    when the view lists activities themselves. The filter must be the last
+    backend in `filter_backends` so that it can put the ranking in front of
+    the ordering chosen by `OrderingFilter`.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        search_terms = self.get_search_terms(request)
+        if not search_terms:
+            return queryset
+
+        vendor = connections[queryset.db].vendor
+        activity_field = getattr(view, 'search_activity_field', None)
+        fields = self.get_search_columns(request, view, activity_field)
+
+        if vendor == 'postgresql':
+            queryset = self._filter_postgresql(queryset, search_terms, activity_field, fields)
+        elif vendor == 'sqlite':
+            queryset = self._filter_sqlite(queryset, search_terms, activity_field, fields)
+        else:
+            return super().filter_queryset(request, queryset, view)
+
+        # Rank first unless the client asked for a specific ordering
+        if not request.query_params.get(api_settings.ORDERING_PARAM):
+            ordering = queryset.query.order_by or queryset.model._meta.ordering
+            queryset = queryset.order_by('-search_rank', *ordering)
+
+        return queryset
+
+    def get_search_columns(self, request, view, activity_field):
+        """Return the activity columns named by the view's `search_fields`."""
+        prefix = f'{activity_field}__' if activity_field else ''
+        names = {name.lstrip('^=@$') for name in self.get_search_fields(view, request) or ()}
+        return tuple(field for field in SEARCH_FIELDS if f'{prefix}{field}' in names) or SEARCH_FIELDS
+
+    def _substring_match(self, term, prefix, fields):
+        """Return a Q matching `term` anywhere in the code or title."""
+        match = Q()
+        for field in SUBSTRING_FIELDS:
+            if field in fields:
+                match |= Q(**{f'{prefix}{field}__icontains': term})
+        return match
+
+    def _filter_postgresql(self, queryset, terms, activity_field, fields):
+        """Full-text match on the search document or substring match on code/title."""
+        from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+
+        prefix = f'{activity_field}__' if activity_field else ''
+        # The GIN index only covers the full document; when just code/title are
+        # searched the trigram-backed substring match already covers every word
+        full_text = fields == SEARCH_FIELDS
+        if full_text:
+            queryset = queryset.alias(search_document=activity_search_vector(prefix))
+
+        for term in terms:
+            match = self._substring_match(term, prefix, fields)
+            if full_text:
+                match |= Q(search_document=SearchQuery(term, config=SEARCH_CONFIG))
+            queryset = queryset.filter(match)
+
+        query = SearchQuery(' '.join(terms), config=SEARCH_CONFIG)
+        return queryset.annotate(
+            search_rank=(
+                SearchRank(activity_search_vector(prefix, fields), query) +
+                TrigramSimilarity(f'{prefix}title', ' '.join(terms))
+            )
+        )
+
+    def _filter_sqlite(self, queryset, terms, activity_field, fields):
+        """Match against the FTS5 table or substrings of code/title and rank with bm25."""
+        model = queryset.model
+        activity_table = (
+            model._meta.get_field(activity_field).related_model._meta.db_table
+            if activity_field else model._meta.db_table
+        )
+        outer_column = '"{}"."{}"'.format(
+            model._meta.db_table,
+            model._meta.get_field(activity_field or 'id').column
+        )
+        weights = ', '.join(str(weight) for weight in SQLITE_FTS_WEIGHTS)
+        prefix = f'{activity_field}__' if activity_field else ''
+        lookup = f'{activity_field}__in' if activity_field else 'pk__in'
+
+        for term in terms:
+            matching_ids = RawSQL(
+                f'SELECT a.id FROM {activity_table} a '
+                f'JOIN {SQLITE_FTS_TABLE} ON {SQLITE_FTS_TABLE}.rowid = a.rowid '
+                f'WHERE {SQLITE_FTS_TABLE} MATCH %s',
+                (build_fts_query([term], fields),)
+            )
+            queryset = queryset.filter(Q(**{lookup: matching_ids}) | self._substring_match(term, prefix, fields))
+
+        # Rows found only through a substring have no bm25 score and rank last
+        rank = RawSQL(
+            f'SELECT -bm25({SQLITE_FTS_TABLE}, {weights}) FROM {SQLITE_FTS_TABLE} '
+            f'WHERE {SQLITE_FTS_TABLE} MATCH %s AND {SQLITE_FTS_TABLE}.rowid = '
+            f'(SELECT a.rowid FROM {activity_table} a WHERE a.id = {outer_column})',
+            (build_fts_query(terms, fields),),
+            output_field=FloatField()
+        )
+        return queryset.annotate(search_rank=Coalesce(rank, Value(0.0)))
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from .models import Activity, ActivityFile
 from apps.users.models import User
+from apps.core.fieldsets import SparseFieldsetSerializerMixin
 
 
 class ActivityFileSerializer(serializers.ModelSerializer):
@@ -21,12 +22,13 @@ class ActivityFileSerializer(serializers.ModelSerializer):
         return None
 
 
-class ActivitySerializer(serializers.ModelSerializer):
+class ActivitySerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     """Serializer for Activity model - read operations."""
 
     files = ActivityFileSerializer(many=True, read_only=True)
     created_by_name = serializers.SerializerMethodField()
-    event_count = serializers.SerializerMethodField()
+    # Annotated by the views (Count('events')) to avoid one COUNT per row
+    event_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Activity
@@ -50,9 +52,22 @@ class ActivitySerializer(serializers.ModelSerializer):
         """Get creator's user_code."""
         return obj.created_by.user_code if obj.created_by else None
 
-    def get_event_count(self, obj):
-        """Get count of events for this activity."""
-        return obj.events.count()
+
+class ActivitySummarySerializer(ActivitySerializer):
+    """Lightweight activity representation for catalog pages (no files or HTML)."""
+
+    class Meta(ActivitySerializer.Meta):
+        fields = [
+            'id',
+            'code',
+            'title',
+            'max_participants_per_meeting',
+            'created_by',
+            'created_by_name',
+            'is_active',
+            'created_at',
+            'event_count'
+        ]
 
 
 class ActivityCreateUpdateSerializer(serializers.ModelSerializer):
@@ -0,0 +1,108 @@
+"""
+Signals that flag activity rollups for recomputation and invalidate
+the cached dashboards.
+
+Updates are picked up by the rollup task through `updated_at`, but
+deletions and rescheduled events leave nothing behind to scan, so the
+affected `ActivityDailyStats` rows are marked dirty instead.
+
+Enrollments have no delete receiver, so they keep Django's fast delete:
+their days are flagged once by whatever deletes them (the event or the
+user they cascade from, or the admin; see `mark_enrollment_days_dirty`).
+Meetings and their participants do have one, but it only acts when they
+are deleted directly, once per `delete()` call; when they cascade from an
+event or a user, that receiver has flagged the days already.
+"""
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .models import Activity
+from .rollups import bump_dashboard_version, event_days, mark_days_dirty
+
+
+def mark_day_dirty(activity_id, start_datetime):
+    """Flag the rollup row of the (UTC) day of `start_datetime`."""
+    mark_days_dirty({(activity_id, start_datetime.astimezone(dt_timezone.utc).date())})
+
+
+def flag_deleted_days(sender, instance, origin, event_field):
+    """
+    Flag the days of the rows of `sender` removed by a `delete()` call made
+    on `sender` itself: an instance flags its own day, a queryset flags all
+    of its days with its first row.
+    """
+    origin = instance if origin is None else origin
+    if isinstance(origin, QuerySet):
+        if origin.model is not sender or getattr(origin, '_rollup_days_flagged', False):
+            return
+        origin._rollup_days_flagged = True
+        queryset = origin
+    elif isinstance(origin, sender):
+        queryset = sender.objects.filter(pk=origin.pk)
+    else:
+        return
+    mark_days_dirty(event_days(queryset, event_field))
+
+
+@receiver(pre_delete, sender='events.Event')
+def event_deleted(sender, instance, **kwargs):
+    """Flag the event's day, which also covers its cascaded enrollments."""
+    mark_day_dirty(instance.activity_id, instance.start_datetime)
+
+
+@receiver(pre_delete, sender=settings.AUTH_USER_MODEL)
+def user_deleted(sender, instance, **kwargs):
+    """
+    Flag the days of the user's enrollments and meeting participations,
+    live or archived, before they cascade.
+    """
+    from apps.events.models import ArchivedEnrollment, Enrollment
+    from apps.meetings.models import ArchivedMeetingParticipant, MeetingParticipant
+
+    days = event_days(MeetingParticipant.objects.filter(user=instance), 'meeting__event')
+    for model in (Enrollment, ArchivedEnrollment, ArchivedMeetingParticipant):
+        days |= event_days(model.objects.filter(user=instance))
+    mark_days_dirty(days)
+
+
+@receiver(pre_delete, sender='meetings.Meeting')
+def meeting_deleted(sender, instance, origin=None, **kwargs):
+    """Flag the day of meetings deleted directly (not through their event)."""
+    flag_deleted_days(sender, instance, origin, 'event')
+
+
+@receiver(pre_delete, sender='meetings.MeetingParticipant')
+def meeting_participant_deleted(sender, instance, origin=None, **kwargs):
+    """Flag the day of participants deleted directly (not through their meeting, event or user)."""
+    flag_deleted_days(sender, instance, origin, 'meeting__event')
+
+
+@receiver(pre_save, sender='events.Event')
+def event_rescheduled(sender, instance, update_fields=None, **kwargs):
+    """Flag the old day when an event moves to another date."""
+    if instance._state.adding or (update_fields is not None and 'start_datetime' not in update_fields):
+        return
+
+    old_start = getattr(instance, '_loaded_start_datetime', None)
+    if old_start is None:
+        # Not loaded through the ORM (or deferred): ask the database
+        old_start = sender.objects.filter(pk=instance.pk).values_list('start_datetime', flat=True).first()
+    if old_start and old_start != instance.start_datetime:
+        mark_day_dirty(instance.activity_id, old_start)
+
+
+@receiver(post_save, sender='events.Event')
+def event_saved(sender, instance, **kwargs):
+    """Remember the saved start, so saving the instance again compares against it."""
+    instance._loaded_start_datetime = instance.start_datetime
+
+
+@receiver(post_save, sender=Activity)
+@receiver(post_delete, sender=Activity)
+def activity_changed(sender, instance, **kwargs):
+    """Dashboards list activity titles and visibility, so drop them all."""
+    bump_dashboard_version()
@@ -0,0 +1,20 @@
+"""
+Celery tasks for activity statistics rollups.
+"""
+import logging
+from celery import shared_task
+
+from .rollups import refresh_rollups
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def refresh_activity_rollups(full=False):
+    """
+    Celery task to update the daily activity statistics from changed rows.
+
+    This task should be run periodically (e.g., every 5 minutes).
+    """
+    refreshed = refresh_rollups(full=full)
+    return f'Refreshed {refreshed} activity daily stats rows'
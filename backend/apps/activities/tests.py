@@ -1,8 +1,11 @@
+from datetime import timedelta
 from django.test import TestCase
 from django.urls import reverse
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.utils import timezone as django_timezone
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
+from apps.core.testing import QueryCountTestMixin
 from apps.users.models import User
 from .models import Activity, ActivityFile
 
@@ -224,6 +227,28 @@ class ActivityAPITests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertFalse(Activity.objects.filter(code='ACT002').exists())
 
+    def test_delete_activity_with_only_archived_events(self):
+        """Test that an activity whose events were all archived is only deactivated."""
+        from apps.events.archive import archive_cutoff, archive_events
+        from apps.events.models import ArchivedEvent, Event
+
+        start = django_timezone.now() - timedelta(days=400)
+        Event.objects.create(
+            activity=self.activity2,
+            start_datetime=start,
+            end_datetime=start + timedelta(hours=1),
+            status=Event.Status.COMPLETED
+        )
+        archive_events(archive_cutoff(180))
+        self.client.force_authenticate(user=self.teacher)
+
+        url = reverse('activities:activity_delete', kwargs={'code': 'ACT002'})
+        response = self.client.delete(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(Activity.objects.filter(code='ACT002').exists())
+        self.assertEqual(ArchivedEvent.objects.filter(activity__code='ACT002').count(), 1)
+
     def test_search_activities(self):
         """Test searching activities by title."""
         self.client.force_authenticate(user=self.teacher)
@@ -234,6 +259,96 @@ class ActivityAPITests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertGreaterEqual(len(response.data['results']), 1)
 
+    def test_search_activities_ranks_code_and_title_first(self):
+        """Test that search results are ordered by relevance."""
+        Activity.objects.create(
+            code='ACT003',
+            title='Weekly Debate',
+            description='<p>Prepare one argument about travel</p>',
+            created_by=self.teacher
+        )
+        Activity.objects.create(
+            code='TRAVEL01',
+            title='Travel Stories',
+            description='<p>Tell the group about a trip</p>',
+            created_by=self.teacher
+        )
+        self.client.force_authenticate(user=self.teacher)
+
+        url = reverse('activities:activity_list')
+        response = self.client.get(url, {'search': 'travel'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        codes = [activity['code'] for activity in response.data['results']]
+        self.assertEqual(codes, ['TRAVEL01', 'ACT003'])
+
+    def test_search_activities_with_explicit_ordering(self):
+        """Test that an explicit ordering overrides the search ranking."""
+        self.client.force_authenticate(user=self.admin)
+
+        url = reverse('activities:activity_list')
+        response = self.client.get(url, {'search': 'activity', 'ordering': 'code'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        codes = [activity['code'] for activity in response.data['results']]
+        self.assertEqual(codes, ['ACT001', 'ACT002'])
+
+    def test_search_activities_matches_code_substrings(self):
+        """Test that a term in the middle of a code still matches."""
+        self.client.force_authenticate(user=self.admin)
+
+        url = reverse('activities:activity_list')
+        response = self.client.get(url, {'search': 'CT00', 'ordering': 'code'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        codes = [activity['code'] for activity in response.data['results']]
+        self.assertEqual(codes, ['ACT001', 'ACT002'])
+
+    def test_search_activities_escapes_query_syntax(self):
+        """Test that search terms are never interpreted as query syntax."""
+        self.client.force_authenticate(user=self.teacher)
+
+        url = reverse('activities:activity_list')
+        response = self.client.get(url, {'search': 'Active" OR "*'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 0)
+
+    def test_list_activities_query_count_is_constant(self):
+        """Test that event counts are annotated instead of queried per row."""
+        for index in range(5):
+            Activity.objects.create(
+                code=f'BULK{index}',
+                title=f'Bulk Activity {index}',
+                description='<p>Description</p>',
+                created_by=self.teacher
+            )
+        self.client.force_authenticate(user=self.admin)
+        url = reverse('activities:activity_list')
+
+        # count + page + files prefetch
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 7)
+        self.assertEqual(response.data['results'][0]['event_count'], 0)
+
+    def test_list_activities_summary_view(self):
+        """Test the lightweight summary representation."""
+        self.client.force_authenticate(user=self.admin)
+        url = reverse('activities:activity_list')
+
+        # count + page, no files prefetch
+        with self.assertNumQueries(2):
+            response = self.client.get(url, {'view': 'summary'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        result = response.data['results'][0]
+        self.assertIn('event_count', result)
+        self.assertNotIn('files', result)
+        self.assertNotIn('description', result)
+
     def test_filter_activities_by_active_status(self):
         """Test filtering activities by is_active status."""
         self.client.force_authenticate(user=self.teacher)
@@ -367,3 +482,500 @@ class ActivityStatisticsTests(APITestCase):
         self.assertIn('total_events', response.data)
         self.assertIn('total_enrollments', response.data)
         self.assertIn('attendance_rate', response.data)
+
+    def _create_event(self, days, **kwargs):
+        from apps.events.models import Event
+
+        start = django_timezone.now() + timedelta(days=days)
+        return Event.objects.create(
+            activity=self.activity,
+            start_datetime=start,
+            end_datetime=start + timedelta(hours=1),
+            **kwargs
+        )
+
+    def _enroll(self, event, count, status):
+        from apps.events.models import Enrollment
+
+        for _ in range(count):
+            index = User.objects.count()
+            student = User.objects.create_user(
+                user_code=f'student_{index:03d}',
+                email=f'student{index}@example.com',
+                password='studentpass123'
+            )
+            Enrollment.objects.create(user=student, event=event, status=status)
+
+    def _age_rows(self):
+        """Date the source rows before the watermark overlap, as if long unchanged."""
+        from apps.events.models import Event, Enrollment
+
+        past = django_timezone.now() - timedelta(hours=1)
+        Event.objects.update(updated_at=past)
+        Enrollment.objects.update(updated_at=past)
+
+    def test_statistics_read_from_rollups(self):
+        """Test that statistics come from the daily rollups."""
+        from apps.events.models import Event, Enrollment
+        from .rollups import refresh_rollups
+
+        first = self._create_event(1)
+        second = self._create_event(2, status=Event.Status.COMPLETED)
+        self._enroll(first, 2, Enrollment.Status.ENROLLED)
+        self._enroll(second, 3, Enrollment.Status.ATTENDED)
+        self._enroll(second, 1, Enrollment.Status.NO_SHOW)
+        self._age_rows()
+
+        self.assertEqual(refresh_rollups(), 2)
+        self.client.force_authenticate(user=self.teacher)
+
+        url = reverse('activities:activity_statistics', kwargs={'code': 'ACT001'})
+        # Activity, watermark, daily rows and one change scan per source table
+        with self.assertNumQueries(7):
+            response = self.client.get(url, {'daily': 'true'})
+
+        self.assertEqual(response.data['total_events'], 2)
+        self.assertEqual(response.data['completed_events'], 1)
+        self.assertEqual(response.data['total_enrollments'], 6)
+        self.assertEqual(response.data['total_attended'], 3)
+        self.assertEqual(response.data['total_no_show'], 1)
+        self.assertEqual(response.data['attendance_rate'], 50.0)
+        self.assertIsNotNone(response.data['as_of'])
+        self.assertEqual(len(response.data['daily']), 2)
+
+    def test_statistics_exact_before_first_refresh(self):
+        """Test that statistics are computed live until the rollups exist."""
+        from apps.events.models import Enrollment
+
+        self._enroll(self._create_event(1), 2, Enrollment.Status.ATTENDED)
+        self.client.force_authenticate(user=self.teacher)
+
+        url = reverse('activities:activity_statistics', kwargs={'code': 'ACT001'})
+        response = self.client.get(url)
+
+        self.assertEqual(response.data['total_events'], 1)
+        self.assertEqual(response.data['total_attended'], 2)
+
+    def test_statistics_exact_between_refreshes(self):
+        """Test that rows changed or deleted since the last refresh are reflected."""
+        from apps.events.models import Enrollment
+        from .rollups import refresh_rollups
+
+        first = self._create_event(1)
+        second = self._create_event(2)
+        self._enroll(first, 2, Enrollment.Status.ENROLLED)
+        self._enroll(second, 1, Enrollment.Status.ENROLLED)
+        self._age_rows()
+        refresh_rollups()
+
+        self._enroll(first, 1, Enrollment.Status.ATTENDED)
+        # Its enrollments cascade without per-row signals
+        second.delete()
+        self.client.force_authenticate(user=self.teacher)
+
+        url = reverse('activities:activity_statistics', kwargs={'code': 'ACT001'})
+        response = self.client.get(url, {'daily': 'true'})
+
+        self.assertEqual(response.data['total_events'], 1)
+        self.assertEqual(response.data['total_enrollments'], 3)
+        self.assertEqual(response.data['total_attended'], 1)
+        self.assertEqual([row['date'] for row in response.data['daily']], [first.start_datetime.date()])
+
+    def test_incremental_refresh_only_recomputes_changed_days(self):
+        """Test that only days with rows changed since the watermark are recomputed."""
+        from apps.events.models import Enrollment
+        from .models import ActivityDailyStats
+        from .rollups import changed_days, refresh_rollups
+
+        first = self._create_event(1)
+        self._create_event(2)
+        self._enroll(first, 1, Enrollment.Status.ENROLLED)
+        refresh_rollups()
+
+        since = django_timezone.now()
+        self._enroll(first, 2, Enrollment.Status.ENROLLED)
+
+        self.assertEqual(changed_days(since), {(self.activity.id, first.start_datetime.date())})
+
+        refresh_rollups()
+        row = ActivityDailyStats.objects.get(date=first.start_datetime.date())
+        self.assertEqual(row.enrollments_total, 3)
+        self.assertEqual(ActivityDailyStats.objects.count(), 2)
+
+    def test_deleted_event_marks_day_dirty(self):
+        """Test that deleting an event flags its rollup and the next refresh drops it."""
+        from .models import ActivityDailyStats
+        from .rollups import refresh_rollups
+
+        event = self._create_event(1)
+        refresh_rollups()
+        self.assertEqual(ActivityDailyStats.objects.count(), 1)
+
+        event.delete()
+        self.assertTrue(ActivityDailyStats.objects.get().is_dirty)
+
+        refresh_rollups()
+        self.assertFalse(ActivityDailyStats.objects.exists())
+
+    def test_rescheduled_event_moves_between_days(self):
+        """Test that moving an event to another day updates both rollup rows."""
+        from .models import ActivityDailyStats
+        from .rollups import refresh_rollups
+
+        event = self._create_event(1)
+        old_date = event.start_datetime.date()
+        refresh_rollups()
+
+        event.start_datetime += timedelta(days=3)
+        event.end_datetime += timedelta(days=3)
+        event.save()
+        refresh_rollups()
+
+        self.assertEqual(
+            list(ActivityDailyStats.objects.values_list('date', flat=True)),
+            [event.start_datetime.date()]
+        )
+        self.assertNotEqual(old_date, event.start_datetime.date())
+
+    def test_deleting_event_queries_do_not_grow_with_enrollments(self):
+        """Test that cascaded enrollments are deleted without per-row signals."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from apps.events.models import Enrollment
+        from .models import ActivityDailyStats
+        from .rollups import refresh_rollups
+
+        few, many = self._create_event(1), self._create_event(2)
+        self._enroll(few, 1, Enrollment.Status.ENROLLED)
+        self._enroll(many, 10, Enrollment.Status.ENROLLED)
+        refresh_rollups()
+
+        with CaptureQueriesContext(connection) as few_queries:
+            few.delete()
+        with CaptureQueriesContext(connection) as many_queries:
+            many.delete()
+
+        self.assertEqual(len(many_queries), len(few_queries))
+        self.assertEqual(ActivityDailyStats.objects.filter(is_dirty=True).count(), 2)
+
+    def test_deleting_user_marks_enrollment_days_dirty(self):
+        """Test that a user's cascaded enrollments flag their days once."""
+        from apps.events.models import Enrollment
+        from .models import ActivityDailyStats
+        from .rollups import refresh_rollups
+
+        first, second = self._create_event(1), self._create_event(2)
+        self._create_event(3)
+        self._enroll(first, 1, Enrollment.Status.ENROLLED)
+        student = Enrollment.objects.get().user
+        Enrollment.objects.create(user=student, event=second)
+        refresh_rollups()
+
+        student.delete()
+
+        self.assertEqual(
+            set(ActivityDailyStats.objects.filter(is_dirty=True).values_list('date', flat=True)),
+            {first.start_datetime.date(), second.start_datetime.date()}
+        )
+
+    def test_deleted_meetings_mark_day_dirty(self):
+        """Test that meetings and participants deleted directly flag their day."""
+        from apps.meetings.models import Meeting, MeetingParticipant
+        from .models import ActivityDailyStats
+        from .rollups import refresh_rollups
+
+        event = self._create_event(1)
+        meetings = [
+            Meeting.objects.create(
+                event=event,
+                meeting_url=f'https://meet.jit.si/group-{index}',
+                meeting_id=f'group-{index}',
+                start_time=event.start_datetime
+            )
+            for index in range(2)
+        ]
+        for index in range(3):
+            student = User.objects.create_user(
+                user_code=f'student_{index:03d}',
+                email=f'student{index}@example.com',
+                password='studentpass123'
+            )
+            MeetingParticipant.objects.create(meeting=meetings[0], user=student)
+        self._age_rows()
+        refresh_rollups()
+
+        MeetingParticipant.objects.filter(meeting=meetings[0]).first().delete()
+        self.assertTrue(ActivityDailyStats.objects.get().is_dirty)
+        refresh_rollups()
+        self.assertEqual(ActivityDailyStats.objects.get().max_meeting_size, 2)
+
+        meetings[1].delete()
+        self.assertTrue(ActivityDailyStats.objects.get().is_dirty)
+        refresh_rollups()
+        self.assertEqual(ActivityDailyStats.objects.get().meetings_total, 1)
+
+    def test_deleting_meetings_flags_days_once_per_call(self):
+        """Test that a queryset delete flags its days once, not once per row."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from apps.meetings.models import Meeting
+
+        event = self._create_event(1)
+        for index in range(3):
+            Meeting.objects.create(
+                event=event,
+                meeting_url=f'https://meet.jit.si/group-{index}',
+                meeting_id=f'group-{index}',
+                start_time=event.start_datetime
+            )
+
+        with CaptureQueriesContext(connection) as queries:
+            Meeting.objects.filter(event=event).delete()
+
+        flagged = [query for query in queries if 'UPDATE "activity_daily_stats"' in query['sql']]
+        self.assertEqual(len(flagged), 1)
+
+    def test_saving_event_does_not_query_old_start(self):
+        """Test that the reschedule check compares against the loaded value."""
+        from apps.events.models import Event
+
+        self._create_event(1)
+        event = Event.objects.get()
+        event.status = Event.Status.CANCELLED
+
+        with self.assertNumQueries(1):
+            event.save()
+
+
+class ActivityDashboardTests(APITestCase):
+    """Tests for the teacher dashboard endpoint."""
+
+    def setUp(self):
+        """Set up activities of two teachers."""
+        from django.core.cache import cache
+
+        cache.clear()
+        self.client = APIClient()
+        self.url = reverse('activities:activity_dashboard')
+
+        self.teacher = User.objects.create_user(
+            user_code='teacher_001',
+            email='teacher@example.com',
+            password='teacherpass123',
+            role=User.Role.TEACHER
+        )
+        self.other_teacher = User.objects.create_user(
+            user_code='teacher_002',
+            email='teacher2@example.com',
+            password='teacherpass123',
+            role=User.Role.TEACHER
+        )
+        self.student = User.objects.create_user(
+            user_code='student_001',
+            email='student@example.com',
+            password='studentpass123'
+        )
+
+        self.activity = Activity.objects.create(code='ACT001', title='Mine', created_by=self.teacher)
+        Activity.objects.create(code='ACT002', title='Mine, inactive', created_by=self.teacher, is_active=False)
+        Activity.objects.create(code='ACT003', title='Other, inactive', created_by=self.other_teacher, is_active=False)
+
+    def _add_activity_data(self):
+        from apps.events.models import Event, Enrollment
+
+        start = django_timezone.now() + timedelta(days=1)
+        event = Event.objects.create(activity=self.activity, start_datetime=start, end_datetime=start + timedelta(hours=1))
+        Enrollment.objects.create(user=self.student, event=event, status=Enrollment.Status.ATTENDED)
+
+    def test_dashboard_lists_visible_activities(self):
+        """Test that the dashboard covers the activities the teacher can see."""
+        from .rollups import refresh_rollups
+
+        self._add_activity_data()
+        refresh_rollups()
+        self.client.force_authenticate(user=self.teacher)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rows = {row['activity_code']: row for row in response.data['activities']}
+        self.assertEqual(set(rows), {'ACT001', 'ACT002'})
+        self.assertEqual(rows['ACT001']['events']['total'], 1)
+        self.assertEqual(rows['ACT001']['enrollments']['attended'], 1)
+        self.assertEqual(rows['ACT001']['attendance_rate'], 100.0)
+        self.assertEqual(rows['ACT002']['events']['total'], 0)
+
+    def test_dashboard_constant_queries_and_cached(self):
+        """Test that the dashboard runs a fixed number of queries and is cached."""
+        for index in range(5):
+            Activity.objects.create(code=f'EXTRA{index}', title='Extra', created_by=self.teacher)
+        self.client.force_authenticate(user=self.teacher)
+
+        # Activities, the watermark and the live computation (no rollups yet)
+        with self.assertNumQueries(8):
+            self.client.get(self.url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+
+        self.assertEqual(len(response.data['activities']), 7)
+
+    def test_dashboard_invalidated_by_refresh_and_activity_changes(self):
+        """Test that refreshed rollups and edited activities show up immediately."""
+        from .rollups import refresh_rollups
+
+        self.client.force_authenticate(user=self.teacher)
+        self.client.get(self.url)
+
+        self._add_activity_data()
+        refresh_rollups()
+        response = self.client.get(self.url)
+        rows = {row['activity_code']: row for row in response.data['activities']}
+        self.assertEqual(rows['ACT001']['events']['total'], 1)
+
+        self.activity.title = 'Renamed'
+        self.activity.save()
+        response = self.client.get(self.url)
+        rows = {row['activity_code']: row for row in response.data['activities']}
+        self.assertEqual(rows['ACT001']['activity_title'], 'Renamed')
+
+    def test_dashboard_exact_before_first_refresh(self):
+        """Test that the dashboard computes the totals live until the rollups exist."""
+        self._add_activity_data()
+        self.client.force_authenticate(user=self.teacher)
+
+        response = self.client.get(self.url)
+
+        rows = {row['activity_code']: row for row in response.data['activities']}
+        self.assertEqual(rows['ACT001']['events']['total'], 1)
+        self.assertEqual(rows['ACT001']['enrollments']['attended'], 1)
+
+    def test_dashboard_exact_between_refreshes(self):
+        """Test that days changed or flagged dirty since the refresh are computed live."""
+        from django.core.cache import cache
+        from apps.events.models import Event
+        from .rollups import refresh_rollups
+
+        self._add_activity_data()
+        self._add_activity_data()
+        refresh_rollups()
+        Event.objects.filter(activity=self.activity).first().delete()
+        cache.clear()
+        self.client.force_authenticate(user=self.teacher)
+
+        response = self.client.get(self.url)
+
+        rows = {row['activity_code']: row for row in response.data['activities']}
+        self.assertEqual(rows['ACT001']['events']['total'], 1)
+        self.assertEqual(rows['ACT001']['enrollments']['total'], 1)
+
+    def test_dashboard_as_student_fails(self):
+        """Test that students cannot access the dashboard."""
+        self.client.force_authenticate(user=self.student)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class ActivityQueryCountTests(QueryCountTestMixin, APITestCase):
+    """Query budgets of the activity endpoints, independent of the page size."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.teacher = User.objects.create_user(
+            user_code='teacher_001',
+            email='teacher@example.com',
+            password='teacherpass123',
+            role=User.Role.TEACHER
+        )
+        self.student = User.objects.create_user(
+            user_code='student_001',
+            email='student@example.com',
+            password='studentpass123'
+        )
+        self.activity = Activity.objects.create(
+            code='ACT000',
+            title='Test Activity',
+            description='<p>Description</p>',
+            created_by=self.teacher
+        )
+        self.client.force_authenticate(user=self.teacher)
+
+    def seed_activities(self, count):
+        """Activities with files and events, some of them inactive."""
+        from apps.events.models import Event
+
+        start = django_timezone.now() + timedelta(days=1)
+        offset = Activity.objects.count()
+        for index in range(offset, offset + count):
+            activity = Activity.objects.create(
+                code=f'ACT{index:03d}',
+                title=f'Activity {index}',
+                description='<p>Description</p>',
+                created_by=self.teacher,
+                is_active=index % 4 != 0
+            )
+            ActivityFile.objects.create(activity=activity, file='activity_files/notes.pdf', filename='notes.pdf')
+            Event.objects.create(activity=activity, start_datetime=start, end_datetime=start + timedelta(hours=1))
+
+    def seed_files(self, count):
+        ActivityFile.objects.bulk_create([
+            ActivityFile(activity=self.activity, file=f'activity_files/{index}.pdf', filename=f'{index}.pdf')
+            for index in range(count)
+        ])
+
+    def seed_enrollments(self, count):
+        """Enrollments of new users in a new event of `self.activity`."""
+        from apps.events.models import Enrollment, Event
+
+        start = django_timezone.now() + timedelta(days=1)
+        event = Event.objects.create(activity=self.activity, start_datetime=start, end_datetime=start + timedelta(hours=1))
+        offset = User.objects.count()
+        users = User.objects.bulk_create([
+            User(user_code=f'student_{index:04d}', email=f'student{index}@example.com')
+            for index in range(offset, offset + count)
+        ])
+        for user in users:
+            Enrollment.objects.create(event=event, user=user)
+
+    def get(self, name, user=None, data=None, **kwargs):
+        self.client.force_authenticate(user=user or self.teacher)
+        return lambda: self.client.get(reverse(f'activities:{name}', kwargs=kwargs or None), data)
+
+    def test_activity_list(self):
+        self.assertQueriesDoNotGrow(self.get('activity_list'), self.seed_activities, max_queries=3)
+
+    def test_activity_list_summary_as_student(self):
+        self.assertQueriesDoNotGrow(
+            self.get('activity_list', user=self.student, data={'view': 'summary'}),
+            self.seed_activities,
+            max_queries=2
+        )
+
+    def test_activity_detail(self):
+        self.assertQueriesDoNotGrow(
+            self.get('activity_detail', code=self.activity.code), self.seed_files, max_queries=2
+        )
+
+    def test_activity_dashboard(self):
+        self.assertQueriesDoNotGrow(
+            self.get('activity_dashboard'),
+            self.seed_activities,
+            # No rollups yet: activities, watermark and the live daily aggregates
+            max_queries=8
+        )
+
+    def test_activity_statistics(self):
+        self.assertQueriesDoNotGrow(
+            self.get('activity_statistics', code=self.activity.code, data={'daily': 'true'}),
+            self.seed_enrollments,
+            # No rollups yet: activity, watermark and the live daily aggregates
+            max_queries=8
+        )
+
+    def test_activity_enrollments_export(self):
+        self.assertQueriesDoNotGrow(
+            self.get('activity_enrollments_export', code=self.activity.code, file_format='ndjson'),
+            self.seed_enrollments,
+            max_queries=2
+        )
@@ -8,6 +8,8 @@ from .views import (
     upload_activity_file,
     delete_activity_file,
     activity_statistics,
+    activity_dashboard,
+    export_activity_enrollments,
 )
 
 app_name = 'activities'
@@ -16,6 +18,7 @@ urlpatterns = [
     # Activity CRUD
     path('', ActivityListView.as_view(), name='activity_list'),
     path('create/', ActivityCreateView.as_view(), name='activity_create'),
+    path('dashboard/', activity_dashboard, name='activity_dashboard'),
     path('<str:code>/', ActivityDetailView.as_view(), name='activity_detail'),
     path('<str:code>/update/', ActivityUpdateView.as_view(), name='activity_update'),
     path('<str:code>/delete/', ActivityDeleteView.as_view(), name='activity_delete'),
@@ -24,6 +27,9 @@ urlpatterns = [
     path('<str:code>/files/upload/', upload_activity_file, name='upload_file'),
     path('<str:code>/files/<uuid:file_id>/delete/', delete_activity_file, name='delete_file'),
 
+    # Exports
+    path('<str:code>/enrollments/export.<str:file_format>', export_activity_enrollments, name='activity_enrollments_export'),
+
     # Statistics
     path('<str:code>/statistics/', activity_statistics, name='activity_statistics'),
 ]
@@ -3,27 +3,87 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import get_object_or_404
+from django.core.cache import cache
 from django.db import models
+from django.db.models import Count
+from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
 
 from .models import Activity, ActivityFile
+from .rollups import (
+    DASHBOARD_CACHE_TIMEOUT,
+    activity_daily_stats,
+    dashboard_cache_key,
+    dashboard_rows,
+    summarize_activity,
+)
+from .search import RankedSearchFilter
 from .serializers import (
     ActivitySerializer,
+    ActivitySummarySerializer,
     ActivityCreateUpdateSerializer,
     ActivityFileSerializer,
     ActivityFileUploadSerializer
 )
 from apps.users.permissions import IsTeacherOrAdmin, IsTeacherOrAdminOrReadOnly
+from apps.core.fieldsets import SparseFieldsetViewMixin
+
+
+def visible_activities(queryset, user):
+    """
+    Restrict an activity queryset to what `user` may see.
+    - Students see only active activities
+    - Teachers see their own activities + active ones
+    - Admins see all activities
+    """
+    if user.role == 'student':
+        # Students only see active activities
+        return queryset.filter(is_active=True)
+    if user.role == 'teacher':
+        # Teachers see their own activities or active ones
+        return queryset.filter(
+            models.Q(created_by=user) | models.Q(is_active=True)
+        )
+    # Admins see everything (no filter)
+    return queryset
+
+
+class ActivityRepresentationMixin(SparseFieldsetViewMixin):
+    """
+    Choose between the full and the summary representation of activities.
+
+    `?view=summary` skips files and the HTML description. `?fields=` and
+    `?omit=` narrow either representation further; the creator join, the
+    event count and the files prefetch are only added when requested.
+    """
+
+    def is_summary(self):
+        return self.request.query_params.get('view') == 'summary'
+
+    def get_serializer_class(self):
+        if self.is_summary():
+            return ActivitySummarySerializer
+        return ActivitySerializer
+
+    def get_base_queryset(self):
+        queryset = Activity.objects.all()
+        if self.wants('created_by_name'):
+            queryset = queryset.select_related('created_by')
+        if self.wants('event_count'):
+            queryset = queryset.annotate(event_count=Count('events'))
+        if self.wants('files'):
+            queryset = queryset.prefetch_related('files')
+        return queryset
 
 
-class ActivityListView(generics.ListAPIView):
+class ActivityListView(ActivityRepresentationMixin, generics.ListAPIView):
     """
     List all activities with filtering and search.
     Available to all authenticated users.
+    Use `?view=summary` for the lightweight representation.
     """
-    serializer_class = ActivitySerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, RankedSearchFilter]
     filterset_fields = ['is_active', 'created_by']
     search_fields = ['code', 'title', 'description']
     ordering_fields = ['created_at', 'title', 'code']
@@ -36,20 +96,7 @@ class ActivityListView(generics.ListAPIView):
         - Teachers see their own activities + active ones
         - Admins see all activities
         """
-        user = self.request.user
-        queryset = Activity.objects.select_related('created_by').prefetch_related('files')
-
-        if user.role == 'student':
-            # Students only see active activities
-            queryset = queryset.filter(is_active=True)
-        elif user.role == 'teacher':
-            # Teachers see their own activities or active ones
-            queryset = queryset.filter(
-                models.Q(created_by=user) | models.Q(is_active=True)
-            )
-        # Admins see everything (no filter)
-
-        return queryset
+        return visible_activities(self.get_base_queryset(), self.request.user)
 
 
 class ActivityCreateView(generics.CreateAPIView):
@@ -65,28 +112,17 @@ class ActivityCreateView(generics.CreateAPIView):
         serializer.save(created_by=self.request.user)
 
 
-class ActivityDetailView(generics.RetrieveAPIView):
+class ActivityDetailView(ActivityRepresentationMixin, generics.RetrieveAPIView):
     """
     Get details of a specific activity.
     Available to all authenticated users.
     """
-    serializer_class = ActivitySerializer
     permission_classes = [IsAuthenticated]
     lookup_field = 'code'
 
     def get_queryset(self):
         """Apply same visibility rules as list view."""
-        user = self.request.user
-        queryset = Activity.objects.select_related('created_by').prefetch_related('files')
-
-        if user.role == 'student':
-            queryset = queryset.filter(is_active=True)
-        elif user.role == 'teacher':
-            queryset = queryset.filter(
-                models.Q(created_by=user) | models.Q(is_active=True)
-            )
-
-        return queryset
+        return visible_activities(self.get_base_queryset(), self.request.user)
 
 
 class ActivityUpdateView(generics.UpdateAPIView):
@@ -135,8 +171,8 @@ class ActivityDeleteView(generics.DestroyAPIView):
         """Soft delete: mark as inactive instead of deleting."""
         instance = self.get_object()
 
-        # Check if activity has events
-        if instance.events.exists():
+        # Check if activity has events, live or archived
+        if instance.events.exists() or instance.archived_events.exists():
             # Soft delete: mark as inactive
             instance.is_active = False
             instance.save()
@@ -228,38 +264,85 @@ def activity_statistics(request, code):
             'error': 'Activity not found'
         }, status=status.HTTP_404_NOT_FOUND)
 
-    # Calculate statistics using aggregations (more efficient)
-    from django.db.models import Count, Q
-    from apps.events.models import Enrollment
-
-    event_stats = activity.events.aggregate(
-        total_events=Count('id'),
-        active_events=Count('id', filter=Q(status='scheduled')),
-        completed_events=Count('id', filter=Q(status='completed'))
-    )
-
-    enrollment_stats = Enrollment.objects.filter(
-        event__activity=activity
-    ).aggregate(
-        total_enrollments=Count('id'),
-        enrolled_count=Count('id', filter=Q(status='enrolled')),
-        attended_count=Count('id', filter=Q(status='attended'))
-    )
-
-    total_enrollments = enrollment_stats['total_enrollments']
-    attended_count = enrollment_stats['attended_count']
+    # Daily rollups, with the days changed since the last refresh computed live
+    daily = activity_daily_stats(activity)
+    stats = summarize_activity(activity, daily)
+    total_enrollments = stats['enrollments_total']
+    attended_count = stats['enrollments_attended']
 
-    return Response({
+    data = {
         'activity_code': activity.code,
         'activity_title': activity.title,
-        'total_events': event_stats['total_events'],
-        'active_events': event_stats['active_events'],
-        'completed_events': event_stats['completed_events'],
+        'total_events': stats['events_total'],
+        'active_events': stats['events_scheduled'],
+        'completed_events': stats['events_completed'],
+        'cancelled_events': stats['events_cancelled'],
         'total_enrollments': total_enrollments,
-        'currently_enrolled': enrollment_stats['enrolled_count'],
+        'currently_enrolled': stats['enrollments_enrolled'],
         'total_attended': attended_count,
+        'total_no_show': stats['enrollments_no_show'],
         'attendance_rate': (
             round((attended_count / total_enrollments * 100), 2)
             if total_enrollments > 0 else 0
-        )
-    }, status=status.HTTP_200_OK)
+        ),
+        'total_meetings': stats['meetings_total'],
+        'average_meeting_size': (
+            round(stats['meeting_participants_total'] / stats['meetings_total'], 2)
+            if stats['meetings_total'] > 0 else 0
+        ),
+        'max_meeting_size': stats['max_meeting_size'],
+        'as_of': stats['as_of'],
+    }
+
+    if request.query_params.get('daily', '').lower() in ('true', '1'):
+        data['daily'] = daily
+
+    return Response(data, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsTeacherOrAdmin])
+def activity_dashboard(request):
+    """
+    Statistics of every activity visible to the user in one call.
+    Only teachers and admins can access the dashboard.
+    Results are read from the daily rollups (stale days computed live, see
+    `activity_totals`) and cached per user until the rollups are refreshed
+    or an activity changes.
+    """
+    cache_key = dashboard_cache_key(request.user)
+    data = cache.get(cache_key)
+
+    if data is None:
+        activities = visible_activities(Activity.objects.all(), request.user).order_by('-created_at')
+        data = {
+            'as_of': timezone.now(),
+            'activities': dashboard_rows(activities),
+        }
+        cache.set(cache_key, data, DASHBOARD_CACHE_TIMEOUT)
+
+    return Response(data, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsTeacherOrAdmin])
+def export_activity_enrollments(request, code, file_format):
+    """
+    Stream the enrollments of every event of an activity as CSV or NDJSON.
+    Only teachers and admins can export enrollments.
+    """
+    from apps.events.exports import EXPORT_FORMATS, enrollment_export_response
+    from apps.events.models import Enrollment
+
+    if file_format not in EXPORT_FORMATS:
+        return Response({
+            'error': f'Unsupported export format: {file_format}. Use one of: {", ".join(EXPORT_FORMATS)}.'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    activity = get_object_or_404(Activity, code=code)
+
+    return enrollment_export_response(
+        Enrollment.objects.filter(event__activity=activity),
+        file_format,
+        filename=f'enrollments-{activity.code}'
+    )
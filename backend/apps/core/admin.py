@@ -0,0 +1,68 @@
+"""
+Admin helpers shared by the apps.
+
+`ForeignKeyRawIdWidget` looks up the related object of every row to print
+its label, so an inline with `raw_id_fields` runs one query per row.
+`RawIdTabularInline` labels the rows with the objects its queryset already
+loaded (through `select_related`) instead:
+
+    class EnrollmentInline(RawIdTabularInline):
+        model = Enrollment
+        raw_id_fields = ('user',)
+
+        def get_queryset(self, request):
+            return super().get_queryset(request).select_related('user')
+"""
+from django.contrib import admin
+from django.contrib.admin.widgets import ForeignKeyRawIdWidget
+from django.forms.models import BaseInlineFormSet
+from django.urls import NoReverseMatch, reverse
+from django.utils.text import Truncator
+
+
+class LoadedRawIdWidget(ForeignKeyRawIdWidget):
+    """Raw id widget labelled with `loaded` when it is the current value."""
+
+    loaded = None
+
+    def label_and_url_for_value(self, value):
+        obj = self.loaded
+        if obj is None or str(obj.pk) != str(value):
+            return super().label_and_url_for_value(value)
+
+        try:
+            url = reverse(
+                f'{self.admin_site.name}:{obj._meta.app_label}_{obj._meta.model_name}_change',
+                args=(obj.pk,)
+            )
+        except NoReverseMatch:
+            url = ''
+        return Truncator(obj).words(14), url
+
+
+class LoadedRawIdFormSet(BaseInlineFormSet):
+    """Hand the related objects loaded with each row over to its raw id widgets."""
+
+    def _construct_form(self, i, **kwargs):
+        form = super()._construct_form(i, **kwargs)
+        instance = form.instance
+        if instance.pk is None:
+            return form
+        for name, field in form.fields.items():
+            if not isinstance(field.widget, LoadedRawIdWidget):
+                continue
+            model_field = instance._meta.get_field(name)
+            if model_field.is_cached(instance):
+                field.widget.loaded = model_field.get_cached_value(instance)
+        return form
+
+
+class RawIdTabularInline(admin.TabularInline):
+    """Tabular inline whose `raw_id_fields` do not query once per row."""
+
+    formset = LoadedRawIdFormSet
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name in self.raw_id_fields:
+            kwargs['widget'] = LoadedRawIdWidget(db_field.remote_field, self.admin_site, using=kwargs.get('using'))
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
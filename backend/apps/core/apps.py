@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+
+
+class CoreConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.core'
+    verbose_name = 'Core'
+
+    def ready(self):
+        from .middleware import instrument_serializers
+        from . import task_metrics  # noqa: F401 (connects the Celery signals)
+
+        instrument_serializers()
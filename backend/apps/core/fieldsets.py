@@ -0,0 +1,92 @@
+"""
+Sparse fieldsets for read serializers.
+
+Clients pass `?fields=id,status` to receive only those fields, or
+`?omit=description` to drop some. Serializers opt in with
+`SparseFieldsetSerializerMixin`; views opt in with `SparseFieldsetViewMixin`
+and use `wants()` to skip joins and annotations that no requested field
+needs, so narrower responses also mean cheaper queries.
+"""
+from rest_framework.exceptions import ValidationError
+
+FIELDS_PARAM = 'fields'
+OMIT_PARAM = 'omit'
+
+
+def _parse_field_list(value):
+    """Split a comma-separated query parameter into a set of names."""
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+def has_fieldset(request):
+    """Return True if the request restricts the response fields."""
+    if request is None:
+        return False
+    params = getattr(request, 'query_params', request.GET)
+    return bool(params.get(FIELDS_PARAM) or params.get(OMIT_PARAM))
+
+
+def get_requested_fields(request, available):
+    """
+    Return the subset of `available` field names selected by the request.
+
+    Raises a ValidationError listing unknown names so typos do not silently
+    produce empty objects.
+    """
+    available = set(available)
+    if not has_fieldset(request):
+        return available
+
+    params = getattr(request, 'query_params', request.GET)
+    selected = set(available)
+    errors = {}
+
+    for param in (FIELDS_PARAM, OMIT_PARAM):
+        value = params.get(param)
+        if not value:
+            continue
+        names = _parse_field_list(value)
+        unknown = sorted(names - available)
+        if unknown:
+            errors[param] = f"Unknown field(s): {', '.join(unknown)}. Available: {', '.join(sorted(available))}."
+        elif param == FIELDS_PARAM:
+            selected &= names
+        else:
+            selected -= names
+
+    if errors:
+        raise ValidationError(errors)
+
+    return selected
+
+
+class SparseFieldsetSerializerMixin:
+    """Drop the fields not selected by `?fields=` / `?omit=` on the request in context."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        request = self.context.get('request')
+        if not has_fieldset(request):
+            return
+
+        selected = get_requested_fields(request, self.fields.keys())
+        for name in list(self.fields):
+            if name not in selected:
+                self.fields.pop(name)
+
+
+class SparseFieldsetViewMixin:
+    """Expose the requested fields to `get_queryset` so it can prune queries."""
+
+    def get_requested_fields(self):
+        if not hasattr(self, '_requested_fields'):
+            serializer_class = self.get_serializer_class()
+            self._requested_fields = get_requested_fields(
+                self.request, serializer_class.Meta.fields
+            )
+        return self._requested_fields
+
+    def wants(self, *names):
+        """Return True if any of the given output fields was requested."""
+        return not self.get_requested_fields().isdisjoint(names)
@@ -0,0 +1,301 @@
+"""
+In-process metrics in the Prometheus text exposition format.
+
+Counters, gauges and histograms are aggregated in memory by each process
+and rendered by the `/metrics` endpoint (see `apps.core.views`). Every
+worker process keeps its own values, so a scraper should hit each worker,
+the same way the Prometheus multiprocess mode would require. Processes
+that do not serve HTTP (Celery workers) hand a snapshot of their registry
+over through the cache with `publish_snapshot` instead.
+
+    REQUESTS = REGISTRY.counter('requests_total', 'Requests served.', ['view'])
+    REQUESTS.inc(view='events:event_list')
+"""
+import logging
+import math
+import os
+import socket
+import threading
+
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# Seconds: from a cache hit to a request that should not exist
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+class Metric:
+    """Base class: a named family of samples keyed by label values."""
+
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f'{self.name} expects labels {self.labelnames}, got {tuple(labels)}')
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key, *extra):
+        return tuple(zip(self.labelnames, key)) + extra
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def snapshot(self):
+        """A picklable copy of the values, keyed by label values."""
+        with self._lock:
+            return {key: self._copy(value) for key, value in self._values.items()}
+
+    def merge(self, values):
+        """Take over the values of a snapshot (other label values are kept)."""
+        with self._lock:
+            for key, value in values.items():
+                self._values[tuple(key)] = self._copy(value)
+
+    @staticmethod
+    def _copy(value):
+        return value
+
+    def samples(self):
+        """Yield (suffix, labels, value) tuples."""
+        raise NotImplementedError
+
+    def render(self):
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.type}',
+        ]
+        for suffix, labels, value in self.samples():
+            lines.append(f'{self.name}{suffix}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    """A value that only goes up."""
+
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield '', self._labels(key), value
+
+
+class Gauge(Metric):
+    """A value that goes up and down."""
+
+    type = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def remove(self, **labels):
+        """Drop the sample with these labels (e.g. an event that ended)."""
+        key = self._key(labels)
+        with self._lock:
+            self._values.pop(key, None)
+
+    def get(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield '', self._labels(key), value
+
+
+class Histogram(Metric):
+    """Observations counted into cumulative buckets, with their sum."""
+
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * len(self.buckets), 0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._values[key] = (counts, total + value)
+
+    @staticmethod
+    def _copy(value):
+        counts, total = value
+        return list(counts), total
+
+    def get(self, **labels):
+        """Return (count, sum) of the observations with these labels."""
+        counts, total = self._values.get(self._key(labels)) or ((), 0)
+        return sum(counts), total
+
+    def samples(self):
+        with self._lock:
+            values = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                yield '_bucket', self._labels(key, ('le', _format_value(bound))), cumulative
+            yield '_sum', self._labels(key), total
+            yield '_count', self._labels(key), cumulative
+
+
+class Registry:
+    """The metrics of a process, created once and looked up by name."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f'Metric {name} is already registered with another type or labels')
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def get(self, name):
+        """The metric registered as `name`, or None."""
+        return self._metrics.get(name)
+
+    def clear(self):
+        """Reset every value (the metrics stay registered)."""
+        for metric in list(self._metrics.values()):
+            metric.clear()
+
+    def snapshot(self):
+        """
+        A picklable copy of the registry, so another process (e.g. a Celery
+        worker) can hand its metrics over through the cache.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return [
+            {
+                'type': metric.type,
+                'name': metric.name,
+                'documentation': metric.documentation,
+                'labelnames': metric.labelnames,
+                'buckets': getattr(metric, 'buckets', None),
+                'values': metric.snapshot(),
+            }
+            for metric in metrics
+        ]
+
+    def merge(self, snapshot):
+        """Add the metrics of a snapshot, registering the missing ones."""
+        for entry in snapshot:
+            if entry['type'] == Histogram.type:
+                buckets = [bound for bound in entry['buckets'] if bound != math.inf]
+                metric = self.histogram(entry['name'], entry['documentation'], entry['labelnames'], buckets)
+            elif entry['type'] == Gauge.type:
+                metric = self.gauge(entry['name'], entry['documentation'], entry['labelnames'])
+            else:
+                metric = self.counter(entry['name'], entry['documentation'], entry['labelnames'])
+            metric.merge(entry['values'])
+
+    def render(self):
+        """The whole registry in the Prometheus text format."""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        return ''.join(metric.render() + '\n' for metric in metrics)
+
+
+REGISTRY = Registry()
+
+
+def worker_name():
+    """Host and pid; prefork children get their own pid after the fork."""
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def publish_snapshot(registry, namespace, timeout):
+    """
+    Store the snapshot of `registry` in the cache for this worker.
+
+    Metrics published this way should carry a `worker` label, so the
+    snapshots of different workers never overlap when collected.
+    """
+    worker = worker_name()
+    index_key = f'{namespace}:workers'
+    try:
+        cache.set(f'{namespace}:{worker}', registry.snapshot(), timeout)
+        workers = cache.get(index_key) or set()
+        if worker not in workers:
+            # Racy between workers, but a worker lost here re-adds itself on its next publish
+            cache.set(index_key, workers | {worker}, timeout)
+    except Exception as e:
+        logger.warning(f'Could not publish {namespace} metrics: {e}')
+
+
+def collect_snapshots(namespace):
+    """A Registry with the snapshots every worker published under `namespace`."""
+    registry = Registry()
+    workers = cache.get(f'{namespace}:workers') or set()
+    snapshots = cache.get_many([f'{namespace}:{worker}' for worker in workers])
+    for snapshot in snapshots.values():
+        registry.merge(snapshot)
+    return registry
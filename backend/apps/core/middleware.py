@@ -0,0 +1,152 @@
+"""
+Request instrumentation.
+
+`RequestMetricsMiddleware` records, for each view name, the wall time,
+number of database queries, time spent in the database (through
+`connection.execute_wrapper`), time spent building serializer data and the
+response size. The values are aggregated into histograms exposed by the
+`/metrics` endpoint; requests slower than SLOW_REQUEST_MS are logged with
+their slowest queries.
+
+Serializer time is measured by `instrument_serializers`, which wraps the
+`data` property of DRF serializers once at startup (see CoreConfig.ready).
+"""
+import contextvars
+import heapq
+import logging
+import time
+
+from django.conf import settings
+from django.db import connection
+
+from .metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+SLOW_REQUEST_MS = getattr(settings, 'SLOW_REQUEST_MS', 1000)
+# Slowest queries included in the slow request log line
+SLOW_REQUEST_TOP_QUERIES = 5
+SQL_LOG_LENGTH = 300
+
+QUERY_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+REQUEST_DURATION = REGISTRY.histogram(
+    'http_request_duration_seconds', 'Wall time of requests.', ['view', 'method'])
+REQUEST_QUERIES = REGISTRY.histogram(
+    'http_request_db_queries', 'Database queries per request.', ['view'], buckets=QUERY_BUCKETS)
+REQUEST_DB_TIME = REGISTRY.histogram(
+    'http_request_db_seconds', 'Time spent in database queries per request.', ['view'])
+REQUEST_SERIALIZER_TIME = REGISTRY.histogram(
+    'http_request_serializer_seconds', 'Time spent building serializer data per request.', ['view'])
+RESPONSE_SIZE = REGISTRY.histogram(
+    'http_response_size_bytes', 'Size of response bodies.', ['view'], buckets=SIZE_BUCKETS)
+REQUESTS = REGISTRY.counter(
+    'http_requests_total', 'Requests served.', ['view', 'method', 'status'])
+
+_current_stats = contextvars.ContextVar('request_stats', default=None)
+
+
+class RequestStats:
+    """Measurements of the request being served; also the query wrapper."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self._top_queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.queries += 1
+            self.db_time += elapsed
+            entry = (elapsed, self.queries, sql)
+            if len(self._top_queries) < SLOW_REQUEST_TOP_QUERIES:
+                heapq.heappush(self._top_queries, entry)
+            else:
+                heapq.heappushpop(self._top_queries, entry)
+
+    def top_queries(self):
+        """The slowest queries as (seconds, sql), slowest first."""
+        return [(elapsed, sql) for elapsed, _, sql in sorted(self._top_queries, reverse=True)]
+
+
+def get_view_name(request):
+    """The URL name of the resolved view, e.g. `events:event_list`."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    return match.view_name or match.route or 'unnamed'
+
+
+def _timed_data(prop):
+    """Wrap a serializer `data` property so its time is added to the request."""
+    def data(self):
+        stats = _current_stats.get()
+        if stats is None or getattr(stats, '_in_serializer', False):
+            return prop.fget(self)
+        # Serializers rendered inside another one are already being timed
+        stats._in_serializer = True
+        start = time.perf_counter()
+        try:
+            return prop.fget(self)
+        finally:
+            stats.serializer_time += time.perf_counter() - start
+            stats._in_serializer = False
+    data._instrumented = True
+    return property(data)
+
+
+def instrument_serializers():
+    """Time `Serializer.data` and `ListSerializer.data`; safe to call twice."""
+    from rest_framework import serializers
+
+    for cls in (serializers.Serializer, serializers.ListSerializer):
+        prop = cls.__dict__['data']
+        if not getattr(prop.fget, '_instrumented', False):
+            cls.data = _timed_data(prop)
+
+
+class RequestMetricsMiddleware:
+    """Record per-view latency, query and response size metrics."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = RequestStats()
+        token = _current_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            with connection.execute_wrapper(stats):
+                response = self.get_response(request)
+        finally:
+            _current_stats.reset(token)
+        duration = time.perf_counter() - start
+
+        view = get_view_name(request)
+        REQUEST_DURATION.observe(duration, view=view, method=request.method)
+        REQUEST_QUERIES.observe(stats.queries, view=view)
+        REQUEST_DB_TIME.observe(stats.db_time, view=view)
+        REQUEST_SERIALIZER_TIME.observe(stats.serializer_time, view=view)
+        REQUESTS.inc(view=view, method=request.method, status=response.status_code)
+        if not response.streaming:
+            RESPONSE_SIZE.observe(len(response.content), view=view)
+
+        if duration * 1000 >= SLOW_REQUEST_MS:
+            self.log_slow_request(request, view, duration, stats)
+        return response
+
+    def log_slow_request(self, request, view, duration, stats):
+        top = '; '.join(
+            f'{elapsed * 1000:.1f}ms {sql[:SQL_LOG_LENGTH]}' for elapsed, sql in stats.top_queries()
+        )
+        logger.warning(
+            f'Slow request {request.method} {request.path} ({view}): {duration * 1000:.0f}ms, '
+            f'{stats.queries} queries in {stats.db_time * 1000:.0f}ms, '
+            f'serializers {stats.serializer_time * 1000:.0f}ms. Top queries: {top or "none"}'
+        )
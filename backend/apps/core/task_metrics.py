@@ -0,0 +1,192 @@
+"""
+Celery task metrics.
+
+The `task_prerun`, `task_postrun` and `task_failure` signals record, for
+each task: run duration, queue wait (from the later of publication and
+`eta` to the start of the run), runs by final state, failures by
+exception, how many tasks are running and when each task last started and
+finished, which shows beat ticks that overlap or fall behind: a run that
+starts before the previous one finished.
+
+While a task runs it can report what it did:
+
+    record_rows(scanned=len(events), acted=notified)
+    record_emails()
+    throttle(delay)  # sleeps, and counts the time slept
+
+Worker processes do not serve `/metrics`, so when a run starts and when
+it finishes the worker stores a snapshot of TASK_REGISTRY in the cache
+(shared when CACHE_URL is set) and `collect_task_metrics` merges the
+snapshots of every worker. A prefork child runs one task at a time, so
+its running gauge is only ever seen at 1 thanks to the snapshot taken at
+start; summed across workers it counts the overlapping runs.
+Every metric carries a `worker` label, so the snapshots never overlap.
+"""
+import contextvars
+import time
+from datetime import datetime
+
+from celery.signals import before_task_publish, task_failure, task_postrun, task_prerun
+from django.conf import settings
+
+from .metrics import Registry, collect_snapshots, publish_snapshot, worker_name
+
+# Snapshots of workers that stopped running tasks expire after this long
+TASK_METRICS_TIMEOUT = getattr(settings, 'CELERY_METRICS_TIMEOUT', 60 * 60 * 24)
+TASK_METRICS_NAMESPACE = 'celery_metrics'
+SENT_AT_HEADER = 'talkabout_sent_at'
+
+# Seconds, up to ten minutes: reminder tasks sleep between emails
+TASK_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 120, 300, 600)
+
+TASK_REGISTRY = Registry()
+TASK_DURATION = TASK_REGISTRY.histogram(
+    'celery_task_duration_seconds', 'Run time of tasks.', ['task', 'worker'], buckets=TASK_BUCKETS)
+TASK_QUEUE_WAIT = TASK_REGISTRY.histogram(
+    'celery_task_queue_wait_seconds', 'Time between publication (or eta) and start of tasks.',
+    ['task', 'worker'], buckets=TASK_BUCKETS)
+TASK_RUNS = TASK_REGISTRY.counter(
+    'celery_task_runs_total', 'Finished task runs by state.', ['task', 'worker', 'state'])
+TASK_FAILURES = TASK_REGISTRY.counter(
+    'celery_task_failures_total', 'Failed task runs by exception.', ['task', 'worker', 'exception'])
+TASKS_RUNNING = TASK_REGISTRY.gauge(
+    'celery_tasks_running', 'Tasks currently running.', ['task', 'worker'])
+TASK_ROWS_SCANNED = TASK_REGISTRY.counter(
+    'celery_task_rows_scanned_total', 'Rows examined by tasks.', ['task', 'worker'])
+TASK_ROWS_ACTED = TASK_REGISTRY.counter(
+    'celery_task_rows_acted_total', 'Rows changed or acted on by tasks.', ['task', 'worker'])
+TASK_EMAILS = TASK_REGISTRY.counter(
+    'celery_task_emails_total', 'Emails sent by tasks.', ['task', 'worker'])
+TASK_EMAIL_RATE = TASK_REGISTRY.gauge(
+    'celery_task_emails_per_second', 'Emails per second of the last run that sent any.', ['task', 'worker'])
+TASK_THROTTLE = TASK_REGISTRY.counter(
+    'celery_task_throttle_seconds_total', 'Time tasks slept to throttle emails.', ['task', 'worker'])
+TASK_LAST_START = TASK_REGISTRY.gauge(
+    'celery_task_last_start_timestamp_seconds', 'Unix time at which tasks last started.', ['task', 'worker'])
+TASK_LAST_RUN = TASK_REGISTRY.gauge(
+    'celery_task_last_run_timestamp_seconds', 'Unix time at which tasks last finished.', ['task', 'worker'])
+
+
+class TaskStats:
+    """What the running task reported."""
+
+    def __init__(self, name):
+        self.name = name
+        self.started = time.perf_counter()
+        self.scanned = 0
+        self.acted = 0
+        self.emails = 0
+        self.throttle_time = 0.0
+
+
+_current_task = contextvars.ContextVar('task_stats', default=None)
+# task_id -> TaskStats of the runs in progress in this process
+_running = {}
+
+
+def record_rows(scanned=0, acted=0):
+    """Count rows examined / acted on by the running task."""
+    stats = _current_task.get()
+    if stats is not None:
+        stats.scanned += scanned
+        stats.acted += acted
+
+
+def record_emails(count=1):
+    """Count emails sent by the running task."""
+    stats = _current_task.get()
+    if stats is not None:
+        stats.emails += count
+
+
+def throttle(seconds):
+    """Sleep between emails, counting the time against the running task."""
+    if seconds <= 0:
+        return
+    time.sleep(seconds)
+    stats = _current_task.get()
+    if stats is not None:
+        stats.throttle_time += seconds
+
+
+def _parse_eta(eta):
+    if not eta:
+        return None
+    if isinstance(eta, datetime):
+        return eta.timestamp()
+    try:
+        return datetime.fromisoformat(eta).timestamp()
+    except ValueError:
+        return None
+
+
+def queue_wait(request, now=None):
+    """Seconds the task waited between being due and starting, or None."""
+    now = now or time.time()
+    due = [
+        value for value in (getattr(request, SENT_AT_HEADER, None), _parse_eta(getattr(request, 'eta', None)))
+        if value is not None
+    ]
+    if not due:
+        return None
+    return max(0.0, now - max(due))
+
+
+@before_task_publish.connect
+def stamp_sent_at(headers=None, **kwargs):
+    if headers is not None:
+        headers.setdefault(SENT_AT_HEADER, time.time())
+
+
+@task_prerun.connect
+def task_started(task_id=None, task=None, **kwargs):
+    stats = TaskStats(task.name)
+    _running[task_id] = stats
+    _current_task.set(stats)
+
+    worker = worker_name()
+    TASKS_RUNNING.inc(task=task.name, worker=worker)
+    TASK_LAST_START.set(time.time(), task=task.name, worker=worker)
+    wait = queue_wait(task.request)
+    if wait is not None:
+        TASK_QUEUE_WAIT.observe(wait, task=task.name, worker=worker)
+
+    publish_task_metrics()
+
+
+@task_failure.connect
+def task_failed(sender=None, exception=None, **kwargs):
+    TASK_FAILURES.inc(task=sender.name, worker=worker_name(), exception=type(exception).__name__)
+
+
+@task_postrun.connect
+def task_finished(task_id=None, task=None, state=None, **kwargs):
+    stats = _running.pop(task_id, None)
+    _current_task.set(None)
+    if stats is None:
+        return
+    duration = time.perf_counter() - stats.started
+
+    labels = {'task': task.name, 'worker': worker_name()}
+    TASKS_RUNNING.dec(**labels)
+    TASK_DURATION.observe(duration, **labels)
+    TASK_RUNS.inc(state=state or 'UNKNOWN', **labels)
+    TASK_ROWS_SCANNED.inc(stats.scanned, **labels)
+    TASK_ROWS_ACTED.inc(stats.acted, **labels)
+    TASK_THROTTLE.inc(stats.throttle_time, **labels)
+    if stats.emails:
+        TASK_EMAILS.inc(stats.emails, **labels)
+        TASK_EMAIL_RATE.set(stats.emails / duration if duration else 0, **labels)
+    TASK_LAST_RUN.set(time.time(), **labels)
+
+    publish_task_metrics()
+
+
+def publish_task_metrics():
+    """Store the snapshot of this worker in the cache."""
+    publish_snapshot(TASK_REGISTRY, TASK_METRICS_NAMESPACE, TASK_METRICS_TIMEOUT)
+
+
+def collect_task_metrics():
+    """A Registry with the metrics of every worker that published recently."""
+    return collect_snapshots(TASK_METRICS_NAMESPACE)
@@ -0,0 +1,87 @@
+"""
+Query-count assertions for the test suites.
+
+An N+1 query is cheap with the handful of rows a test usually creates, so
+`assertQueriesDoNotGrow` serves the same request with a small and with a
+larger fixture and fails if the larger one issued more queries: whatever
+the page shows, the number of queries must not depend on it. It also
+bounds the count, so a new constant query is a deliberate change to the
+budget rather than an accident.
+
+    def test_event_list_queries(self):
+        self.assertQueriesDoNotGrow(
+            lambda: self.client.get(reverse('events:event_list_create')),
+            seed=self.create_events,
+            max_queries=3
+        )
+
+`seed(n)` must add `n` more rows; it runs before each measurement.
+"""
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+# Both below the default page size (20), so the larger page really is larger
+SMALL_FIXTURE = 3
+LARGE_FIXTURE = 15
+
+
+class QueryCountTestMixin:
+    """Mixin for TestCase classes asserting query budgets."""
+
+    def capture_queries(self, func):
+        """
+        Run `func` and return (result, captured queries).
+
+        The cache is cleared first so a cached response cannot hide queries;
+        a streaming response is consumed inside the capture.
+        """
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            result = func()
+            if getattr(result, 'streaming', False):
+                b''.join(result.streaming_content)
+        return result, context.captured_queries
+
+    def _check_response(self, response):
+        status_code = getattr(response, 'status_code', None)
+        if status_code is not None:
+            self.assertLess(status_code, 400, f'Request failed with status {status_code}')
+
+    def _format_queries(self, queries):
+        return '\n'.join(f"{index}. {query['sql']}" for index, query in enumerate(queries, start=1))
+
+    def assertMaxQueries(self, max_queries, func):
+        """Run `func`, fail if it issued more than `max_queries` queries; return its result."""
+        result, queries = self.capture_queries(func)
+        self._check_response(result)
+        self.assertLessEqual(
+            len(queries), max_queries,
+            f'{len(queries)} queries, budget is {max_queries}:\n{self._format_queries(queries)}'
+        )
+        return result
+
+    def assertQueriesDoNotGrow(self, func, seed, max_queries, small=SMALL_FIXTURE, large=LARGE_FIXTURE):
+        """
+        Run `func` after seeding `small` rows, then after seeding up to `large`;
+        fail if the second run issued more queries than the first, or more
+        than `max_queries`. Returns the result of the second run.
+        """
+        seed(small)
+        result, few = self.capture_queries(func)
+        self._check_response(result)
+
+        seed(large - small)
+        result, many = self.capture_queries(func)
+        self._check_response(result)
+
+        self.assertLessEqual(
+            len(many), len(few),
+            f'Query count grew from {len(few)} to {len(many)} with {large} rows instead of {small}:\n'
+            f'{self._format_queries(many)}'
+        )
+        self.assertLessEqual(
+            len(many), max_queries,
+            f'{len(many)} queries, budget is {max_queries}:\n{self._format_queries(many)}'
+        )
+        return result
@@ -0,0 +1,244 @@
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
+
+from celery import shared_task
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from apps.activities.models import Activity
+from apps.events.models import Enrollment, Event
+from apps.events.tasks import cleanup_old_events, send_first_reminders
+
+from . import middleware, task_metrics
+from .metrics import Registry
+
+User = get_user_model()
+
+
+class RegistryTests(TestCase):
+    """Test the Prometheus text rendering of the metrics registry."""
+
+    def setUp(self):
+        self.registry = Registry()
+
+    def test_counter_and_gauge(self):
+        counter = self.registry.counter('jobs_total', 'Jobs run.', ['queue'])
+        gauge = self.registry.gauge('sockets', 'Open sockets.')
+        counter.inc(queue='default')
+        counter.inc(2, queue='default')
+        gauge.inc()
+        gauge.inc()
+        gauge.dec()
+
+        text = self.registry.render()
+        self.assertIn('# TYPE jobs_total counter', text)
+        self.assertIn('jobs_total{queue="default"} 3', text)
+        self.assertIn('sockets 1', text)
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = self.registry.histogram('latency_seconds', 'Latency.', ['view'], buckets=(0.1, 1))
+        for value in (0.05, 0.5, 0.7, 3):
+            histogram.observe(value, view='a')
+
+        text = self.registry.render()
+        self.assertIn('latency_seconds_bucket{view="a",le="0.1"} 1', text)
+        self.assertIn('latency_seconds_bucket{view="a",le="1"} 3', text)
+        self.assertIn('latency_seconds_bucket{view="a",le="+Inf"} 4', text)
+        self.assertIn('latency_seconds_count{view="a"} 4', text)
+        self.assertEqual(histogram.get(view='a'), (4, 4.25))
+
+    def test_label_values_are_escaped(self):
+        counter = self.registry.counter('paths_total', 'Paths.', ['path'])
+        counter.inc(path='a"b\\c')
+        self.assertIn('paths_total{path="a\\"b\\\\c"} 1', self.registry.render())
+
+    def test_snapshot_merge(self):
+        histogram = self.registry.histogram('merged_seconds', 'Merged.', ['worker'], buckets=(1,))
+        histogram.observe(0.5, worker='a')
+
+        other = Registry()
+        other.merge(self.registry.snapshot())
+
+        self.assertEqual(other.render(), self.registry.render())
+
+    def test_labels_must_match(self):
+        counter = self.registry.counter('labelled_total', 'Labelled.', ['view'])
+        with self.assertRaises(ValueError):
+            counter.inc(method='GET')
+        with self.assertRaises(ValueError):
+            self.registry.gauge('labelled_total', 'Same name, other type.', ['view'])
+
+
+class RequestMetricsMiddlewareTests(APITestCase):
+    """Test the per-view request metrics and the /metrics endpoint."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            user_code='metrics_user',
+            email='metrics@example.com',
+            password='testpass123',
+            role=User.Role.TEACHER
+        )
+        Activity.objects.create(code='METRICS', title='Metrics', description='Metrics', created_by=self.user)
+        self.client.force_authenticate(user=self.user)
+        self.view = 'activities:activity_list'
+
+    def test_records_request_metrics_per_view(self):
+        requests_before = middleware.REQUESTS.get(view=self.view, method='GET', status=200)
+        queries_before = middleware.REQUEST_QUERIES.get(view=self.view)
+        serializer_before = middleware.REQUEST_SERIALIZER_TIME.get(view=self.view)
+
+        response = self.client.get(reverse('activities:activity_list'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            middleware.REQUESTS.get(view=self.view, method='GET', status=200), requests_before + 1
+        )
+        count, total = middleware.REQUEST_QUERIES.get(view=self.view)
+        self.assertEqual(count, queries_before[0] + 1)
+        self.assertGreater(total, queries_before[1])
+        count, total = middleware.REQUEST_SERIALIZER_TIME.get(view=self.view)
+        self.assertEqual(count, serializer_before[0] + 1)
+        self.assertGreater(total, serializer_before[1])
+        count, total = middleware.RESPONSE_SIZE.get(view=self.view)
+        self.assertGreaterEqual(total, len(response.content))
+
+    def test_slow_requests_are_logged_with_top_queries(self):
+        with mock.patch.object(middleware, 'SLOW_REQUEST_MS', 0):
+            with self.assertLogs('apps.core.middleware', level='WARNING') as logs:
+                self.client.get(reverse('activities:activity_list'))
+
+        self.assertIn(self.view, logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
+
+    def test_metrics_endpoint_renders_prometheus_text(self):
+        self.client.get(reverse('activities:activity_list'))
+
+        response = self.client.get(reverse('metrics'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        self.assertIn(f'http_requests_total{{view="{self.view}",method="GET",status="200"}}', response.content.decode())
+
+    def test_metrics_endpoint_is_local_only(self):
+        response = self.client.get(reverse('metrics'), REMOTE_ADDR='203.0.113.7')
+
+        self.assertEqual(response.status_code, 403)
+
+
+@shared_task
+def failing_task():
+    raise ValueError('boom')
+
+
+@shared_task
+def collecting_task():
+    """What another process reading the published metrics sees during the run."""
+    labels = {'task': collecting_task.name, 'worker': task_metrics.worker_name()}
+    registry = task_metrics.collect_task_metrics()
+    return {
+        'running': registry.get('celery_tasks_running').get(**labels),
+        'started': registry.get('celery_task_last_start_timestamp_seconds').get(**labels),
+    }
+
+
+class TaskMetricsTests(TestCase):
+    """Test the Celery task metrics collected through signals."""
+
+    def setUp(self):
+        cache.clear()
+        self.worker = task_metrics.worker_name()
+        teacher = User.objects.create_user(
+            user_code='teacher_001',
+            email='teacher@example.com',
+            password='teacherpass123',
+            role=User.Role.TEACHER
+        )
+        self.activity = Activity.objects.create(
+            code='ACT001', title='Test Activity', description='<p>Description</p>', created_by=teacher
+        )
+
+    def labels(self, task):
+        return {'task': task.name, 'worker': self.worker}
+
+    def test_records_runs_and_rows(self):
+        start = timezone.now() - timedelta(hours=3)
+        Event.objects.create(activity=self.activity, start_datetime=start, end_datetime=start + timedelta(hours=1))
+        labels = self.labels(cleanup_old_events)
+        runs_before = task_metrics.TASK_RUNS.get(state='SUCCESS', **labels)
+        acted_before = task_metrics.TASK_ROWS_ACTED.get(**labels)
+
+        cleanup_old_events.apply()
+
+        self.assertEqual(task_metrics.TASK_RUNS.get(state='SUCCESS', **labels), runs_before + 1)
+        self.assertEqual(task_metrics.TASK_ROWS_ACTED.get(**labels), acted_before + 1)
+        self.assertEqual(task_metrics.TASKS_RUNNING.get(**labels), 0)
+
+    def test_records_emails_and_throttle(self):
+        student = User.objects.create_user(
+            user_code='student_001', email='student@example.com', password='studentpass123'
+        )
+        start = timezone.now() + timedelta(minutes=30)
+        event = Event.objects.create(
+            activity=self.activity,
+            start_datetime=start,
+            end_datetime=start + timedelta(hours=1),
+            first_reminder_minutes=60
+        )
+        Enrollment.objects.create(user=student, event=event)
+        labels = self.labels(send_first_reminders)
+        emails_before = task_metrics.TASK_EMAILS.get(**labels)
+        throttle_before = task_metrics.TASK_THROTTLE.get(**labels)
+
+        with mock.patch.dict('os.environ', {'EMAIL_THROTTLE_DELAY': '0.5'}), \
+                mock.patch.object(task_metrics.time, 'sleep') as sleep:
+            send_first_reminders.apply()
+
+        sleep.assert_called_once_with(0.5)
+        self.assertEqual(task_metrics.TASK_EMAILS.get(**labels), emails_before + 1)
+        self.assertEqual(task_metrics.TASK_THROTTLE.get(**labels), throttle_before + 0.5)
+        self.assertGreater(task_metrics.TASK_EMAIL_RATE.get(**labels), 0)
+
+    def test_records_failures(self):
+        labels = self.labels(failing_task)
+        failures_before = task_metrics.TASK_FAILURES.get(exception='ValueError', **labels)
+
+        with self.assertLogs('celery.app.trace', level='ERROR'):
+            failing_task.apply()
+
+        self.assertEqual(task_metrics.TASK_FAILURES.get(exception='ValueError', **labels), failures_before + 1)
+        self.assertGreaterEqual(task_metrics.TASK_RUNS.get(state='FAILURE', **labels), 1)
+
+    def test_running_task_is_published(self):
+        """Test that a run in progress is visible to /metrics, not only its end."""
+        labels = self.labels(collecting_task)
+
+        seen = collecting_task.apply().get()
+
+        self.assertEqual(seen['running'], 1)
+        self.assertGreater(seen['started'], 0)
+        self.assertEqual(task_metrics.TASKS_RUNNING.get(**labels), 0)
+
+    def test_queue_wait_uses_publication_and_eta(self):
+        now = time.time()
+        eta = timezone.now() - timedelta(seconds=5)
+        request = SimpleNamespace(eta=eta.isoformat(), **{task_metrics.SENT_AT_HEADER: now - 60})
+
+        self.assertAlmostEqual(task_metrics.queue_wait(request, now=now), 5, delta=1)
+        self.assertIsNone(task_metrics.queue_wait(SimpleNamespace(eta=None), now=now))
+
+    def test_metrics_endpoint_includes_published_task_metrics(self):
+        cleanup_old_events.apply()
+
+        response = self.client.get(reverse('metrics'))
+
+        self.assertIn(
+            f'celery_task_runs_total{{task="{cleanup_old_events.name}",worker="{self.worker}",state="SUCCESS"}}',
+            response.content.decode()
+        )
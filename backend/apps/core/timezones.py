@@ -0,0 +1,50 @@
+"""
+Memoized timezone lookups and per-request localization.
+
+`pytz.timezone()` normalizes and validates the name on every call; hot
+paths (batch conversions, serializing lists of events) resolve the same
+handful of zones over and over, so lookups are cached per process.
+"""
+from functools import lru_cache
+
+import pytz
+
+LOCALIZE_PARAM = 'localize'
+
+
+@lru_cache(maxsize=1024)
+def get_timezone(name):
+    """
+    Return the tzinfo for `name`.
+
+    Raises pytz.UnknownTimeZoneError for unknown names (failures are not cached).
+    """
+    return pytz.timezone(name)
+
+
+def is_valid_timezone(name):
+    """Return True if `name` is a known timezone."""
+    try:
+        get_timezone(name)
+    except pytz.UnknownTimeZoneError:
+        return False
+    return True
+
+
+def get_request_timezone(request):
+    """
+    Return the user's tzinfo when the request asks for localized times
+    with `?localize=true`, or None otherwise.
+    """
+    if request is None:
+        return None
+    params = getattr(request, 'query_params', request.GET)
+    if params.get(LOCALIZE_PARAM, '').lower() not in ('true', '1'):
+        return None
+
+    user = getattr(request, 'user', None)
+    name = getattr(user, 'timezone', None) or 'UTC'
+    try:
+        return get_timezone(name)
+    except pytz.UnknownTimeZoneError:
+        return pytz.UTC
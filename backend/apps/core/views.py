@@ -0,0 +1,29 @@
+"""
+Views for the core app.
+"""
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+from .metrics import CONTENT_TYPE, REGISTRY
+from .task_metrics import collect_task_metrics
+
+METRICS_ALLOWED_IPS = getattr(settings, 'METRICS_ALLOWED_IPS', ('127.0.0.1', '::1'))
+
+
+def metrics_view(request):
+    """
+    Expose the metrics of this process, those published by the Celery and
+    ASGI workers and the JWT table sizes, in the Prometheus text format.
+
+    Only reachable from METRICS_ALLOWED_IPS (the local host by default);
+    it is a plain Django view so scraping does not touch authentication.
+    """
+    if request.META.get('REMOTE_ADDR') not in METRICS_ALLOWED_IPS:
+        return HttpResponseForbidden('Metrics are only available locally.')
+    from apps.events.socket_metrics import collect_socket_metrics
+    from apps.users.tokens import token_table_metrics
+
+    body = ''.join(registry.render() for registry in (
+        REGISTRY, collect_task_metrics(), collect_socket_metrics(), token_table_metrics()
+    ))
+    return HttpResponse(body, content_type=CONTENT_TYPE)
@@ -1,14 +1,24 @@
 from django.contrib import admin
-from .models import Event, Enrollment
+from django.db.models import Count, Q
 
+from .models import ArchivedEvent, Event, EventSchedule, Enrollment
+from apps.activities.rollups import mark_enrollment_days_dirty
+from apps.core.admin import RawIdTabularInline
 
-class EnrollmentInline(admin.TabularInline):
+
+class EnrollmentInline(RawIdTabularInline):
     """Inline admin for enrollments."""
     model = Enrollment
     extra = 0
+    # A select would query and render every user once per row; see RawIdTabularInline
+    raw_id_fields = ('user',)
     readonly_fields = ('enrolled_at', 'unsubscribe_token', 'updated_at')
     can_delete = False
 
+    def get_queryset(self, request):
+        # Each row is labelled with str(enrollment), which reaches the activity
+        return super().get_queryset(request).select_related('user', 'event__activity')
+
 
 @admin.register(Event)
 class EventAdmin(admin.ModelAdmin):
@@ -38,7 +48,7 @@ class EventAdmin(admin.ModelAdmin):
 
     fieldsets = (
         ('Activity', {
-            'fields': ('activity', 'status')
+            'fields': ('activity', 'schedule', 'status')
         }),
         ('Date & Time', {
             'fields': ('start_datetime', 'end_datetime', 'waiting_time_minutes')
@@ -62,15 +72,22 @@ class EventAdmin(admin.ModelAdmin):
         }),
     )
 
-    @admin.display(description='Enrolled')
+    def get_queryset(self, request):
+        """Count enrollments in the changelist query instead of once per row."""
+        return super().get_queryset(request).select_related('activity').annotate(
+            enrolled_count=Count('enrollments', filter=Q(enrollments__status=Enrollment.Status.ENROLLED)),
+            attended_count=Count('enrollments', filter=Q(enrollments__status=Enrollment.Status.ATTENDED)),
+        )
+
+    @admin.display(description='Enrolled', ordering='enrolled_count')
     def get_enrolled_count(self, obj):
         """Get count of enrolled users."""
-        return obj.enrollments.filter(status=Enrollment.Status.ENROLLED).count()
+        return obj.enrolled_count
 
-    @admin.display(description='Attended')
+    @admin.display(description='Attended', ordering='attended_count')
     def get_attended_count(self, obj):
         """Get count of attended users."""
-        return obj.enrollments.filter(status=Enrollment.Status.ATTENDED).count()
+        return obj.attended_count
 
 
 @admin.register(Enrollment)
@@ -95,3 +112,38 @@ class EnrollmentAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+
+    # Enrollments have no delete signal (see apps/activities/signals.py)
+    def delete_model(self, request, obj):
+        mark_enrollment_days_dirty(Enrollment.objects.filter(pk=obj.pk))
+        super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        mark_enrollment_days_dirty(queryset)
+        super().delete_queryset(request, queryset)
+
+
+@admin.register(EventSchedule)
+class EventScheduleAdmin(admin.ModelAdmin):
+    """Admin configuration for EventSchedule model."""
+
+    list_display = ('activity', 'rrule', 'dtstart', 'duration_minutes', 'is_active', 'materialized_until')
+    list_filter = ('is_active', 'activity')
+    search_fields = ('activity__code', 'activity__title')
+    readonly_fields = ('materialized_until', 'created_at', 'updated_at')
+
+
+@admin.register(ArchivedEvent)
+class ArchivedEventAdmin(admin.ModelAdmin):
+    """Read-only admin for archived events."""
+
+    list_display = ('activity', 'start_datetime', 'status', 'meetings_count', 'archived_at')
+    list_filter = ('status', 'activity')
+    search_fields = ('activity__code', 'activity__title')
+    date_hierarchy = 'start_datetime'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,137 @@
+"""
+Archival of finished events.
+
+Completed and cancelled events that ended more than EVENT_ARCHIVE_AFTER_DAYS
+ago are moved, together with their enrollments, waiting room entries and
+meeting participants, into the `archived_*` tables. The hot tables then
+only hold recent history, while event statistics and the activity rollups
+read both.
+
+Each batch is copied and deleted in its own transaction, so the command
+can be interrupted and resumed at any point. The copied rows are deleted
+through the ORM, children first, so the delete signals still run: the
+rollup days of the archived events are flagged dirty and recomputed (to
+the same values, since the rollups read the archive too) on the next
+refresh.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from apps.meetings.models import ArchivedMeetingParticipant, Meeting, MeetingParticipant
+
+from .models import (
+    ArchivedEnrollment,
+    ArchivedEvent,
+    ArchivedWaitingRoomParticipant,
+    Enrollment,
+    Event,
+    WaitingRoomParticipant,
+)
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_AFTER_DAYS = getattr(settings, 'EVENT_ARCHIVE_AFTER_DAYS', 180)
+ARCHIVE_BATCH_SIZE = getattr(settings, 'EVENT_ARCHIVE_BATCH_SIZE', 500)
+ARCHIVABLE_STATUSES = (Event.Status.COMPLETED, Event.Status.CANCELLED)
+
+EVENT_FIELDS = (
+    'id', 'activity_id', 'schedule_id', 'start_datetime', 'end_datetime', 'status',
+    'waiting_time_minutes', 'first_reminder_minutes', 'second_reminder_minutes',
+    'created_at', 'updated_at',
+)
+
+
+def archive_cutoff(days=None, now=None):
+    """Events that ended before this datetime can be archived."""
+    days = ARCHIVE_AFTER_DAYS if days is None else days
+    return (now or timezone.now()) - timedelta(days=days)
+
+
+def archivable_events(before):
+    """Finished events that ended before `before`, oldest first."""
+    return Event.objects.filter(
+        status__in=ARCHIVABLE_STATUSES,
+        end_datetime__lt=before
+    ).order_by('end_datetime')
+
+
+def archive_batch(event_ids):
+    """
+    Move the given events and their related rows to the archive tables.
+
+    Returns the number of events archived.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        events = list(
+            Event.objects
+            .filter(pk__in=event_ids, status__in=ARCHIVABLE_STATUSES)
+            .annotate(num_meetings=Count('meetings'))
+            .values(*EVENT_FIELDS, 'num_meetings')
+        )
+        if not events:
+            return 0
+        ids = [event['id'] for event in events]
+
+        ArchivedEvent.objects.bulk_create([
+            ArchivedEvent(meetings_count=event.pop('num_meetings'), archived_at=now, **event)
+            for event in events
+        ])
+        ArchivedEnrollment.objects.bulk_create([
+            ArchivedEnrollment(**row)
+            for row in Enrollment.objects.filter(event_id__in=ids).values(
+                'id', 'user_id', 'event_id', 'enrolled_at', 'status', 'updated_at')
+        ], batch_size=1000)
+        ArchivedWaitingRoomParticipant.objects.bulk_create([
+            ArchivedWaitingRoomParticipant(**row)
+            for row in WaitingRoomParticipant.objects.filter(event_id__in=ids).values(
+                'id', 'event_id', 'user_id', 'joined_at', 'last_seen', 'status')
+        ], batch_size=1000)
+        ArchivedMeetingParticipant.objects.bulk_create([
+            ArchivedMeetingParticipant(
+                id=row['id'],
+                event_id=row['meeting__event_id'],
+                meeting_id=row['meeting__meeting_id'],
+                user_id=row['user_id'],
+                joined_at=row['joined_at'],
+                status=row['status'],
+                updated_at=row['updated_at'],
+            )
+            for row in MeetingParticipant.objects.filter(meeting__event_id__in=ids).values(
+                'id', 'meeting__event_id', 'meeting__meeting_id', 'user_id', 'joined_at', 'status', 'updated_at')
+        ], batch_size=1000)
+
+        MeetingParticipant.objects.filter(meeting__event_id__in=ids).delete()
+        Meeting.objects.filter(event_id__in=ids).delete()
+        WaitingRoomParticipant.objects.filter(event_id__in=ids).delete()
+        Enrollment.objects.filter(event_id__in=ids).delete()
+        Event.objects.filter(pk__in=ids).delete()
+
+    return len(ids)
+
+
+def archive_events(before, batch_size=ARCHIVE_BATCH_SIZE, max_batches=None):
+    """
+    Archive every event that ended before `before`, `batch_size` at a time.
+
+    Stops after `max_batches` batches when given. Returns the number of
+    events archived.
+    """
+    archived = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        event_ids = list(archivable_events(before).values_list('pk', flat=True)[:batch_size])
+        if not event_ids:
+            break
+
+        count = archive_batch(event_ids)
+        archived += count
+        batches += 1
+        logger.info(f'Archived batch {batches}: {count} events')
+
+    return archived
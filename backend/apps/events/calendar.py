@@ -0,0 +1,252 @@
+"""
+iCalendar (.ics) feeds for a user's enrolled events and for an activity's schedule.
+
+Calendar clients cannot send our JWT, so feeds are addressed with a signed
+token that identifies the user. Each feed has an ETag derived from a
+single aggregate query (row count and latest `updated_at` of the events,
+their activities and, for user feeds, the user's enrollments), which
+changes whenever an enrollment or event is saved. Bodies are cached under
+that ETag, so unchanged feeds are served from the cache or answered with
+304.
+
+Activity feeds also list the not yet materialized occurrences of the
+activity's recurring schedules. Occurrences use a UID derived from the
+schedule and start time, which the event keeps once it is materialized.
+Their window rolls with the (UTC) day it starts on, which is part of the
+ETag, so a cached body never outlives its window.
+"""
+import hashlib
+from datetime import timedelta, timezone as dt_timezone
+from itertools import chain
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+
+from .models import Event, Enrollment
+from .scheduling import active_schedules, virtual_occurrences
+
+FEED_TOKEN_SALT = 'apps.events.calendar'
+FEED_CACHE_TIMEOUT = getattr(settings, 'CALENDAR_FEED_CACHE_TIMEOUT', 60 * 60)
+# Activity feeds include events that started up to this many days ago
+ACTIVITY_FEED_PAST_DAYS = getattr(settings, 'CALENDAR_ACTIVITY_FEED_PAST_DAYS', 30)
+# ...and occurrences of recurring schedules up to this many days ahead
+ACTIVITY_FEED_FUTURE_DAYS = getattr(settings, 'CALENDAR_ACTIVITY_FEED_FUTURE_DAYS', 90)
+
+PRODUCT_ID = '-//Talkabout//Events//EN'
+EVENT_FIELDS = (
+    'id',
+    'schedule_id',
+    'start_datetime',
+    'end_datetime',
+    'status',
+    'updated_at',
+    'activity__code',
+    'activity__title',
+)
+ICS_STATUS = {
+    Event.Status.CANCELLED: 'CANCELLED',
+}
+
+
+def make_feed_token(user):
+    """Return the signed token that identifies `user` in feed URLs."""
+    return signing.dumps(str(user.id), salt=FEED_TOKEN_SALT)
+
+
+def read_feed_token(token):
+    """Return the user id in a feed token, or None if the token is invalid."""
+    try:
+        return signing.loads(token, salt=FEED_TOKEN_SALT)
+    except signing.BadSignature:
+        return None
+
+
+def user_feed_events(user_id):
+    """Events the user is enrolled in (or attended), as dicts."""
+    return (
+        Event.objects
+        .filter(
+            enrollments__user_id=user_id,
+            enrollments__status__in=[Enrollment.Status.ENROLLED, Enrollment.Status.ATTENDED]
+        )
+        .order_by('start_datetime')
+        .values(*EVENT_FIELDS)
+    )
+
+
+def feed_window_start():
+    """Start of the current UTC day; activity feed windows are relative to it."""
+    return timezone.now().astimezone(dt_timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def activity_feed_events(activity):
+    """Recent and upcoming events of an activity, as dicts."""
+    since = feed_window_start() - timedelta(days=ACTIVITY_FEED_PAST_DAYS)
+    return (
+        Event.objects
+        .filter(activity=activity, start_datetime__gte=since)
+        .order_by('start_datetime')
+        .values(*EVENT_FIELDS)
+    )
+
+
+def activity_feed_occurrences(activity):
+    """
+    Return (occurrences, state) for the activity's recurring schedules.
+
+    `occurrences` are the virtual (not materialized) occurrences from the
+    start of today up to ACTIVITY_FEED_FUTURE_DAYS ahead; `state` changes
+    whenever a schedule or the window does and is folded into the feed ETag.
+    """
+    window_start = feed_window_start()
+    until = window_start + timedelta(days=ACTIVITY_FEED_FUTURE_DAYS)
+    schedules = list(active_schedules(activity))
+
+    occurrences = []
+    for schedule in schedules:
+        for occurrence in virtual_occurrences(schedule, window_start, until):
+            occurrence['activity__code'] = activity.code
+            occurrence['activity__title'] = activity.title
+            occurrences.append(occurrence)
+
+    state = ';'.join(
+        [window_start.date().isoformat()] +
+        [f'{schedule.id}:{schedule.updated_at.isoformat()}' for schedule in schedules]
+    )
+    return occurrences, state
+
+
+def feed_etag(events, extra_state='', track_enrollments=False):
+    """
+    Compute a feed ETag with one aggregate query.
+
+    Adding, removing or saving any event in the feed changes either the
+    count or the latest `updated_at`; activity renames are covered too.
+    With `track_enrollments` (user feeds, whose `events` are filtered on
+    the user's enrollments) the latest enrollment change is included as
+    well, so swapping one enrollment for an older event is not missed.
+    """
+    aggregates = {
+        'count': Count('id'),
+        'events_updated': Max('updated_at'),
+        'activities_updated': Max('activity__updated_at'),
+    }
+    if track_enrollments:
+        # Reuses the join of the enrollment filter: only the user's rows
+        aggregates['enrollments_updated'] = Max('enrollments__updated_at')
+    state = events.order_by().aggregate(**aggregates)
+    raw = '|'.join(str(state[key]) for key in aggregates)
+    return hashlib.sha1(f'{raw}|{extra_state}'.encode()).hexdigest()
+
+
+def _escape(text):
+    """Escape a TEXT value (RFC 5545 section 3.3.11)."""
+    return (
+        str(text)
+        .replace('\\', '\\\\')
+        .replace(';', '\\;')
+        .replace(',', '\\,')
+        .replace('\n', '\\n')
+    )
+
+
+def _fold(line):
+    """Fold a content line at 75 octets (RFC 5545 section 3.1)."""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line + '\r\n'
+
+    parts = []
+    while len(encoded) > 75:
+        cut = 75 if not parts else 74
+        # Do not split a multi-byte character
+        while cut > 0 and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode('utf-8'))
+        encoded = encoded[cut:]
+    parts.append(encoded.decode('utf-8'))
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def _format_datetime(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _uid(event):
+    """Stable UID; scheduled events keep the UID of their virtual occurrence."""
+    if event['schedule_id']:
+        return f"{event['schedule_id']}-{_format_datetime(event['start_datetime'])}@talkabout"
+    return f"{event['id']}@talkabout"
+
+
+def iter_calendar(events, name, extra=()):
+    """Yield the lines of a VCALENDAR with one VEVENT per event dict."""
+    yield _fold('BEGIN:VCALENDAR')
+    yield _fold('VERSION:2.0')
+    yield _fold(f'PRODID:{PRODUCT_ID}')
+    yield _fold('CALSCALE:GREGORIAN')
+    yield _fold('METHOD:PUBLISH')
+    yield _fold(f'X-WR-CALNAME:{_escape(name)}')
+
+    for event in chain(events.iterator(chunk_size=500), extra):
+        yield _fold('BEGIN:VEVENT')
+        yield _fold(f"UID:{_uid(event)}")
+        yield _fold(f"DTSTAMP:{_format_datetime(event['updated_at'])}")
+        yield _fold(f"LAST-MODIFIED:{_format_datetime(event['updated_at'])}")
+        yield _fold(f"DTSTART:{_format_datetime(event['start_datetime'])}")
+        yield _fold(f"DTEND:{_format_datetime(event['end_datetime'])}")
+        yield _fold(f"SUMMARY:{_escape(event['activity__code'] + ': ' + event['activity__title'])}")
+        yield _fold(f"STATUS:{ICS_STATUS.get(event['status'], 'CONFIRMED')}")
+        yield _fold('END:VEVENT')
+
+    yield _fold('END:VCALENDAR')
+
+
+def cached_calendar(cache_key, events, name, extra=()):
+    """
+    Return an iterable with the calendar body.
+
+    Serves the cached body when present; otherwise streams the calendar
+    and stores it in the cache once it has been fully generated.
+    """
+    body = cache.get(cache_key)
+    if body is not None:
+        return [body]
+
+    def generate():
+        chunks = []
+        for line in iter_calendar(events, name, extra):
+            chunks.append(line)
+            yield line
+        cache.set(cache_key, ''.join(chunks), FEED_CACHE_TIMEOUT)
+
+    return generate()
+
+
+def calendar_response(request, events, cache_prefix, name, filename, extra=(), extra_state='',
+                      track_enrollments=False):
+    """
+    Build the response for a calendar feed.
+
+    Returns 304 when the client's If-None-Match matches the current ETag,
+    and otherwise streams the (possibly cached) calendar body. `extra` are
+    additional event dicts (virtual occurrences) described by `extra_state`.
+    """
+    etag = quote_etag(feed_etag(events, extra_state, track_enrollments))
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return not_modified
+
+    response = StreamingHttpResponse(
+        cached_calendar(f'{cache_prefix}:{etag}', events, name, extra),
+        content_type='text/calendar; charset=utf-8'
+    )
+    response['ETag'] = etag
+    response['Content-Disposition'] = f'inline; filename="{filename}.ics"'
+    return response
@@ -3,10 +3,14 @@ WebSocket consumer for waiting room functionality.
 """
 import json
 import logging
+import time
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.utils import timezone
 
+from . import socket_metrics
+from .socket_metrics import timed_db_call
+
 logger = logging.getLogger(__name__)
 
 
@@ -18,8 +22,13 @@ class WaitingRoomConsumer(AsyncWebsocketConsumer):
     - User connections/disconnections
     - Real-time participant list updates
     - Waiting room status broadcast
+
+    Connections, messages, database calls and broadcasts are recorded in
+    `socket_metrics`.
     """
 
+    RECEIVED_TYPES = ('ping', 'ready')
+
     async def connect(self):
         """Handle WebSocket connection."""
         self.event_id = self.scope['url_route']['kwargs']['event_id']
@@ -45,7 +54,10 @@ class WaitingRoomConsumer(AsyncWebsocketConsumer):
             self.channel_name
         )
 
-        await self.accept()
+        # Echo the `bearer` subprotocol when the JWT came in the subprotocol list
+        await self.accept(subprotocol=self.scope.get('auth_subprotocol'))
+        socket_metrics.connected(self.event_id)
+        self.counted = True
 
         # Add user to waiting room
         await self.add_participant()
@@ -54,9 +66,15 @@ class WaitingRoomConsumer(AsyncWebsocketConsumer):
         await self.broadcast_participant_list()
 
         logger.info(f'User {self.user.user_code} connected to waiting room for event {self.event_id}')
+        await socket_metrics.maybe_publish()
 
     async def disconnect(self, close_code):
         """Handle WebSocket disconnection."""
+        idle = False
+        if getattr(self, 'counted', False):
+            idle = socket_metrics.disconnected(self.event_id)
+            self.counted = False
+
         # Mark participant as disconnected
         await self.remove_participant()
 
@@ -70,6 +88,8 @@ class WaitingRoomConsumer(AsyncWebsocketConsumer):
         await self.broadcast_participant_list()
 
         logger.info(f'User {self.user.user_code} disconnected from waiting room for event {self.event_id}')
+        # A worker without sockets may not publish again for a long time
+        await socket_metrics.maybe_publish(force=idle)
 
     async def receive(self, text_data):
         """
@@ -82,14 +102,17 @@ class WaitingRoomConsumer(AsyncWebsocketConsumer):
         try:
             data = json.loads(text_data)
             message_type = data.get('type')
+            socket_metrics.message_received(message_type if message_type in self.RECEIVED_TYPES else 'other')
 
             if message_type == 'ping':
                 # Update last seen timestamp
-                await self.update_last_seen()
-                await self.send(text_data=json.dumps({
+                revived = await self.update_last_seen()
+                if revived:
+                    await self.broadcast_participant_list()
+                await self.send_message('pong', {
                     'type': 'pong',
                     'timestamp': timezone.now().isoformat()
-                }))
+                })
 
             elif message_type == 'ready':
                 # Mark user as ready
@@ -97,10 +120,19 @@ class WaitingRoomConsumer(AsyncWebsocketConsumer):
                 await self.broadcast_participant_list()
 
         except json.JSONDecodeError:
+            socket_metrics.message_received('invalid')
             logger.error('Invalid JSON received in waiting room')
         except Exception as e:
             logger.error(f'Error processing waiting room message: {e}')
 
+        await socket_metrics.maybe_publish()
+
+    async def send_message(self, message_type, data):
+        """Send `data` as JSON, recording its type and size."""
+        text = json.dumps(data)
+        await self.send(text_data=text)
+        socket_metrics.message_sent(message_type, text)
+
     async def participant_list_update(self, event):
         """
         Handle participant list update broadcasts.
@@ -108,7 +140,8 @@ class WaitingRoomConsumer(AsyncWebsocketConsumer):
         Args:
             event: Event data from channel layer
         """
-        await self.send(text_data=json.dumps(event['data']))
+        socket_metrics.delivered('participant_list', event.get('sent_at'))
+        await self.send_message('participant_list', event['data'])
 
     async def event_status_update(self, event):
         """
@@ -117,16 +150,19 @@ class WaitingRoomConsumer(AsyncWebsocketConsumer):
         Args:
             event: Event data from channel layer
         """
-        await self.send(text_data=json.dumps(event['data']))
+        socket_metrics.delivered('event_status', event.get('sent_at'))
+        await self.send_message('event_status', event['data'])
 
     async def broadcast_participant_list(self):
         """Broadcast current participant list to all connected users."""
         participants = await self.get_participants()
 
+        start = time.perf_counter()
         await self.channel_layer.group_send(
             self.room_group_name,
             {
                 'type': 'participant_list_update',
+                'sent_at': time.time(),
                 'data': {
                     'type': 'participant_list',
                     'participants': participants,
@@ -134,7 +170,9 @@ class WaitingRoomConsumer(AsyncWebsocketConsumer):
                 }
             }
         )
+        socket_metrics.broadcast_sent('participant_list', time.perf_counter() - start)
 
+    @timed_db_call
     @database_sync_to_async
     def check_enrollment(self):
         """Check if user is enrolled in the event."""
@@ -151,6 +189,7 @@ class WaitingRoomConsumer(AsyncWebsocketConsumer):
         except (Event.DoesNotExist, Enrollment.DoesNotExist):
             return False
 
+    @timed_db_call
     @database_sync_to_async
     def add_participant(self):
         """Add user to waiting room participants."""
@@ -172,6 +211,7 @@ class WaitingRoomConsumer(AsyncWebsocketConsumer):
 
         return participant
 
+    @timed_db_call
     @database_sync_to_async
     def remove_participant(self):
         """Mark participant as disconnected."""
@@ -186,9 +226,15 @@ class WaitingRoomConsumer(AsyncWebsocketConsumer):
         except WaitingRoomParticipant.DoesNotExist:
             pass
 
+    @timed_db_call
     @database_sync_to_async
     def update_last_seen(self):
-        """Update participant's last seen timestamp."""
+        """
+        Update participant's last seen timestamp.
+
+        Returns True if the participant had been swept as disconnected
+        and is back on the waiting list.
+        """
         from .models import WaitingRoomParticipant
 
         try:
@@ -196,10 +242,13 @@ class WaitingRoomConsumer(AsyncWebsocketConsumer):
                 event_id=self.event_id,
                 user=self.user
             )
+            was_disconnected = participant.status == WaitingRoomParticipant.Status.DISCONNECTED
             participant.update_last_seen()
+            return was_disconnected
         except WaitingRoomParticipant.DoesNotExist:
-            pass
+            return False
 
+    @timed_db_call
     @database_sync_to_async
     def mark_ready(self):
         """Mark participant as ready."""
@@ -214,6 +263,7 @@ class WaitingRoomConsumer(AsyncWebsocketConsumer):
         except WaitingRoomParticipant.DoesNotExist:
             pass
 
+    @timed_db_call
     @database_sync_to_async
     def get_participants(self):
         """Get list of current waiting room participants."""
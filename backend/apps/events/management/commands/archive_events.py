@@ -0,0 +1,59 @@
+"""
+Move finished events and their related rows to the archive tables.
+
+Usage:
+    python manage.py archive_events [--days N] [--batch-size N] [--max-batches N] [--dry-run]
+"""
+from django.core.management.base import BaseCommand
+
+from apps.events.archive import (
+    ARCHIVE_AFTER_DAYS,
+    ARCHIVE_BATCH_SIZE,
+    archivable_events,
+    archive_cutoff,
+    archive_events,
+)
+
+
+class Command(BaseCommand):
+    help = 'Archive completed and cancelled events older than the configured age, in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=ARCHIVE_AFTER_DAYS,
+            help=f'Archive events that ended more than this many days ago (default: {ARCHIVE_AFTER_DAYS})'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=ARCHIVE_BATCH_SIZE,
+            help=f'Events moved per transaction (default: {ARCHIVE_BATCH_SIZE})'
+        )
+        parser.add_argument(
+            '--max-batches',
+            type=int,
+            default=None,
+            help='Stop after this many batches (default: until done)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many events would be archived'
+        )
+
+    def handle(self, *args, **options):
+        before = archive_cutoff(options['days'])
+
+        if options['dry_run']:
+            count = archivable_events(before).count()
+            self.stdout.write(f'{count} events ended before {before:%Y-%m-%d %H:%M} would be archived.')
+            return
+
+        archived = archive_events(
+            before,
+            batch_size=options['batch_size'],
+            max_batches=options['max_batches']
+        )
+        self.stdout.write(self.style.SUCCESS(f'Archived {archived} events ended before {before:%Y-%m-%d %H:%M}.'))
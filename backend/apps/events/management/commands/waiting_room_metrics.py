@@ -0,0 +1,56 @@
+"""
+Summarize the waiting room WebSocket metrics published by the ASGI workers.
+
+Usage:
+    python manage.py waiting_room_metrics [--events N]
+"""
+from django.core.management.base import BaseCommand
+
+from apps.events.socket_metrics import SOCKET_METRICS_PUBLISH_SECONDS, collect_socket_metrics, summarize
+
+
+class Command(BaseCommand):
+    help = 'Show open waiting room sockets, message counts and broadcast latencies across workers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--events',
+            type=int,
+            default=10,
+            help='Number of events with the most open sockets to list (default: 10)'
+        )
+
+    def handle(self, *args, **options):
+        summary = summarize(collect_socket_metrics())
+        if not summary['workers']:
+            self.stdout.write('No worker has published waiting room metrics yet.')
+            return
+
+        self.stdout.write(
+            f"{summary['connections']} open sockets on {len(summary['workers'])} workers "
+            f"(published every {SOCKET_METRICS_PUBLISH_SECONDS}s)."
+        )
+
+        self.stdout.write(self.style.MIGRATE_HEADING('Open sockets per event:'))
+        for event, count in summary['events'].most_common(options['events']):
+            self.stdout.write(f'  {event}: {count}')
+
+        self.stdout.write(self.style.MIGRATE_HEADING('Messages:'))
+        for (direction, message_type), count in sorted(summary['messages'].items()):
+            self.stdout.write(f'  {direction} {message_type}: {count}')
+
+        self.stdout.write(self.style.MIGRATE_HEADING('Database calls:'))
+        for (call,), (count, mean) in summary['db_calls'].items():
+            self.stdout.write(f'  {call}: {count} calls, {mean * 1000:.1f}ms average')
+
+        self.stdout.write(self.style.MIGRATE_HEADING('Messages sent to sockets:'))
+        for (message_type,), (count, mean) in summary['payloads'].items():
+            self.stdout.write(f'  {message_type}: {count} sent, {mean:.0f} bytes average')
+
+        self.stdout.write(self.style.MIGRATE_HEADING('Broadcasts:'))
+        for (message_type,), (count, mean) in summary['group_send'].items():
+            delivery = summary['delivery'].get((message_type,), (0, 0))[1]
+            self.stdout.write(
+                f'  {message_type}: {count} group_send, {mean * 1000:.1f}ms average, '
+                f'{delivery * 1000:.1f}ms average delivery'
+            )
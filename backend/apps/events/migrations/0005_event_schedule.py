@@ -0,0 +1,64 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:01
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activities', '0004_activity_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('events', '0004_waitingroomparticipant'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventSchedule',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('rrule', models.TextField(help_text='RRULE, e.g. FREQ=WEEKLY;BYDAY=MO,WE;UNTIL=20250630T000000Z')),
+                ('dtstart', models.DateTimeField(help_text='First occurrence (UTC); also sets the time of day')),
+                ('duration_minutes', models.PositiveIntegerField(default=60)),
+                ('waiting_time_minutes', models.PositiveIntegerField(default=10)),
+                ('first_reminder_minutes', models.PositiveIntegerField(blank=True, null=True)),
+                ('second_reminder_minutes', models.PositiveIntegerField(blank=True, null=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('materialized_until', models.DateTimeField(blank=True, help_text='Events have been created for every occurrence before this time', null=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Event Schedule',
+                'verbose_name_plural': 'Event Schedules',
+                'db_table': 'event_schedules',
+                'ordering': ['dtstart'],
+            },
+        ),
+        migrations.AddField(
+            model_name='eventschedule',
+            name='activity',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='schedules', to='activities.activity'),
+        ),
+        migrations.AddField(
+            model_name='eventschedule',
+            name='created_by',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='event_schedules', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='schedule',
+            field=models.ForeignKey(blank=True, help_text='Recurring schedule this event was materialized from', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='events', to='events.eventschedule'),
+        ),
+        migrations.AddIndex(
+            model_name='eventschedule',
+            index=models.Index(fields=['is_active', 'materialized_until'], name='event_sched_is_acti_c1720e_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='event',
+            constraint=models.UniqueConstraint(fields=('schedule', 'start_datetime'), name='unique_schedule_occurrence'),
+        ),
+    ]
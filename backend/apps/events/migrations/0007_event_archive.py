@@ -0,0 +1,89 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:14
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('activities', '0005_activity_daily_stats'),
+        ('events', '0006_updated_at_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedEvent',
+            fields=[
+                ('id', models.UUIDField(editable=False, primary_key=True, serialize=False)),
+                ('schedule_id', models.UUIDField(blank=True, null=True)),
+                ('start_datetime', models.DateTimeField()),
+                ('end_datetime', models.DateTimeField()),
+                ('status', models.CharField(choices=[('scheduled', 'Scheduled'), ('in_waiting', 'In Waiting Room'), ('in_progress', 'In Progress'), ('completed', 'Completed'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('waiting_time_minutes', models.PositiveIntegerField()),
+                ('first_reminder_minutes', models.PositiveIntegerField(blank=True, null=True)),
+                ('second_reminder_minutes', models.PositiveIntegerField(blank=True, null=True)),
+                ('meetings_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('activity', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_events', to='activities.activity')),
+            ],
+            options={
+                'verbose_name': 'Archived Event',
+                'verbose_name_plural': 'Archived Events',
+                'db_table': 'archived_events',
+                'ordering': ['start_datetime'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedEnrollment',
+            fields=[
+                ('id', models.UUIDField(editable=False, primary_key=True, serialize=False)),
+                ('enrolled_at', models.DateTimeField()),
+                ('status', models.CharField(choices=[('enrolled', 'Enrolled'), ('cancelled', 'Cancelled'), ('attended', 'Attended'), ('no_show', 'No Show')], max_length=20)),
+                ('updated_at', models.DateTimeField()),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='enrollments', to='events.archivedevent')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_enrollments', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Archived Enrollment',
+                'verbose_name_plural': 'Archived Enrollments',
+                'db_table': 'archived_enrollments',
+                'ordering': ['-enrolled_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedWaitingRoomParticipant',
+            fields=[
+                ('id', models.UUIDField(editable=False, primary_key=True, serialize=False)),
+                ('joined_at', models.DateTimeField()),
+                ('last_seen', models.DateTimeField()),
+                ('status', models.CharField(choices=[('waiting', 'Waiting'), ('ready', 'Ready'), ('disconnected', 'Disconnected')], max_length=20)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waiting_room_participants', to='events.archivedevent')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_waiting_rooms', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Archived Waiting Room Participant',
+                'verbose_name_plural': 'Archived Waiting Room Participants',
+                'db_table': 'archived_waiting_room_participants',
+                'ordering': ['joined_at'],
+                'indexes': [models.Index(fields=['event', 'status'], name='archived_wa_event_i_edc2b1_idx')],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='archivedevent',
+            index=models.Index(fields=['activity', 'start_datetime'], name='archived_ev_activit_fabb5d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedenrollment',
+            index=models.Index(fields=['event', 'status'], name='archived_en_event_i_7a28e2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedenrollment',
+            index=models.Index(fields=['user', 'status'], name='archived_en_user_id_4dd4fd_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0007_event_archive'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='waitingroomparticipant',
+            index=models.Index(fields=['status', 'last_seen'], name='waiting_roo_status_6a555c_idx'),
+        ),
+    ]
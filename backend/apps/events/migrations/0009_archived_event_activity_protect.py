@@ -0,0 +1,20 @@
+# Generated by Django 4.2.7 on 2026-10-19 07:09
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activities', '0005_activity_daily_stats'),
+        ('events', '0008_waiting_room_last_seen_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='archivedevent',
+            name='activity',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='archived_events', to='activities.activity'),
+        ),
+    ]
@@ -1,11 +1,72 @@
 import uuid
 import secrets
+from dateutil.rrule import rrulestr
 from django.db import models
 from django.utils.timezone import now as timezone_now
 from apps.activities.models import Activity
 from apps.users.models import User
 
 
+class EventSchedule(models.Model):
+    """
+    Recurring schedule for an activity, stored once as an RFC 5545 RRULE.
+
+    Occurrences are expanded lazily; `Event` rows are only materialized
+    up to a rolling horizon by the `materialize_event_schedules` task.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    activity = models.ForeignKey(
+        Activity,
+        on_delete=models.CASCADE,
+        related_name='schedules'
+    )
+    rrule = models.TextField(
+        help_text="RRULE, e.g. FREQ=WEEKLY;BYDAY=MO,WE;UNTIL=20250630T000000Z"
+    )
+    dtstart = models.DateTimeField(help_text="First occurrence (UTC); also sets the time of day")
+    duration_minutes = models.PositiveIntegerField(default=60)
+    waiting_time_minutes = models.PositiveIntegerField(default=10)
+    first_reminder_minutes = models.PositiveIntegerField(null=True, blank=True)
+    second_reminder_minutes = models.PositiveIntegerField(null=True, blank=True)
+    is_active = models.BooleanField(default=True)
+    materialized_until = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Events have been created for every occurrence before this time"
+    )
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='event_schedules'
+    )
+    created_at = models.DateTimeField(default=timezone_now)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'event_schedules'
+        verbose_name = 'Event Schedule'
+        verbose_name_plural = 'Event Schedules'
+        ordering = ['dtstart']
+        indexes = [
+            models.Index(fields=['is_active', 'materialized_until']),
+        ]
+
+    def __str__(self):
+        return f"{self.activity.code} - {self.rrule}"
+
+    def get_rule(self):
+        """Return the dateutil rule anchored at `dtstart`."""
+        return rrulestr(self.rrule, dtstart=self.dtstart)
+
+    def occurrences(self, after, before):
+        """Return the occurrence start datetimes in [after, before)."""
+        if before <= after:
+            return []
+        return [start for start in self.get_rule().between(after, before, inc=True) if start < before]
+
+
 class Event(models.Model):
     """Event model representing a specific time slot for an activity."""
 
@@ -22,6 +83,14 @@ class Event(models.Model):
         on_delete=models.CASCADE,
         related_name='events'
     )
+    schedule = models.ForeignKey(
+        EventSchedule,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='events',
+        help_text="Recurring schedule this event was materialized from"
+    )
     start_datetime = models.DateTimeField()
     end_datetime = models.DateTimeField()
     waiting_time_minutes = models.PositiveIntegerField(
@@ -60,11 +129,26 @@ class Event(models.Model):
             models.Index(fields=['status', 'start_datetime']),
             models.Index(fields=['created_at']),  # For filtering/ordering by creation date
             models.Index(fields=['start_datetime', 'status']),  # For Celery tasks filtering
+            models.Index(fields=['updated_at']),  # For incremental statistics rollups
+        ]
+        constraints = [
+            # Materializing a schedule twice must not duplicate its events
+            models.UniqueConstraint(
+                fields=['schedule', 'start_datetime'],
+                name='unique_schedule_occurrence'
+            ),
         ]
 
     def __str__(self):
         return f"{self.activity.code} - {self.start_datetime}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Start as loaded, so the rollup signals detect a reschedule without a query
+        instance._loaded_start_datetime = instance.__dict__.get('start_datetime')
+        return instance
+
 
 class Enrollment(models.Model):
     """Enrollment model linking users to events."""
@@ -111,6 +195,7 @@ class Enrollment(models.Model):
             models.Index(fields=['user', 'status']),
             models.Index(fields=['event', 'status']),
             models.Index(fields=['-enrolled_at']),  # For ordering by enrollment date
+            models.Index(fields=['updated_at']),  # For incremental statistics rollups
         ]
 
     def __str__(self):
@@ -182,6 +267,7 @@ class WaitingRoomParticipant(models.Model):
         indexes = [
             models.Index(fields=['event', 'status']),
             models.Index(fields=['user', 'event']),
+            models.Index(fields=['status', 'last_seen']),  # For the stale participant sweeper
         ]
 
     def __str__(self):
@@ -198,6 +284,118 @@ class WaitingRoomParticipant(models.Model):
         self.save()
 
     def update_last_seen(self):
-        """Update last seen timestamp."""
+        """
+        Update last seen timestamp.
+
+        A participant swept as disconnected while its connection was still
+        alive is brought back to the waiting list.
+        """
         self.last_seen = timezone_now()
-        self.save(update_fields=['last_seen'])
+        update_fields = ['last_seen']
+        if self.status == self.Status.DISCONNECTED:
+            self.status = self.Status.WAITING
+            update_fields.append('status')
+        self.save(update_fields=update_fields)
+
+
+class ArchivedEvent(models.Model):
+    """
+    Finished event moved out of the `events` table by `manage.py archive_events`.
+
+    Keeps what the statistics need; the meetings themselves are not kept,
+    only their number and their participants (see ArchivedMeetingParticipant).
+    """
+
+    id = models.UUIDField(primary_key=True, editable=False)
+    activity = models.ForeignKey(
+        Activity,
+        # Deleting the activity must not silently drop its history
+        on_delete=models.PROTECT,
+        related_name='archived_events'
+    )
+    schedule_id = models.UUIDField(null=True, blank=True)
+    start_datetime = models.DateTimeField()
+    end_datetime = models.DateTimeField()
+    status = models.CharField(max_length=20, choices=Event.Status.choices)
+    waiting_time_minutes = models.PositiveIntegerField()
+    first_reminder_minutes = models.PositiveIntegerField(null=True, blank=True)
+    second_reminder_minutes = models.PositiveIntegerField(null=True, blank=True)
+    meetings_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone_now)
+
+    class Meta:
+        db_table = 'archived_events'
+        verbose_name = 'Archived Event'
+        verbose_name_plural = 'Archived Events'
+        ordering = ['start_datetime']
+        indexes = [
+            models.Index(fields=['activity', 'start_datetime']),
+        ]
+
+    def __str__(self):
+        return f"{self.activity.code} - {self.start_datetime} (archived)"
+
+
+class ArchivedEnrollment(models.Model):
+    """Enrollment of an archived event."""
+
+    id = models.UUIDField(primary_key=True, editable=False)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_enrollments'
+    )
+    event = models.ForeignKey(
+        ArchivedEvent,
+        on_delete=models.CASCADE,
+        related_name='enrollments'
+    )
+    enrolled_at = models.DateTimeField()
+    status = models.CharField(max_length=20, choices=Enrollment.Status.choices)
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'archived_enrollments'
+        verbose_name = 'Archived Enrollment'
+        verbose_name_plural = 'Archived Enrollments'
+        ordering = ['-enrolled_at']
+        indexes = [
+            models.Index(fields=['event', 'status']),
+            models.Index(fields=['user', 'status']),
+        ]
+
+    def __str__(self):
+        return f"{self.user.user_code} -> {self.event}"
+
+
+class ArchivedWaitingRoomParticipant(models.Model):
+    """Waiting room entry of an archived event."""
+
+    id = models.UUIDField(primary_key=True, editable=False)
+    event = models.ForeignKey(
+        ArchivedEvent,
+        on_delete=models.CASCADE,
+        related_name='waiting_room_participants'
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_waiting_rooms'
+    )
+    joined_at = models.DateTimeField()
+    last_seen = models.DateTimeField()
+    status = models.CharField(max_length=20, choices=WaitingRoomParticipant.Status.choices)
+
+    class Meta:
+        db_table = 'archived_waiting_room_participants'
+        verbose_name = 'Archived Waiting Room Participant'
+        verbose_name_plural = 'Archived Waiting Room Participants'
+        ordering = ['joined_at']
+        indexes = [
+            models.Index(fields=['event', 'status']),
+        ]
+
+    def __str__(self):
+        return f"{self.user.user_code} waited for {self.event}"
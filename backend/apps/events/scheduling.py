@@ -0,0 +1,272 @@
+"""
+Bulk event scheduling.
+
+Generating a semester of slots used to build each `Event` in a Python loop
+(parsing the hours and reading the clock per slot), insert them blindly and
+re-fetch every row to serialize it. The helpers here:
+
+- expand the date range and hours into slots with the hours parsed once,
+- detect duplicates and overlaps against the activity's existing events
+  and between the new slots, with a single query and an O(n log n) sweep,
+  while holding a lock on the activity row,
+- insert in chunks (COPY on PostgreSQL, batched bulk_create elsewhere),
+- return a compact summary instead of re-serialized events.
+
+Recurring schedules (`EventSchedule`) reuse the same pipeline: their
+occurrences are materialized as events only up to a rolling horizon,
+and later occurrences are expanded on demand as virtual occurrences.
+"""
+import csv
+import io
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone as dt_timezone
+from itertools import accumulate, islice
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from apps.activities.models import Activity
+
+from .models import Event, EventSchedule
+
+# Rows per COPY / INSERT statement
+INSERT_CHUNK_SIZE = 1000
+# Hard limit on the number of events a single request may create
+MAX_BULK_EVENTS = 20000
+# Number of conflicts echoed back in the summary
+MAX_REPORTED_CONFLICTS = 50
+# Recurring schedules are materialized this many days ahead
+SCHEDULE_HORIZON_DAYS = getattr(settings, 'EVENT_SCHEDULE_HORIZON_DAYS', 14)
+
+
+@dataclass
+class ScheduleResult:
+    """Outcome of a bulk scheduling run."""
+
+    created: list = field(default_factory=list)
+    conflicts: list = field(default_factory=list)
+    skipped_past: int = 0
+    skipped_duplicates: int = 0
+
+    def summary(self):
+        return {
+            'created': len(self.created),
+            'skipped_past': self.skipped_past,
+            'skipped_duplicates': self.skipped_duplicates,
+            'skipped_conflicts': len(self.conflicts),
+            'conflicts': [
+                {'start_datetime': start, 'end_datetime': end}
+                for start, end in self.conflicts[:MAX_REPORTED_CONFLICTS]
+            ],
+            'first_start': self.created[0].start_datetime if self.created else None,
+            'last_start': self.created[-1].start_datetime if self.created else None,
+        }
+
+
+def generate_slots(start_date, end_date, times, duration, now=None):
+    """
+    Return sorted, de-duplicated (start, end) UTC slots for every day in
+    [start_date, end_date] at each of `times`, skipping slots not in the future.
+
+    Returns a tuple (slots, skipped_past, skipped_duplicates).
+    """
+    now = now or timezone.now()
+    unique_times = sorted(set(times))
+    skipped_duplicates = (len(times) - len(unique_times)) * ((end_date - start_date).days + 1)
+
+    slots = []
+    skipped_past = 0
+    day = start_date
+    while day <= end_date:
+        for time_of_day in unique_times:
+            start = datetime.combine(day, time_of_day, tzinfo=dt_timezone.utc)
+            if start <= now:
+                skipped_past += 1
+                continue
+            slots.append((start, start + duration))
+        day += timedelta(days=1)
+
+    return slots, skipped_past, skipped_duplicates
+
+
+def find_conflicts(activity, slots):
+    """
+    Split `slots` into (free, conflicting) against the activity's events
+    and against each other.
+
+    Runs one query for the non-cancelled events in the slots' time window,
+    then checks each slot with a binary search over the existing starts and
+    a running maximum of the existing ends. A slot overlapping an earlier
+    free slot is a conflict too.
+    """
+    if not slots:
+        return [], []
+    slots = sorted(slots)
+
+    existing = list(
+        Event.objects
+        .filter(
+            activity=activity,
+            start_datetime__lt=slots[-1][1],
+            end_datetime__gt=slots[0][0],
+        )
+        .exclude(status=Event.Status.CANCELLED)
+        .order_by('start_datetime')
+        .values_list('start_datetime', 'end_datetime')
+    )
+    starts = [start for start, _ in existing]
+    max_ends = list(accumulate((end for _, end in existing), max))
+
+    free, conflicts = [], []
+    for start, end in slots:
+        # Existing events starting before this slot ends; overlap if any ends after it starts
+        index = bisect_left(starts, end)
+        if index and max_ends[index - 1] > start:
+            conflicts.append((start, end))
+        # Free slots are sorted, so only the last one can reach into this slot
+        elif free and free[-1][1] > start:
+            conflicts.append((start, end))
+        else:
+            free.append((start, end))
+
+    return free, conflicts
+
+
+def _chunks(items, size):
+    iterator = iter(items)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _copy_events(events):
+    """Insert events with PostgreSQL COPY ... FROM STDIN."""
+    fields = Event._meta.concrete_fields
+    columns = ', '.join(connection.ops.quote_name(f.column) for f in fields)
+    sql = f'COPY {connection.ops.quote_name(Event._meta.db_table)} ({columns}) FROM STDIN WITH (FORMAT csv)'
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for event in events:
+        row = []
+        for f in fields:
+            value = f.get_db_prep_save(getattr(event, f.attname), connection)
+            # Unquoted empty values are NULL in COPY's csv format
+            row.append('' if value is None else value)
+        writer.writerow(row)
+    buffer.seek(0)
+
+    with connection.cursor() as cursor:
+        cursor.cursor.copy_expert(sql, buffer)
+
+
+def insert_events(events, chunk_size=INSERT_CHUNK_SIZE):
+    """Insert unsaved events in chunks inside one transaction."""
+    now = timezone.now()
+    for event in events:
+        # COPY skips Field.pre_save, so auto_now must be filled in here
+        event.updated_at = now
+
+    # No savepoint of its own: a failed chunk must roll back the whole caller
+    with transaction.atomic(savepoint=False):
+        for chunk in _chunks(events, chunk_size):
+            if connection.vendor == 'postgresql':
+                _copy_events(chunk)
+            else:
+                Event.objects.bulk_create(chunk)
+
+    return events
+
+
+def schedule_events(activity, slots, on_conflict='skip', **event_fields):
+    """
+    Create an event for every free slot of `activity`.
+
+    Args:
+        activity: Activity the events belong to
+        slots: Sorted list of (start, end) tuples
+        on_conflict: 'skip' to leave out overlapping slots, 'error' to create nothing
+        **event_fields: Extra Event fields (waiting time, reminders)
+
+    Returns a ScheduleResult; with on_conflict='error' and conflicts,
+    nothing is created and `created` is empty.
+
+    The activity row is locked from the conflict check until the insert
+    commits, so concurrent runs for the same activity cannot double-book.
+    """
+    with transaction.atomic():
+        Activity.objects.select_for_update().only('pk').get(pk=activity.pk)
+
+        free, conflicts = find_conflicts(activity, slots)
+        result = ScheduleResult(conflicts=conflicts)
+
+        if conflicts and on_conflict == 'error':
+            return result
+
+        events = [
+            Event(activity=activity, start_datetime=start, end_datetime=end, **event_fields)
+            for start, end in free
+        ]
+        result.created = insert_events(events)
+    return result
+
+
+def materialize_schedule(schedule, horizon_end=None, now=None):
+    """
+    Create the events of `schedule` from where the last run stopped up to
+    `horizon_end` (default: now + EVENT_SCHEDULE_HORIZON_DAYS).
+
+    Occurrences overlapping other events of the activity are skipped, and
+    so are occurrences already materialized (even if cancelled since).
+    """
+    now = now or timezone.now()
+    horizon_end = horizon_end or now + timedelta(days=SCHEDULE_HORIZON_DAYS)
+    start = max(schedule.materialized_until or schedule.dtstart, now)
+    duration = timedelta(minutes=schedule.duration_minutes)
+
+    occurrences = schedule.occurrences(start, horizon_end)
+    existing = set(
+        schedule.events.filter(start_datetime__in=occurrences).values_list('start_datetime', flat=True)
+    )
+    slots = [(occurrence, occurrence + duration) for occurrence in occurrences if occurrence not in existing]
+    result = schedule_events(
+        schedule.activity,
+        slots,
+        schedule=schedule,
+        waiting_time_minutes=schedule.waiting_time_minutes,
+        first_reminder_minutes=schedule.first_reminder_minutes,
+        second_reminder_minutes=schedule.second_reminder_minutes
+    )
+    result.skipped_duplicates = len(existing)
+
+    if not schedule.materialized_until or horizon_end > schedule.materialized_until:
+        schedule.materialized_until = horizon_end
+        schedule.save(update_fields=['materialized_until', 'updated_at'])
+
+    return result
+
+
+def virtual_occurrences(schedule, start, end):
+    """
+    Return the occurrences of `schedule` in [start, end) that have not been
+    materialized yet, as dicts shaped like `Event.objects.values()` rows.
+    """
+    start = max(start, schedule.materialized_until or schedule.dtstart)
+    duration = timedelta(minutes=schedule.duration_minutes)
+    return [
+        {
+            'id': None,
+            'schedule_id': schedule.id,
+            'start_datetime': occurrence,
+            'end_datetime': occurrence + duration,
+            'status': Event.Status.SCHEDULED,
+            'updated_at': schedule.updated_at,
+        }
+        for occurrence in schedule.occurrences(start, end)
+    ]
+
+
+def active_schedules(activity):
+    """Active schedules of an activity."""
+    return EventSchedule.objects.filter(activity=activity, is_active=True).order_by('dtstart')
@@ -1,18 +1,29 @@
 from rest_framework import serializers
 from django.utils import timezone as django_timezone
 from datetime import datetime, timedelta
-import pytz
-from .models import Event, Enrollment
+from dateutil.rrule import rrulestr
+from .models import Event, EventSchedule, Enrollment
 from apps.activities.models import Activity
+from apps.core.fieldsets import SparseFieldsetSerializerMixin
+from apps.core.timezones import get_timezone, get_request_timezone, is_valid_timezone
+from .scheduling import MAX_BULK_EVENTS
 
+# Upper bound on the number of conversions in one batch request
+MAX_TIMEZONE_BATCH_SIZE = 500
 
-class EventSerializer(serializers.ModelSerializer):
+
+class EventSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     """Serializer for Event model - read operations."""
 
     activity_code = serializers.CharField(source='activity.code', read_only=True)
     activity_title = serializers.CharField(source='activity.title', read_only=True)
     enrolled_count = serializers.IntegerField(read_only=True)
     attended_count = serializers.IntegerField(read_only=True)
+    # Only present with ?localize=true, in the requesting user's timezone
+    start_datetime_local = serializers.SerializerMethodField()
+    end_datetime_local = serializers.SerializerMethodField()
+
+    LOCALIZED_FIELDS = ('start_datetime_local', 'end_datetime_local')
 
     class Meta:
         model = Event
@@ -33,7 +44,9 @@ class EventSerializer(serializers.ModelSerializer):
             'created_at',
             'updated_at',
             'enrolled_count',
-            'attended_count'
+            'attended_count',
+            'start_datetime_local',
+            'end_datetime_local'
         ]
         read_only_fields = [
             'id',
@@ -45,6 +58,21 @@ class EventSerializer(serializers.ModelSerializer):
             'updated_at'
         ]
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        # Resolved once per serializer, not once per event
+        self.local_timezone = get_request_timezone(self.context.get('request'))
+        if self.local_timezone is None:
+            for name in self.LOCALIZED_FIELDS:
+                self.fields.pop(name, None)
+
+    def get_start_datetime_local(self, obj):
+        return obj.start_datetime.astimezone(self.local_timezone).isoformat()
+
+    def get_end_datetime_local(self, obj):
+        return obj.end_datetime.astimezone(self.local_timezone).isoformat()
+
 
 class EventCreateSerializer(serializers.ModelSerializer):
     """Serializer for creating a single event."""
@@ -129,6 +157,15 @@ class EventBulkCreateSerializer(serializers.Serializer):
     waiting_time_minutes = serializers.IntegerField(default=10)
     first_reminder_minutes = serializers.IntegerField(required=False, allow_null=True)
     second_reminder_minutes = serializers.IntegerField(required=False, allow_null=True)
+    on_conflict = serializers.ChoiceField(
+        choices=['skip', 'error'],
+        default='skip',
+        help_text="What to do with slots overlapping existing events: skip them or create nothing"
+    )
+    return_events = serializers.BooleanField(
+        default=False,
+        help_text="Include the id, start and end of every created event in the response"
+    )
 
     def validate_activity_code(self, value):
         """Validate that activity exists."""
@@ -148,15 +185,16 @@ class EventBulkCreateSerializer(serializers.Serializer):
                 'end_date': 'End date must be after or equal to start date.'
             })
 
-        # Validate hours format
-        hours = attrs['hours_utc']
-        for hour_str in hours:
+        # Validate and parse hours once
+        times = []
+        for hour_str in attrs['hours_utc']:
             try:
-                datetime.strptime(hour_str, '%H:%M')
+                times.append(datetime.strptime(hour_str, '%H:%M').time())
             except ValueError:
                 raise serializers.ValidationError({
                     'hours_utc': f"Invalid time format '{hour_str}'. Use HH:MM (e.g., '09:00')."
                 })
+        attrs['times'] = times
 
         # Validate duration
         if attrs['duration_minutes'] <= 0:
@@ -164,9 +202,72 @@ class EventBulkCreateSerializer(serializers.Serializer):
                 'duration_minutes': 'Duration must be positive.'
             })
 
+        # Validate size
+        slot_count = ((end_date - start_date).days + 1) * len(set(times))
+        if slot_count > MAX_BULK_EVENTS:
+            raise serializers.ValidationError(
+                f'Too many events requested ({slot_count}). The maximum per request is {MAX_BULK_EVENTS}.'
+            )
+
         return attrs
 
 
+class EventScheduleSerializer(serializers.ModelSerializer):
+    """Serializer for recurring event schedules."""
+
+    activity_code = serializers.SlugRelatedField(
+        source='activity',
+        slug_field='code',
+        queryset=Activity.objects.all()
+    )
+
+    # Rules that would expand into thousands of occurrences per day
+    FORBIDDEN_FREQUENCIES = ('SECONDLY', 'MINUTELY')
+
+    class Meta:
+        model = EventSchedule
+        fields = [
+            'id',
+            'activity_code',
+            'rrule',
+            'dtstart',
+            'duration_minutes',
+            'waiting_time_minutes',
+            'first_reminder_minutes',
+            'second_reminder_minutes',
+            'is_active',
+            'materialized_until',
+            'created_at',
+            'updated_at'
+        ]
+        read_only_fields = ['id', 'materialized_until', 'created_at', 'updated_at']
+
+    def validate_rrule(self, value):
+        """Validate the RRULE syntax, accepting an optional 'RRULE:' prefix."""
+        value = value.strip()
+        if value.upper().startswith('RRULE:'):
+            value = value[len('RRULE:'):]
+
+        if 'DTSTART' in value.upper():
+            raise serializers.ValidationError('Set the first occurrence with dtstart, not inside the rule.')
+
+        for frequency in self.FORBIDDEN_FREQUENCIES:
+            if f'FREQ={frequency}' in value.upper():
+                raise serializers.ValidationError(f'FREQ={frequency} is not supported.')
+
+        try:
+            rrulestr(value, dtstart=django_timezone.now())
+        except (ValueError, TypeError) as e:
+            raise serializers.ValidationError(f'Invalid RRULE: {e}')
+
+        return value
+
+    def validate_duration_minutes(self, value):
+        if value <= 0:
+            raise serializers.ValidationError('Duration must be positive.')
+        return value
+
+
 class EventUpdateSerializer(serializers.ModelSerializer):
     """Serializer for updating an event."""
 
@@ -201,10 +302,10 @@ class EventUpdateSerializer(serializers.ModelSerializer):
         return attrs
 
 
-class EnrollmentSerializer(serializers.ModelSerializer):
+class EnrollmentSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     """Serializer for Enrollment model."""
 
-    event_id = serializers.UUIDField(source='event.id', read_only=True)
+    event_id = serializers.UUIDField(read_only=True)
     event_start = serializers.DateTimeField(source='event.start_datetime', read_only=True)
     event_end = serializers.DateTimeField(source='event.end_datetime', read_only=True)
     activity_code = serializers.CharField(source='event.activity.code', read_only=True)
@@ -283,16 +384,14 @@ class TimezoneConversionSerializer(serializers.Serializer):
 
     def validate_target_timezone(self, value):
         """Validate that timezone is valid."""
-        try:
-            pytz.timezone(value)
-            return value
-        except pytz.UnknownTimeZoneError:
+        if not is_valid_timezone(value):
             raise serializers.ValidationError(f"Unknown timezone: {value}")
+        return value
 
     def to_representation(self, instance):
         """Convert UTC datetime to target timezone."""
         datetime_utc = instance['datetime_utc']
-        target_tz = pytz.timezone(instance['target_timezone'])
+        target_tz = get_timezone(instance['target_timezone'])
 
         # Convert to target timezone
         datetime_local = datetime_utc.astimezone(target_tz)
@@ -303,3 +402,21 @@ class TimezoneConversionSerializer(serializers.Serializer):
             'timezone': str(target_tz),
             'offset': datetime_local.strftime('%z')
         }
+
+
+class TimezoneBatchConversionSerializer(serializers.Serializer):
+    """Serializer for converting many datetimes in a single request."""
+
+    items = serializers.ListField(
+        child=TimezoneConversionSerializer(),
+        allow_empty=False,
+        max_length=MAX_TIMEZONE_BATCH_SIZE,
+        help_text="List of {datetime_utc, target_timezone} objects"
+    )
+
+    def to_representation(self, instance):
+        """Convert every item, keeping the request order."""
+        converter = TimezoneConversionSerializer()
+        return {
+            'results': [converter.to_representation(item) for item in instance['items']]
+        }
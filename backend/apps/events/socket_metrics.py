@@ -0,0 +1,156 @@
+"""
+Waiting room WebSocket metrics.
+
+`WaitingRoomConsumer` records open connections (per worker process and per
+event), messages by direction and type, time spent in its
+`database_sync_to_async` calls, the size of the payloads it sends and the
+latency of its broadcasts: both the `group_send` call itself and the delay
+until each member of the group delivers the message to its socket.
+
+Every ASGI worker stores a snapshot in the cache at most every
+SOCKET_METRICS_PUBLISH_SECONDS, so `/metrics` and
+`manage.py waiting_room_metrics` see every worker when the cache is shared.
+"""
+import functools
+import time
+from collections import Counter
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from apps.core.metrics import Registry, collect_snapshots, publish_snapshot, worker_name
+
+SOCKET_METRICS_PUBLISH_SECONDS = getattr(settings, 'SOCKET_METRICS_PUBLISH_SECONDS', 15)
+# Snapshots of workers that stopped serving sockets expire after this long
+SOCKET_METRICS_TIMEOUT = 60 * 60
+SOCKET_METRICS_NAMESPACE = 'waiting_room_metrics'
+
+DB_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+PAYLOAD_BUCKETS = (128, 512, 1024, 4096, 16384, 65536, 262144)
+
+SOCKET_REGISTRY = Registry()
+CONNECTIONS = SOCKET_REGISTRY.gauge(
+    'waiting_room_connections', 'Open waiting room sockets.', ['worker'])
+EVENT_CONNECTIONS = SOCKET_REGISTRY.gauge(
+    'waiting_room_event_connections', 'Open waiting room sockets per event.', ['worker', 'event'])
+MESSAGES = SOCKET_REGISTRY.counter(
+    'waiting_room_messages_total', 'Waiting room messages by direction and type.',
+    ['worker', 'direction', 'type'])
+DB_TIME = SOCKET_REGISTRY.histogram(
+    'waiting_room_db_seconds', 'Time spent in database_sync_to_async calls, thread pool wait included.',
+    ['worker', 'call'], buckets=DB_BUCKETS)
+PAYLOAD_SIZE = SOCKET_REGISTRY.histogram(
+    'waiting_room_payload_bytes', 'Size of the messages sent to sockets.', ['worker', 'type'],
+    buckets=PAYLOAD_BUCKETS)
+BROADCAST_TIME = SOCKET_REGISTRY.histogram(
+    'waiting_room_group_send_seconds', 'Duration of group_send calls.', ['worker', 'type'], buckets=DB_BUCKETS)
+DELIVERY_DELAY = SOCKET_REGISTRY.histogram(
+    'waiting_room_delivery_seconds', 'Delay between a group_send and its delivery to a socket.',
+    ['worker', 'type'], buckets=DB_BUCKETS)
+
+_last_publish = 0.0
+
+
+def connected(event_id):
+    worker = worker_name()
+    CONNECTIONS.inc(worker=worker)
+    EVENT_CONNECTIONS.inc(worker=worker, event=event_id)
+
+
+def disconnected(event_id):
+    """Returns True when this worker has no socket left open."""
+    worker = worker_name()
+    CONNECTIONS.dec(worker=worker)
+    EVENT_CONNECTIONS.dec(worker=worker, event=event_id)
+    if EVENT_CONNECTIONS.get(worker=worker, event=event_id) <= 0:
+        # Keep one sample per live event, not one per event ever served
+        EVENT_CONNECTIONS.remove(worker=worker, event=event_id)
+    return CONNECTIONS.get(worker=worker) <= 0
+
+
+def message_received(message_type):
+    MESSAGES.inc(worker=worker_name(), direction='received', type=message_type)
+
+
+def message_sent(message_type, text):
+    worker = worker_name()
+    MESSAGES.inc(worker=worker, direction='sent', type=message_type)
+    PAYLOAD_SIZE.observe(len(text.encode()), worker=worker, type=message_type)
+
+
+def broadcast_sent(message_type, duration):
+    worker = worker_name()
+    MESSAGES.inc(worker=worker, direction='broadcast', type=message_type)
+    BROADCAST_TIME.observe(duration, worker=worker, type=message_type)
+
+
+def delivered(message_type, sent_at):
+    """Record the delay of a group message stamped with `sent_at`."""
+    if sent_at is not None:
+        DELIVERY_DELAY.observe(max(0.0, time.time() - sent_at), worker=worker_name(), type=message_type)
+
+
+def timed_db_call(func):
+    """Time an async consumer method wrapping `database_sync_to_async`."""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            DB_TIME.observe(time.perf_counter() - start, worker=worker_name(), call=func.__name__)
+    return wrapper
+
+
+async def maybe_publish(force=False):
+    """Publish this worker's snapshot if the last one is old enough."""
+    global _last_publish
+    now = time.monotonic()
+    if not force and now - _last_publish < SOCKET_METRICS_PUBLISH_SECONDS:
+        return
+    _last_publish = now
+    await sync_to_async(publish_snapshot)(SOCKET_REGISTRY, SOCKET_METRICS_NAMESPACE, SOCKET_METRICS_TIMEOUT)
+
+
+def collect_socket_metrics():
+    """A Registry with the metrics of every worker that published recently."""
+    return collect_snapshots(SOCKET_METRICS_NAMESPACE)
+
+
+def _values(registry, metric):
+    collected = registry.get(metric.name)
+    return collected.snapshot() if collected else {}
+
+
+def _averages(registry, metric):
+    """{labels without worker: (count, mean)} of a histogram, across workers."""
+    totals = {}
+    for (_, *labels), (counts, total) in _values(registry, metric).items():
+        count, running = totals.get(tuple(labels), (0, 0))
+        totals[tuple(labels)] = (count + sum(counts), running + total)
+    return {
+        labels: (count, total / count if count else 0)
+        for labels, (count, total) in sorted(totals.items())
+    }
+
+
+def summarize(registry):
+    """Totals across workers of a collected registry, for capacity planning."""
+    events = Counter()
+    for (_, event), count in _values(registry, EVENT_CONNECTIONS).items():
+        events[event] += count
+    messages = Counter()
+    for (_, direction, message_type), count in _values(registry, MESSAGES).items():
+        messages[(direction, message_type)] += count
+
+    connections = _values(registry, CONNECTIONS)
+    return {
+        'workers': sorted(worker for (worker,) in connections),
+        'connections': sum(connections.values()),
+        'events': events,
+        'messages': messages,
+        'db_calls': _averages(registry, DB_TIME),
+        'payloads': _averages(registry, PAYLOAD_SIZE),
+        'group_send': _averages(registry, BROADCAST_TIME),
+        'delivery': _averages(registry, DELIVERY_DELAY),
+    }
@@ -0,0 +1,117 @@
+"""
+Event statistics computed with a single query per request.
+
+Enrollment counts come from conditional aggregates over one join, the
+activity from `select_related`, and the meeting count from a correlated
+subquery (joining meetings as well would multiply the enrollment rows).
+Statistics of events in their waiting room or in progress change every
+few seconds and are polled constantly, so they are cached briefly.
+
+Archived events are looked up in the archive tables when they are not
+found among the live ones; they never change, so they are cached longer.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from apps.meetings.models import Meeting
+
+from .models import ArchivedEvent, Event, Enrollment
+
+LIVE_STATISTICS_TIMEOUT = getattr(settings, 'EVENT_STATISTICS_CACHE_TIMEOUT', 10)
+LIVE_STATUSES = (Event.Status.IN_WAITING, Event.Status.IN_PROGRESS)
+ARCHIVED_STATISTICS_TIMEOUT = 60 * 60
+# Upper bound on the number of ids in one multi-event request
+MAX_STATISTICS_EVENTS = 100
+
+
+def statistics_cache_key(event_id):
+    return f'event_statistics:{event_id}'
+
+
+def annotate_enrollment_counts(queryset):
+    """Annotate events (live or archived) with their enrollment counts by status."""
+    def count_status(value):
+        return Count('enrollments', filter=Q(enrollments__status=value))
+
+    return queryset.select_related('activity').annotate(
+        total_enrolled=count_status(Enrollment.Status.ENROLLED),
+        total_cancelled=count_status(Enrollment.Status.CANCELLED),
+        total_attended=count_status(Enrollment.Status.ATTENDED),
+        total_no_show=count_status(Enrollment.Status.NO_SHOW),
+    )
+
+
+def event_statistics_queryset():
+    """Events annotated with every value returned by `serialize_event_statistics`."""
+    meetings_count = (
+        Meeting.objects
+        .filter(event=OuterRef('pk'))
+        .order_by()
+        .values('event')
+        .annotate(count=Count('id'))
+        .values('count')
+    )
+    return annotate_enrollment_counts(Event.objects.all()).annotate(
+        meetings_count=Coalesce(Subquery(meetings_count, output_field=IntegerField()), Value(0)),
+    )
+
+
+def archived_event_statistics_queryset():
+    """Archived events annotated like `event_statistics_queryset` (meetings_count is a column)."""
+    return annotate_enrollment_counts(ArchivedEvent.objects.all())
+
+
+def serialize_event_statistics(event):
+    """Build the statistics payload from an annotated (live or archived) event."""
+    return {
+        'event_id': str(event.id),
+        'activity_code': event.activity.code,
+        'activity_title': event.activity.title,
+        'start_datetime': event.start_datetime,
+        'end_datetime': event.end_datetime,
+        'status': event.status,
+        'total_enrolled': event.total_enrolled,
+        'total_cancelled': event.total_cancelled,
+        'total_attended': event.total_attended,
+        'total_no_show': event.total_no_show,
+        'max_participants_per_meeting': event.activity.max_participants_per_meeting,
+        'meetings_count': event.meetings_count
+    }
+
+
+def get_events_statistics(event_ids):
+    """
+    Return {event_id: statistics} for the existing events among `event_ids`.
+
+    Cached entries are used as they are; the rest are computed in one
+    query (plus one over the archive for ids not found), and those of live
+    events are cached for a few seconds.
+    """
+    keys = {statistics_cache_key(event_id): event_id for event_id in event_ids}
+    cached = cache.get_many(keys)
+    results = {keys[key]: value for key, value in cached.items()}
+
+    missing = [event_id for event_id in event_ids if event_id not in results]
+    if missing:
+        live = {}
+        for event in event_statistics_queryset().filter(pk__in=missing):
+            data = serialize_event_statistics(event)
+            results[event.id] = data
+            if event.status in LIVE_STATUSES:
+                live[statistics_cache_key(event.id)] = data
+        if live:
+            cache.set_many(live, LIVE_STATISTICS_TIMEOUT)
+
+    missing = [event_id for event_id in event_ids if event_id not in results]
+    if missing:
+        archived = {}
+        for event in archived_event_statistics_queryset().filter(pk__in=missing):
+            data = serialize_event_statistics(event)
+            results[event.id] = data
+            archived[statistics_cache_key(event.id)] = data
+        if archived:
+            cache.set_many(archived, ARCHIVED_STATISTICS_TIMEOUT)
+
+    return results
@@ -2,16 +2,23 @@
 Celery tasks for event notifications and reminders.
 """
 import logging
-import time
 import os
 from datetime import timedelta
 from django.utils import timezone
 from celery import shared_task
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
-from django.db import transaction
+from django.db import IntegrityError, transaction
+from django.db.models import Q
 
-from .models import Event, Enrollment, WaitingRoomParticipant
+from apps.core.task_metrics import record_emails, record_rows, throttle
+
+from .models import Event, EventSchedule, Enrollment, WaitingRoomParticipant
+from .scheduling import SCHEDULE_HORIZON_DAYS, materialize_schedule
+from .waiting_room import (
+    compact_waiting_rooms as compact_finished_waiting_rooms,
+    sweep_stale_participants,
+)
 from apps.meetings.models import Meeting, MeetingParticipant
 from apps.meetings.services import distribute_participants, generate_jitsi_url
 from .emails import (
@@ -42,6 +49,8 @@ def send_first_reminders():
     )
 
     reminders_sent = 0
+    events = list(events)
+    notified = 0
 
     for event in events:
         # Calculate when the reminder should be sent
@@ -58,11 +67,15 @@ def send_first_reminders():
                 if enrollment.user.email:
                     send_first_reminder(enrollment)
                     reminders_sent += 1
-                    time.sleep(float(os.getenv('EMAIL_THROTTLE_DELAY', 0.2)))
+                    record_emails()
+                    throttle(float(os.getenv('EMAIL_THROTTLE_DELAY', 0.2)))
 
             # Mark as sent
             event.first_reminder_sent = True
             event.save()
+            notified += 1
+
+    record_rows(scanned=len(events), acted=notified)
 
     logger.info(f'First reminder task completed. Sent {reminders_sent} reminders.')
     return f'Sent {reminders_sent} first reminders'
@@ -86,6 +99,8 @@ def send_second_reminders():
     )
 
     reminders_sent = 0
+    events = list(events)
+    notified = 0
 
     for event in events:
         # Calculate when the reminder should be sent
@@ -102,11 +117,15 @@ def send_second_reminders():
                 if enrollment.user.email:
                     send_second_reminder(enrollment)
                     reminders_sent += 1
-                    time.sleep(float(os.getenv('EMAIL_THROTTLE_DELAY', 0.2)))
+                    record_emails()
+                    throttle(float(os.getenv('EMAIL_THROTTLE_DELAY', 0.2)))
 
             # Mark as sent
             event.second_reminder_sent = True
             event.save()
+            notified += 1
+
+    record_rows(scanned=len(events), acted=notified)
 
     logger.info(f'Second reminder task completed. Sent {reminders_sent} reminders.')
     return f'Sent {reminders_sent} second reminders'
@@ -129,6 +148,8 @@ def send_waiting_room_notifications():
     )
 
     notifications_sent = 0
+    events = list(events)
+    notified = 0
 
     for event in events:
         # Calculate when waiting room opens
@@ -145,12 +166,16 @@ def send_waiting_room_notifications():
                 if enrollment.user.email:
                     send_waiting_room_notification(enrollment)
                     notifications_sent += 1
-                    time.sleep(float(os.getenv('EMAIL_THROTTLE_DELAY', 0.2)))
+                    record_emails()
+                    throttle(float(os.getenv('EMAIL_THROTTLE_DELAY', 0.2)))
 
             # Mark as sent and update event status
             event.waiting_email_sent = True
             event.status = Event.Status.IN_WAITING
             event.save()
+            notified += 1
+
+    record_rows(scanned=len(events), acted=notified)
 
     logger.info(f'Waiting room notification task completed. Sent {notifications_sent} notifications.')
     return f'Sent {notifications_sent} waiting room notifications'
@@ -172,7 +197,9 @@ def cleanup_old_events():
         end_datetime__lt=now
     )
 
-    updated = events.update(status=Event.Status.COMPLETED)
+    # update() bypasses auto_now; bump updated_at so calendar feed ETags change
+    updated = events.update(status=Event.Status.COMPLETED, updated_at=now)
+    record_rows(scanned=updated, acted=updated)
 
     logger.info(f'Cleanup task completed. Marked {updated} events as completed.')
     return f'Marked {updated} events as completed'
@@ -191,11 +218,17 @@ def create_meetings_for_event(event_id):
         logger.error(f'Event {event_id} not found')
         return f'Event {event_id} not found'
         
+    # Drop participants whose connection died without a close frame
+    swept = sweep_stale_participants(event_id=event.id)
+    if swept:
+        logger.info(f'Marked {swept} stale participants of event {event_id} as disconnected')
+
     # Get active participants
     participants = list(WaitingRoomParticipant.objects.filter(
         event=event,
         status__in=[WaitingRoomParticipant.Status.WAITING, WaitingRoomParticipant.Status.READY]
     ).select_related('user'))
+    record_rows(scanned=len(participants))
     
     # Try to distribute
     max_per_room = getattr(event.activity, 'max_participants_per_meeting', 6)
@@ -246,6 +279,7 @@ def create_meetings_for_event(event_id):
                         status=MeetingParticipant.Status.WAITING
                     ) for p in room_participants
                 ])
+                record_rows(acted=len(room_participants))
             
             # Event status is already set to IN_PROGRESS by the scanner task
             
@@ -289,6 +323,7 @@ def create_meetings_for_events():
     )
     
     dispatched = 0
+    events = list(events)
     for event in events:
         event.status = Event.Status.IN_PROGRESS
         event.save(update_fields=['status', 'updated_at'])
@@ -296,7 +331,79 @@ def create_meetings_for_events():
         create_meetings_for_event.delay(str(event.id))
         dispatched += 1
         
+    record_rows(scanned=len(events), acted=dispatched)
     if dispatched > 0:
         logger.info(f'Dispatched meeting creation for {dispatched} events')
         
     return f'Dispatched {dispatched} events'
+
+
+@shared_task
+def materialize_event_schedules():
+    """
+    Celery task to create the events of recurring schedules up to the horizon.
+
+    This task should be run periodically (e.g., once per hour).
+    """
+    now = timezone.now()
+    horizon_end = now + timedelta(days=SCHEDULE_HORIZON_DAYS)
+
+    schedules = EventSchedule.objects.filter(
+        is_active=True
+    ).filter(
+        Q(materialized_until__isnull=True) | Q(materialized_until__lt=horizon_end)
+    ).select_related('activity')
+
+    created = 0
+    scanned = 0
+    for schedule in schedules:
+        scanned += 1
+        # One failing schedule (e.g. an overlapping run inserting the same
+        # occurrence first) must not stop the others
+        try:
+            with transaction.atomic():
+                result = materialize_schedule(schedule, horizon_end=horizon_end, now=now)
+        except IntegrityError:
+            logger.warning(f'Skipped materializing schedule {schedule.id}: occurrence already exists', exc_info=True)
+            continue
+        created += len(result.created)
+
+    record_rows(scanned=scanned, acted=created)
+
+    logger.info(f'Materialized {created} events from recurring schedules up to {horizon_end}')
+    return f'Materialized {created} events'
+
+
+@shared_task
+def sweep_waiting_rooms():
+    """
+    Celery task to mark waiting room participants that stopped pinging
+    as disconnected.
+
+    This task should be run periodically (e.g., every minute).
+    """
+    swept = sweep_stale_participants()
+    record_rows(scanned=swept, acted=swept)
+
+    if swept:
+        logger.info(f'Marked {swept} stale waiting room participants as disconnected')
+    return f'Marked {swept} participants as disconnected'
+
+
+@shared_task
+def compact_waiting_rooms():
+    """
+    Celery task to record the attendance of finished events and delete
+    their waiting room rows.
+
+    This task should be run periodically (e.g., once per hour).
+    """
+    totals = compact_finished_waiting_rooms()
+    record_rows(scanned=totals['events'], acted=totals['attended'] + totals['no_show'] + totals['deleted'])
+
+    logger.info(
+        f"Compacted the waiting rooms of {totals['events']} events: "
+        f"{totals['attended']} attended, {totals['no_show']} no-show, "
+        f"{totals['deleted']} waiting room rows deleted"
+    )
+    return f"Compacted {totals['events']} waiting rooms"
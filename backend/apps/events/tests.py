@@ -1,4 +1,12 @@
-from django.test import TestCase
+import json
+import secrets
+from io import StringIO
+
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from django.utils import timezone as django_timezone
 from rest_framework.test import APITestCase, APIClient
@@ -8,7 +16,13 @@ import pytz
 
 from apps.users.models import User
 from apps.activities.models import Activity
-from .models import Event, Enrollment
+from apps.core.metrics import worker_name
+from apps.core.testing import QueryCountTestMixin
+from . import socket_metrics
+from .archive import archive_cutoff, archive_events
+from .consumers import WaitingRoomConsumer
+from .models import ArchivedEvent, Event, EventSchedule, Enrollment, WaitingRoomParticipant
+from .waiting_room import compact_waiting_rooms, sweep_stale_participants
 
 
 class EventModelTests(TestCase):
@@ -159,6 +173,95 @@ class EventAPITests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data['results']), 2)
 
+    def test_search_events_by_activity(self):
+        """Test searching events by activity title."""
+        other_activity = Activity.objects.create(
+            code='ACT002',
+            title='Pronunciation Clinic',
+            description='<p>Description</p>',
+            created_by=self.teacher
+        )
+        Event.objects.create(
+            activity=other_activity,
+            start_datetime=django_timezone.now() + timedelta(days=3),
+            end_datetime=django_timezone.now() + timedelta(days=3, hours=1)
+        )
+        self.client.force_authenticate(user=self.student)
+
+        url = reverse('events:event_list_create')
+        response = self.client.get(url, {'search': 'pronunciation'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['activity_code'], 'ACT002')
+
+    def test_search_events_ignores_activity_description(self):
+        """Test that event search only looks at the activity code and title."""
+        other_activity = Activity.objects.create(
+            code='ACT002',
+            title='Pronunciation Clinic',
+            description='<p>Practise vowels</p>',
+            created_by=self.teacher
+        )
+        Event.objects.create(
+            activity=other_activity,
+            start_datetime=django_timezone.now() + timedelta(days=3),
+            end_datetime=django_timezone.now() + timedelta(days=3, hours=1)
+        )
+        self.client.force_authenticate(user=self.student)
+
+        url = reverse('events:event_list_create')
+        response = self.client.get(url, {'search': 'vowels'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 0)
+
+        response = self.client.get(url, {'search': 'nunciation'})
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['activity_code'], 'ACT002')
+
+    def test_list_events_sparse_fieldset(self):
+        """Test that ?fields= narrows the response and skips joins and counts."""
+        self.client.force_authenticate(user=self.student)
+
+        url = reverse('events:event_list_create')
+        response = self.client.get(url, {'fields': 'id,start_datetime,status'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            set(response.data['results'][0].keys()),
+            {'id', 'start_datetime', 'status'}
+        )
+
+        # count + page only
+        with self.assertNumQueries(2) as context:
+            self.client.get(url, {'fields': 'id,start_datetime,status'})
+        page_sql = context.captured_queries[-1]['sql']
+        self.assertNotIn('JOIN', page_sql)
+        self.assertNotIn('COUNT', page_sql)
+
+    def test_list_events_omit_fields(self):
+        """Test that ?omit= removes fields from the response."""
+        self.client.force_authenticate(user=self.student)
+
+        url = reverse('events:event_list_create')
+        response = self.client.get(url, {'omit': 'activity_title,enrolled_count'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        result = response.data['results'][0]
+        self.assertNotIn('activity_title', result)
+        self.assertNotIn('enrolled_count', result)
+        self.assertIn('attended_count', result)
+
+    def test_list_events_unknown_field_fails(self):
+        """Test that unknown field names are rejected."""
+        self.client.force_authenticate(user=self.student)
+
+        url = reverse('events:event_list_create')
+        response = self.client.get(url, {'fields': 'id,colour'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('fields', response.data)
+
     def test_create_event_as_teacher(self):
         """Test creating an event as a teacher."""
         self.client.force_authenticate(user=self.teacher)
@@ -245,7 +348,84 @@ class EventAPITests(APITestCase):
 
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         # 3 days * 2 hours = 6 events
+        self.assertEqual(response.data['created'], 6)
+        self.assertNotIn('events', response.data)
+        self.assertEqual(Event.objects.filter(activity=self.activity, first_reminder_minutes=1440).count(), 6)
+
+    def _bulk_create_data(self, **overrides):
+        start_date = (django_timezone.now() + timedelta(days=5)).date()
+        data = {
+            'activity_code': 'ACT001',
+            'start_date': start_date.isoformat(),
+            'end_date': (start_date + timedelta(days=2)).isoformat(),
+            'hours_utc': ['09:00', '14:00'],
+            'duration_minutes': 60,
+        }
+        data.update(overrides)
+        return data
+
+    def test_bulk_create_returns_created_events(self):
+        """Test that return_events lists the created events without re-fetching them."""
+        self.client.force_authenticate(user=self.teacher)
+
+        url = reverse('events:event_bulk_create')
+        response = self.client.post(url, self._bulk_create_data(return_events=True), format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(len(response.data['events']), 6)
+        starts = [event['start_datetime'] for event in response.data['events']]
+        self.assertEqual(starts, sorted(starts))
+
+    def test_bulk_create_skips_duplicates_and_overlaps(self):
+        """Test that repeated hours and slots overlapping existing events are skipped."""
+        self.client.force_authenticate(user=self.teacher)
+
+        url = reverse('events:event_bulk_create')
+        data = self._bulk_create_data(hours_utc=['09:00', '14:00', '09:00'])
+        start_date = (django_timezone.now() + timedelta(days=5)).date()
+        overlap_start = datetime.combine(start_date, datetime.min.time(), tzinfo=pytz.UTC) + timedelta(hours=14, minutes=30)
+        Event.objects.create(
+            activity=self.activity,
+            start_datetime=overlap_start,
+            end_datetime=overlap_start + timedelta(hours=1)
+        )
+
+        # Activity, row lock, conflict check, and one INSERT inside a savepoint
+        with self.assertNumQueries(6):
+            response = self.client.post(url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 5)
+        self.assertEqual(response.data['skipped_duplicates'], 3)
+        self.assertEqual(response.data['skipped_conflicts'], 1)
+
+    def test_bulk_create_skips_overlapping_new_slots(self):
+        """Test that requested slots closer together than the duration are not both created."""
+        self.client.force_authenticate(user=self.teacher)
+
+        url = reverse('events:event_bulk_create')
+        response = self.client.post(url, self._bulk_create_data(hours_utc=['09:00', '09:30']), format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 3)
+        self.assertEqual(response.data['skipped_conflicts'], 3)
+        created = Event.objects.filter(
+            activity=self.activity,
+            start_datetime__gt=django_timezone.now() + timedelta(days=4)
+        )
+        self.assertEqual({event.start_datetime.minute for event in created}, {0})
+
+    def test_bulk_create_conflict_error(self):
+        """Test that on_conflict=error creates nothing when a slot overlaps."""
+        self.client.force_authenticate(user=self.teacher)
+
+        url = reverse('events:event_bulk_create')
+        self.client.post(url, self._bulk_create_data(), format='json')
+        response = self.client.post(url, self._bulk_create_data(on_conflict='error'), format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['skipped_conflicts'], 6)
+        self.assertEqual(Event.objects.filter(activity=self.activity).count(), 6 + 2)
 
     def test_get_event_detail(self):
         """Test getting event details."""
@@ -302,6 +482,202 @@ class EventAPITests(APITestCase):
         self.assertTrue(Event.objects.filter(id=self.event1.id).exists())
 
 
+class EventScheduleTests(APITestCase):
+    """Tests for recurring event schedules."""
+
+    def setUp(self):
+        """Set up an activity and a daily schedule starting tomorrow."""
+        from django.core.cache import cache
+
+        cache.clear()
+        self.client = APIClient()
+
+        self.teacher = User.objects.create_user(
+            user_code='teacher_001',
+            email='teacher@example.com',
+            password='teacherpass123',
+            role=User.Role.TEACHER
+        )
+        self.student = User.objects.create_user(
+            user_code='student_001',
+            email='student@example.com',
+            password='studentpass123'
+        )
+        self.activity = Activity.objects.create(
+            code='ACT001',
+            title='Test Activity',
+            created_by=self.teacher
+        )
+
+        tomorrow = (django_timezone.now() + timedelta(days=1)).date()
+        self.dtstart = datetime.combine(tomorrow, datetime.min.time(), tzinfo=pytz.UTC) + timedelta(hours=9)
+
+    def _create_schedule(self, **overrides):
+        data = {
+            'activity_code': 'ACT001',
+            'rrule': 'FREQ=DAILY',
+            'dtstart': self.dtstart.isoformat(),
+            'duration_minutes': 60,
+        }
+        data.update(overrides)
+        self.client.force_authenticate(user=self.teacher)
+        return self.client.post(reverse('events:schedule_list_create'), data, format='json')
+
+    def test_create_schedule_materializes_horizon(self):
+        """Test that creating a schedule only creates events within the horizon."""
+        from .scheduling import SCHEDULE_HORIZON_DAYS
+
+        response = self._create_schedule()
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        events = Event.objects.filter(schedule_id=response.data['id'])
+        # Daily occurrences from tomorrow 09:00 up to now + horizon
+        self.assertIn(events.count(), (SCHEDULE_HORIZON_DAYS - 1, SCHEDULE_HORIZON_DAYS))
+        self.assertEqual(events.first().start_datetime, self.dtstart)
+        self.assertEqual(events.first().end_datetime, self.dtstart + timedelta(hours=1))
+
+    def test_materialize_extends_horizon_without_duplicates(self):
+        """Test that materializing again only adds the new occurrences."""
+        from .scheduling import materialize_schedule
+        from .tasks import materialize_event_schedules
+
+        response = self._create_schedule()
+        schedule = EventSchedule.objects.get(pk=response.data['id'])
+        count = schedule.events.count()
+
+        materialize_event_schedules()
+        self.assertEqual(schedule.events.count(), count)
+
+        schedule.refresh_from_db()
+        result = materialize_schedule(schedule, horizon_end=schedule.materialized_until + timedelta(days=7))
+        self.assertEqual(len(result.created), 7)
+        self.assertEqual(schedule.events.count(), count + 7)
+
+    def test_materialize_skips_cancelled_occurrences(self):
+        """Test that a cancelled occurrence is not materialized again."""
+        from .tasks import materialize_event_schedules
+
+        response = self._create_schedule(rrule='FREQ=DAILY;COUNT=3')
+        schedule = EventSchedule.objects.get(pk=response.data['id'])
+        schedule.events.filter(start_datetime=self.dtstart).update(status=Event.Status.CANCELLED)
+        EventSchedule.objects.filter(pk=schedule.pk).update(materialized_until=None)
+
+        materialize_event_schedules()
+
+        self.assertEqual(schedule.events.count(), 3)
+
+    def test_materialize_failure_does_not_stop_other_schedules(self):
+        """Test that an IntegrityError in one schedule is logged and skipped."""
+        from unittest import mock
+        from django.db import IntegrityError
+        from . import tasks
+        from .scheduling import materialize_schedule
+
+        later = (self.dtstart + timedelta(hours=3)).isoformat()
+        first = EventSchedule.objects.get(pk=self._create_schedule(rrule='FREQ=DAILY;COUNT=2').data['id'])
+        second = EventSchedule.objects.get(pk=self._create_schedule(rrule='FREQ=DAILY;COUNT=2', dtstart=later).data['id'])
+        EventSchedule.objects.update(materialized_until=None)
+        Event.objects.all().delete()
+
+        def failing_first(schedule, **kwargs):
+            if schedule.pk == first.pk:
+                raise IntegrityError('unique_schedule_occurrence')
+            return materialize_schedule(schedule, **kwargs)
+
+        with mock.patch.object(tasks, 'materialize_schedule', side_effect=failing_first), \
+                self.assertLogs('apps.events.tasks', level='WARNING'):
+            tasks.materialize_event_schedules()
+
+        self.assertFalse(first.events.exists())
+        self.assertEqual(second.events.count(), 2)
+
+    def test_schedule_skips_existing_events(self):
+        """Test that occurrences overlapping existing events are not created."""
+        Event.objects.create(
+            activity=self.activity,
+            start_datetime=self.dtstart + timedelta(minutes=30),
+            end_datetime=self.dtstart + timedelta(minutes=90)
+        )
+
+        response = self._create_schedule(rrule='FREQ=DAILY;COUNT=3')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Event.objects.filter(schedule_id=response.data['id']).count(), 2)
+
+    def test_invalid_rrule_fails(self):
+        """Test that malformed or too frequent rules are rejected."""
+        self.assertEqual(self._create_schedule(rrule='FREQ=SOMETIMES').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self._create_schedule(rrule='FREQ=MINUTELY').status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_create_schedule_as_student_fails(self):
+        """Test that students cannot create schedules."""
+        self.client.force_authenticate(user=self.student)
+        response = self.client.post(reverse('events:schedule_list_create'), {}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_occurrences_include_virtual(self):
+        """Test that occurrences beyond the horizon are expanded on demand."""
+        response = self._create_schedule(rrule='FREQ=WEEKLY')
+        schedule_id = response.data['id']
+
+        self.client.force_authenticate(user=self.student)
+        url = reverse('events:schedule_occurrences', kwargs={'pk': schedule_id})
+        end = self.dtstart + timedelta(weeks=8)
+        response = self.client.get(url, {'start': self.dtstart.isoformat(), 'end': end.isoformat()})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        occurrences = response.data['occurrences']
+        self.assertEqual(len(occurrences), 8)
+        self.assertTrue(occurrences[0]['materialized'])
+        self.assertFalse(occurrences[-1]['materialized'])
+        self.assertIsNone(occurrences[-1]['event_id'])
+        self.assertEqual(Event.objects.filter(schedule_id=schedule_id).count(), 2)
+
+    def test_occurrences_of_hidden_schedules_not_found(self):
+        """Test that inactive schedules and inactive activities hide their occurrences."""
+        schedule_id = self._create_schedule(rrule='FREQ=WEEKLY').data['id']
+        url = reverse('events:schedule_occurrences', kwargs={'pk': schedule_id})
+
+        Activity.objects.filter(id=self.activity.id).update(is_active=False)
+        self.client.force_authenticate(user=self.student)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+        # The owner still sees the schedule of an inactive activity...
+        self.client.force_authenticate(user=self.teacher)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+        # ...but not once the schedule itself is inactive
+        EventSchedule.objects.filter(id=schedule_id).update(is_active=False)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_activity_feed_includes_virtual_occurrences(self):
+        """Test that the activity feed lists future occurrences with stable UIDs."""
+        from .calendar import make_feed_token, _format_datetime
+
+        response = self._create_schedule(rrule='FREQ=WEEKLY;COUNT=6')
+        schedule_id = response.data['id']
+
+        url = reverse('events:activity_calendar', kwargs={'token': make_feed_token(self.student), 'code': 'ACT001'})
+        content = b''.join(self.client.get(url).streaming_content).decode()
+
+        self.assertEqual(content.count('BEGIN:VEVENT'), 6)
+        self.assertIn(f'UID:{schedule_id}-{_format_datetime(self.dtstart)}@talkabout', content)
+        self.assertIn(f'UID:{schedule_id}-{_format_datetime(self.dtstart + timedelta(weeks=5))}@talkabout', content)
+
+    def test_delete_schedule_keeps_enrolled_events(self):
+        """Test that deleting a schedule removes only its future events without enrollments."""
+        response = self._create_schedule(rrule='FREQ=DAILY;COUNT=3')
+        schedule_id = response.data['id']
+        enrolled_event = Event.objects.filter(schedule_id=schedule_id).first()
+        Enrollment.objects.create(user=self.student, event=enrolled_event)
+
+        response = self.client.delete(reverse('events:schedule_detail', kwargs={'pk': schedule_id}))
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(list(Event.objects.filter(activity=self.activity)), [enrolled_event])
+
+
 class EnrollmentAPITests(APITestCase):
     """Tests for Enrollment API endpoints."""
 
@@ -426,6 +802,23 @@ class EnrollmentAPITests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data['results']), 1)
 
+    def test_my_enrollments_sparse_fieldset(self):
+        """Test that enrollment listings only join what the fields need."""
+        self.client.force_authenticate(user=self.student)
+        Enrollment.objects.create(
+            user=self.student,
+            event=self.event,
+            status=Enrollment.Status.ENROLLED
+        )
+
+        url = reverse('events:my_enrollments')
+        with self.assertNumQueries(2) as context:
+            response = self.client.get(url, {'fields': 'id,event_id,status'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['event_id'], str(self.event.id))
+        self.assertNotIn('JOIN', context.captured_queries[-1]['sql'])
+
     def test_view_event_enrollments_as_student_fails(self):
         """Test that students cannot view event enrollments."""
         self.client.force_authenticate(user=self.student)
@@ -436,61 +829,124 @@ class EnrollmentAPITests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
 
 
-class TimezoneConversionTests(APITestCase):
-    """Tests for timezone conversion."""
+class EnrollmentExportTests(APITestCase):
+    """Tests for streaming enrollment exports."""
 
     def setUp(self):
-        """Set up test client."""
+        """Set up an event with two enrollments."""
         self.client = APIClient()
 
-        self.student = User.objects.create_user(
-            user_code='student_001',
-            email='student@example.com',
-            password='studentpass123',
-            role=User.Role.STUDENT
+        self.teacher = User.objects.create_user(
+            user_code='teacher_001',
+            email='teacher@example.com',
+            password='teacherpass123',
+            role=User.Role.TEACHER
         )
 
-    def test_convert_timezone(self):
-        """Test converting timezone."""
-        self.client.force_authenticate(user=self.student)
+        self.activity = Activity.objects.create(
+            code='ACT001',
+            title='Test Activity',
+            description='<p>Description</p>',
+            created_by=self.teacher
+        )
 
-        url = reverse('events:convert_timezone')
+        self.event = Event.objects.create(
+            activity=self.activity,
+            start_datetime=django_timezone.now() + timedelta(days=1),
+            end_datetime=django_timezone.now() + timedelta(days=1, hours=1)
+        )
 
-        # Convert UTC to Mexico City time
-        utc_time = datetime(2024, 1, 15, 14, 0, 0, tzinfo=pytz.UTC)
+        self.students = []
+        for index in range(2):
+            student = User.objects.create_user(
+                user_code=f'student_{index:03d}',
+                email=f'student{index}@example.com',
+                password='studentpass123'
+            )
+            Enrollment.objects.create(user=student, event=self.event)
+            self.students.append(student)
 
-        data = {
-            'datetime_utc': utc_time.isoformat(),
-            'target_timezone': 'America/Mexico_City'
-        }
+    def _content(self, response):
+        return b''.join(response.streaming_content).decode()
 
-        response = self.client.post(url, data, format='json')
+    def test_export_event_enrollments_csv(self):
+        """Test exporting an event's enrollments as CSV."""
+        import csv
+        import io
+
+        self.client.force_authenticate(user=self.teacher)
+
+        url = reverse('events:event_enrollments_export', kwargs={'pk': self.event.id, 'file_format': 'csv'})
+        response = self.client.get(url)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertIn('datetime_local', response.data)
-        self.assertEqual(response.data['timezone'], 'America/Mexico_City')
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
 
-    def test_convert_invalid_timezone_fails(self):
-        """Test that invalid timezone fails."""
-        self.client.force_authenticate(user=self.student)
+        rows = list(csv.DictReader(io.StringIO(self._content(response))))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual({row['user_code'] for row in rows}, {'student_000', 'student_001'})
+        self.assertEqual(rows[0]['activity_code'], 'ACT001')
+        self.assertEqual(rows[0]['status'], Enrollment.Status.ENROLLED)
 
-        url = reverse('events:convert_timezone')
+    def test_export_event_enrollments_ndjson(self):
+        """Test exporting an event's enrollments as NDJSON."""
+        import json
 
-        data = {
-            'datetime_utc': datetime.now(pytz.UTC).isoformat(),
-            'target_timezone': 'Invalid/Timezone'
-        }
+        self.client.force_authenticate(user=self.teacher)
 
-        response = self.client.post(url, data, format='json')
+        url = reverse('events:event_enrollments_export', kwargs={'pk': self.event.id, 'file_format': 'ndjson'})
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rows = [json.loads(line) for line in self._content(response).splitlines()]
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]['event_id'], str(self.event.id))
+
+    def test_export_activity_enrollments(self):
+        """Test exporting the enrollments of every event of an activity."""
+        other_event = Event.objects.create(
+            activity=self.activity,
+            start_datetime=django_timezone.now() + timedelta(days=2),
+            end_datetime=django_timezone.now() + timedelta(days=2, hours=1)
+        )
+        Enrollment.objects.create(user=self.students[0], event=other_event)
+        self.client.force_authenticate(user=self.teacher)
+
+        url = reverse('activities:activity_enrollments_export', kwargs={'code': 'ACT001', 'file_format': 'ndjson'})
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(self._content(response).splitlines()), 3)
+
+    def test_export_unknown_format_fails(self):
+        """Test that unsupported formats are rejected."""
+        self.client.force_authenticate(user=self.teacher)
+
+        url = reverse('events:event_enrollments_export', kwargs={'pk': self.event.id, 'file_format': 'xlsx'})
+        response = self.client.get(url)
 
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_export_as_student_fails(self):
+        """Test that students cannot export enrollments."""
+        self.client.force_authenticate(user=self.students[0])
+
+        url = reverse('events:event_enrollments_export', kwargs={'pk': self.event.id, 'file_format': 'csv'})
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
 
-class EventStatisticsTests(APITestCase):
-    """Tests for event statistics."""
+
+class CalendarFeedTests(APITestCase):
+    """Tests for the iCalendar feeds."""
 
     def setUp(self):
-        """Set up test data."""
+        """Set up an activity with two events, one of them enrolled."""
+        from django.core.cache import cache
+        from .calendar import make_feed_token
+
+        cache.clear()
         self.client = APIClient()
 
         self.teacher = User.objects.create_user(
@@ -499,47 +955,1064 @@ class EventStatisticsTests(APITestCase):
             password='teacherpass123',
             role=User.Role.TEACHER
         )
+        self.student = User.objects.create_user(
+            user_code='student_001',
+            email='student@example.com',
+            password='studentpass123'
+        )
 
         self.activity = Activity.objects.create(
             code='ACT001',
-            title='Test Activity',
+            title='Test Activity, English',
             description='<p>Description</p>',
-            max_participants_per_meeting=6,
             created_by=self.teacher
         )
 
+        start = django_timezone.now() + timedelta(days=1)
         self.event = Event.objects.create(
             activity=self.activity,
-            start_datetime=django_timezone.now() + timedelta(days=1),
-            end_datetime=django_timezone.now() + timedelta(days=1, hours=1),
-            waiting_time_minutes=10
+            start_datetime=start,
+            end_datetime=start + timedelta(hours=1)
+        )
+        self.other_event = Event.objects.create(
+            activity=self.activity,
+            start_datetime=start + timedelta(days=1),
+            end_datetime=start + timedelta(days=1, hours=1)
         )
+        self.enrollment = Enrollment.objects.create(user=self.student, event=self.event)
 
-    def test_get_event_statistics(self):
-        """Test getting event statistics."""
-        self.client.force_authenticate(user=self.teacher)
+        self.token = make_feed_token(self.student)
+        self.url = reverse('events:my_events_calendar', kwargs={'token': self.token})
 
-        # Create some enrollments
-        student1 = User.objects.create_user(
-            user_code='student_001',
-            email='student1@test.com',
-            password='pass123',
-            role=User.Role.STUDENT
-        )
+    def _content(self, response):
+        return b''.join(response.streaming_content).decode()
 
-        student2 = User.objects.create_user(
-            user_code='student_002',
-            email='student2@test.com',
-            password='pass123',
-            role=User.Role.STUDENT
-        )
+    def test_subscription_urls(self):
+        """Test getting the feed URLs for the current user."""
+        self.client.force_authenticate(user=self.student)
 
-        Enrollment.objects.create(user=student1, event=self.event, status=Enrollment.Status.ENROLLED)
-        Enrollment.objects.create(user=student2, event=self.event, status=Enrollment.Status.ENROLLED)
+        response = self.client.get(reverse('events:calendar_subscription'), {'activity': 'ACT001'})
 
-        url = reverse('events:event_statistics', kwargs={'pk': self.event.id})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['my_events_url'].endswith(self.url))
+        self.assertIn('/activities/ACT001.ics', response.data['activity_url'])
+
+    def test_my_events_feed(self):
+        """Test that the user feed lists only enrolled events."""
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+
+        content = self._content(response)
+        self.assertTrue(content.startswith('BEGIN:VCALENDAR\r\n'))
+        self.assertEqual(content.count('BEGIN:VEVENT'), 1)
+        self.assertIn(f'UID:{self.event.id}@talkabout', content)
+        self.assertIn('SUMMARY:ACT001: Test Activity\\, English', content)
+
+    def test_activity_feed(self):
+        """Test that the activity feed lists every event of the activity."""
+        url = reverse('events:activity_calendar', kwargs={'token': self.token, 'code': 'ACT001'})
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self._content(response).count('BEGIN:VEVENT'), 2)
+
+    def test_inactive_activity_feed_hidden_from_students(self):
+        """Test that students cannot subscribe to inactive activities."""
+        from .calendar import make_feed_token
+
+        self.activity.is_active = False
+        self.activity.save()
+
+        url = reverse('events:activity_calendar', kwargs={'token': self.token, 'code': 'ACT001'})
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+        url = reverse('events:activity_calendar', kwargs={'token': make_feed_token(self.teacher), 'code': 'ACT001'})
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+    def test_invalid_token_fails(self):
+        """Test that tampered tokens are rejected."""
+        url = reverse('events:my_events_calendar', kwargs={'token': self.token + 'x'})
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_unchanged_feed_not_modified(self):
+        """Test that a matching If-None-Match gets a 304 with two queries."""
+        response = self.client.get(self.url)
+        self._content(response)
+        etag = response['ETag']
+
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_cached_feed_skips_event_query(self):
+        """Test that a repeated request is served from the cache."""
+        self._content(self.client.get(self.url))
+
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+            content = self._content(response)
+
+        self.assertEqual(content.count('BEGIN:VEVENT'), 1)
+
+    def test_enrollment_change_invalidates_feed(self):
+        """Test that enrolling in another event changes the ETag and body."""
+        response = self.client.get(self.url)
+        self._content(response)
+        etag = response['ETag']
+
+        Enrollment.objects.create(user=self.student, event=self.other_event)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(self._content(response).count('BEGIN:VEVENT'), 2)
+
+    def test_enrollment_swap_invalidates_feed(self):
+        """Test that swapping an enrollment for an older event changes the ETag."""
+        third_event = Event.objects.create(
+            activity=self.activity,
+            start_datetime=self.other_event.start_datetime + timedelta(days=1),
+            end_datetime=self.other_event.end_datetime + timedelta(days=1)
+        )
+        # Neither event count nor the latest event updated_at will change
+        Event.objects.filter(id__in=[self.other_event.id, third_event.id]).update(
+            updated_at=self.event.updated_at - timedelta(days=1)
+        )
+        Enrollment.objects.create(user=self.student, event=self.other_event)
+
+        response = self.client.get(self.url)
+        self._content(response)
+        etag = response['ETag']
+
+        Enrollment.objects.get(user=self.student, event=self.other_event).cancel()
+        Enrollment.objects.create(user=self.student, event=third_event)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn(f'UID:{third_event.id}@talkabout', self._content(response))
+
+    def test_event_change_invalidates_feed(self):
+        """Test that cancelling an event changes the feed."""
+        response = self.client.get(self.url)
+        self._content(response)
+
+        self.event.status = Event.Status.CANCELLED
+        self.event.save()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('STATUS:CANCELLED', self._content(response))
+
+    def test_activity_feed_changes_with_the_day(self):
+        """Test that the activity feed ETag rolls with the occurrence window."""
+        from unittest import mock
+
+        url = reverse('events:activity_calendar', kwargs={'token': self.token, 'code': 'ACT001'})
+        response = self.client.get(url)
+        self._content(response)
+
+        tomorrow = django_timezone.now() + timedelta(days=1)
+        with mock.patch('django.utils.timezone.now', return_value=tomorrow):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_long_lines_are_folded(self):
+        """Test that content lines are folded at 75 octets."""
+        from .calendar import _fold
+
+        folded = _fold('SUMMARY:' + 'é' * 80)
+
+        for line in folded.split('\r\n'):
+            self.assertLessEqual(len(line.encode('utf-8')), 75)
+        self.assertEqual(folded.replace('\r\n ', ''), 'SUMMARY:' + 'é' * 80 + '\r\n')
+
+
+class TimezoneConversionTests(APITestCase):
+    """Tests for timezone conversion."""
+
+    def setUp(self):
+        """Set up test client."""
+        self.client = APIClient()
+
+        self.student = User.objects.create_user(
+            user_code='student_001',
+            email='student@example.com',
+            password='studentpass123',
+            role=User.Role.STUDENT
+        )
+
+    def test_convert_timezone(self):
+        """Test converting timezone."""
+        self.client.force_authenticate(user=self.student)
+
+        url = reverse('events:convert_timezone')
+
+        # Convert UTC to Mexico City time
+        utc_time = datetime(2024, 1, 15, 14, 0, 0, tzinfo=pytz.UTC)
+
+        data = {
+            'datetime_utc': utc_time.isoformat(),
+            'target_timezone': 'America/Mexico_City'
+        }
+
+        response = self.client.post(url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('datetime_local', response.data)
+        self.assertEqual(response.data['timezone'], 'America/Mexico_City')
+
+    def test_convert_invalid_timezone_fails(self):
+        """Test that invalid timezone fails."""
+        self.client.force_authenticate(user=self.student)
+
+        url = reverse('events:convert_timezone')
+
+        data = {
+            'datetime_utc': datetime.now(pytz.UTC).isoformat(),
+            'target_timezone': 'Invalid/Timezone'
+        }
+
+        response = self.client.post(url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_convert_timezone_batch(self):
+        """Test converting several datetimes in one request."""
+        self.client.force_authenticate(user=self.student)
+
+        url = reverse('events:convert_timezone_batch')
+        utc_time = datetime(2024, 1, 15, 14, 0, 0, tzinfo=pytz.UTC).isoformat()
+        data = {
+            'items': [
+                {'datetime_utc': utc_time, 'target_timezone': 'America/Mexico_City'},
+                {'datetime_utc': utc_time, 'target_timezone': 'Europe/Madrid'},
+                {'datetime_utc': utc_time, 'target_timezone': 'America/Mexico_City'},
+            ]
+        }
+
+        response = self.client.post(url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results']
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results[0]['datetime_local'], '2024-01-15T08:00:00-06:00')
+        self.assertEqual(results[1]['datetime_local'], '2024-01-15T15:00:00+01:00')
+
+    def test_convert_timezone_batch_invalid_item_fails(self):
+        """Test that one invalid timezone rejects the batch and points at the item."""
+        self.client.force_authenticate(user=self.student)
+
+        url = reverse('events:convert_timezone_batch')
+        utc_time = datetime.now(pytz.UTC).isoformat()
+        data = {
+            'items': [
+                {'datetime_utc': utc_time, 'target_timezone': 'UTC'},
+                {'datetime_utc': utc_time, 'target_timezone': 'Invalid/Timezone'},
+            ]
+        }
+
+        response = self.client.post(url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(1, response.data['items'])
+
+    def test_event_list_localized(self):
+        """Test that ?localize=true adds times in the user's timezone."""
+        teacher = User.objects.create_user(
+            user_code='teacher_001',
+            email='teacher@example.com',
+            password='teacherpass123',
+            role=User.Role.TEACHER
+        )
+        activity = Activity.objects.create(code='ACT001', title='Test Activity', created_by=teacher)
+        start = datetime(2030, 1, 15, 14, 0, 0, tzinfo=pytz.UTC)
+        Event.objects.create(activity=activity, start_datetime=start, end_datetime=start + timedelta(hours=1))
+
+        self.student.timezone = 'America/Mexico_City'
+        self.student.save()
+        self.client.force_authenticate(user=self.student)
+
+        url = reverse('events:event_list_create')
+        response = self.client.get(url)
+        self.assertNotIn('start_datetime_local', response.data['results'][0])
+
+        response = self.client.get(url, {'localize': 'true'})
+        event = response.data['results'][0]
+        self.assertEqual(event['start_datetime_local'], '2030-01-15T08:00:00-06:00')
+        self.assertEqual(event['end_datetime_local'], '2030-01-15T09:00:00-06:00')
+
+
+class EventStatisticsTests(APITestCase):
+    """Tests for event statistics."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.client = APIClient()
+
+        self.teacher = User.objects.create_user(
+            user_code='teacher_001',
+            email='teacher@example.com',
+            password='teacherpass123',
+            role=User.Role.TEACHER
+        )
+
+        self.activity = Activity.objects.create(
+            code='ACT001',
+            title='Test Activity',
+            description='<p>Description</p>',
+            max_participants_per_meeting=6,
+            created_by=self.teacher
+        )
+
+        self.event = Event.objects.create(
+            activity=self.activity,
+            start_datetime=django_timezone.now() + timedelta(days=1),
+            end_datetime=django_timezone.now() + timedelta(days=1, hours=1),
+            waiting_time_minutes=10
+        )
+
+    def test_get_event_statistics(self):
+        """Test getting event statistics."""
+        self.client.force_authenticate(user=self.teacher)
+
+        # Create some enrollments
+        student1 = User.objects.create_user(
+            user_code='student_001',
+            email='student1@test.com',
+            password='pass123',
+            role=User.Role.STUDENT
+        )
+
+        student2 = User.objects.create_user(
+            user_code='student_002',
+            email='student2@test.com',
+            password='pass123',
+            role=User.Role.STUDENT
+        )
+
+        Enrollment.objects.create(user=student1, event=self.event, status=Enrollment.Status.ENROLLED)
+        Enrollment.objects.create(user=student2, event=self.event, status=Enrollment.Status.ENROLLED)
+
+        url = reverse('events:event_statistics', kwargs={'pk': self.event.id})
         response = self.client.get(url)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['total_enrolled'], 2)
         self.assertEqual(response.data['activity_code'], 'ACT001')
+
+    def test_event_statistics_single_query(self):
+        """Test that statistics, including meetings, are computed in one query."""
+        from apps.meetings.models import Meeting
+
+        student = User.objects.create_user(user_code='student_001', email='s1@test.com', password='pass123')
+        Enrollment.objects.create(user=student, event=self.event, status=Enrollment.Status.ATTENDED)
+        for index in range(2):
+            Meeting.objects.create(
+                event=self.event,
+                meeting_url=f'https://meet.jit.si/test-{index}',
+                meeting_id=f'test-{index}',
+                start_time=django_timezone.now()
+            )
+        self.client.force_authenticate(user=self.teacher)
+
+        url = reverse('events:event_statistics', kwargs={'pk': self.event.id})
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+
+        self.assertEqual(response.data['total_attended'], 1)
+        self.assertEqual(response.data['total_enrolled'], 0)
+        self.assertEqual(response.data['meetings_count'], 2)
+        self.assertEqual(response.data['max_participants_per_meeting'], 6)
+
+    def test_event_statistics_not_found(self):
+        """Test that unknown events return 404."""
+        import uuid
+
+        self.client.force_authenticate(user=self.teacher)
+
+        url = reverse('events:event_statistics', kwargs={'pk': uuid.uuid4()})
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_live_event_statistics_cached(self):
+        """Test that statistics of an event in progress are briefly cached."""
+        from django.core.cache import cache
+
+        cache.clear()
+        self.event.status = Event.Status.IN_PROGRESS
+        self.event.save()
+        self.client.force_authenticate(user=self.teacher)
+
+        url = reverse('events:event_statistics', kwargs={'pk': self.event.id})
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+
+        self.assertEqual(response.data['status'], Event.Status.IN_PROGRESS)
+        cache.clear()
+
+    def test_multiple_events_statistics(self):
+        """Test getting the statistics of several events in one query."""
+        import uuid
+
+        other_event = Event.objects.create(
+            activity=self.activity,
+            start_datetime=django_timezone.now() + timedelta(days=2),
+            end_datetime=django_timezone.now() + timedelta(days=2, hours=1)
+        )
+        self.client.force_authenticate(user=self.teacher)
+
+        url = reverse('events:events_statistics')
+        ids = [other_event.id, uuid.uuid4(), self.event.id]
+        # The unknown id is also looked up in the archive
+        with self.assertNumQueries(2):
+            response = self.client.get(url, {'ids': ','.join(str(event_id) for event_id in ids)})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [result['event_id'] for result in response.data['results']],
+            [str(other_event.id), str(self.event.id)]
+        )
+
+    def test_multiple_events_statistics_invalid_ids(self):
+        """Test that malformed ids are rejected."""
+        self.client.force_authenticate(user=self.teacher)
+
+        response = self.client.get(reverse('events:events_statistics'), {'ids': 'not-a-uuid'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class EventArchiveTests(APITestCase):
+    """Tests for archiving finished events."""
+
+    def setUp(self):
+        """Set up test data."""
+        from apps.meetings.models import Meeting, MeetingParticipant
+
+        self.teacher = User.objects.create_user(
+            user_code='teacher_001',
+            email='teacher@example.com',
+            password='teacherpass123',
+            role=User.Role.TEACHER
+        )
+        self.student = User.objects.create_user(
+            user_code='student_001',
+            email='student@example.com',
+            password='studentpass123',
+            role=User.Role.STUDENT
+        )
+        self.activity = Activity.objects.create(
+            code='ACT001',
+            title='Test Activity',
+            description='<p>Description</p>',
+            created_by=self.teacher
+        )
+
+        start = django_timezone.now() - timedelta(days=400)
+        self.old_event = Event.objects.create(
+            activity=self.activity,
+            start_datetime=start,
+            end_datetime=start + timedelta(hours=1),
+            status=Event.Status.COMPLETED
+        )
+        enrollment = Enrollment.objects.create(
+            user=self.student, event=self.old_event, status=Enrollment.Status.ATTENDED
+        )
+        WaitingRoomParticipant.objects.create(
+            event=self.old_event, user=self.student, enrollment=enrollment
+        )
+        meeting = Meeting.objects.create(
+            event=self.old_event,
+            meeting_url='https://meet.jit.si/old',
+            meeting_id='old-group-1',
+            start_time=start
+        )
+        MeetingParticipant.objects.create(meeting=meeting, user=self.student)
+
+        self.recent_event = Event.objects.create(
+            activity=self.activity,
+            start_datetime=django_timezone.now() - timedelta(days=2),
+            end_datetime=django_timezone.now() - timedelta(days=2) + timedelta(hours=1),
+            status=Event.Status.COMPLETED
+        )
+
+    def test_archive_moves_old_events(self):
+        """Test that old finished events and their rows move to the archive."""
+        from apps.meetings.models import ArchivedMeetingParticipant, Meeting, MeetingParticipant
+
+        archived = archive_events(archive_cutoff(180), batch_size=1)
+
+        self.assertEqual(archived, 1)
+        self.assertFalse(Event.objects.filter(pk=self.old_event.pk).exists())
+        self.assertTrue(Event.objects.filter(pk=self.recent_event.pk).exists())
+        self.assertFalse(Enrollment.objects.exists())
+        self.assertFalse(WaitingRoomParticipant.objects.exists())
+        self.assertFalse(Meeting.objects.exists())
+        self.assertFalse(MeetingParticipant.objects.exists())
+
+        archived_event = ArchivedEvent.objects.get(pk=self.old_event.pk)
+        self.assertEqual(archived_event.meetings_count, 1)
+        self.assertEqual(archived_event.enrollments.get().status, Enrollment.Status.ATTENDED)
+        self.assertEqual(archived_event.waiting_room_participants.count(), 1)
+        self.assertEqual(ArchivedMeetingParticipant.objects.get().meeting_id, 'old-group-1')
+
+    def test_archived_event_statistics(self):
+        """Test that statistics are still served for archived events."""
+        archive_events(archive_cutoff(180))
+        self.client.force_authenticate(user=self.teacher)
+
+        url = reverse('events:event_statistics', kwargs={'pk': self.old_event.id})
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_attended'], 1)
+        self.assertEqual(response.data['meetings_count'], 1)
+
+    def test_rollups_unchanged_by_archiving(self):
+        """Test that activity rollups include the archived rows."""
+        from apps.activities.rollups import compute_daily_stats
+
+        before = compute_daily_stats()
+        archive_events(archive_cutoff(180))
+
+        self.assertEqual(compute_daily_stats(), before)
+
+    def test_archiving_flags_rollup_days(self):
+        """Test that archiving runs the delete signals and keeps the rollup values."""
+        from apps.activities.models import ActivityDailyStats
+        from apps.activities.rollups import refresh_rollups
+
+        refresh_rollups()
+        day = self.old_event.start_datetime.date()
+        before = ActivityDailyStats.objects.filter(date=day).values(
+            'events_total', 'enrollments_attended', 'meetings_total', 'meeting_participants_total').get()
+
+        archive_events(archive_cutoff(180))
+        self.assertTrue(ActivityDailyStats.objects.get(date=day).is_dirty)
+
+        refresh_rollups()
+        after = ActivityDailyStats.objects.filter(date=day).values(*before).get()
+        self.assertEqual(after, before)
+
+    def test_deleting_user_flags_archived_days(self):
+        """Test that deleting a user flags the days of their archived rows."""
+        from apps.activities.models import ActivityDailyStats
+        from apps.activities.rollups import refresh_rollups
+
+        archive_events(archive_cutoff(180))
+        refresh_rollups()
+
+        self.student.delete()
+
+        self.assertTrue(ActivityDailyStats.objects.get(date=self.old_event.start_datetime.date()).is_dirty)
+        refresh_rollups()
+        row = ActivityDailyStats.objects.get(date=self.old_event.start_datetime.date())
+        self.assertEqual(row.enrollments_total, 0)
+        self.assertEqual(row.meeting_participants_total, 0)
+
+    def test_archive_command(self):
+        """Test the management command, including --dry-run."""
+        from io import StringIO
+        from django.core.management import call_command
+
+        out = StringIO()
+        call_command('archive_events', '--dry-run', stdout=out)
+        self.assertIn('1 events', out.getvalue())
+        self.assertTrue(Event.objects.filter(pk=self.old_event.pk).exists())
+
+        call_command('archive_events', '--days', '1', stdout=out)
+        self.assertEqual(ArchivedEvent.objects.count(), 2)
+        self.assertFalse(Event.objects.exists())
+
+
+class WaitingRoomCompactionTests(TestCase):
+    """Tests for recording attendance and purging finished waiting rooms."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.teacher = User.objects.create_user(
+            user_code='teacher_001',
+            email='teacher@example.com',
+            password='teacherpass123',
+            role=User.Role.TEACHER
+        )
+        self.activity = Activity.objects.create(
+            code='ACT001',
+            title='Test Activity',
+            description='<p>Description</p>',
+            created_by=self.teacher
+        )
+        self.students = [
+            User.objects.create_user(
+                user_code=f'student_{index:03d}',
+                email=f'student{index}@example.com',
+                password='studentpass123'
+            )
+            for index in range(3)
+        ]
+
+        start = django_timezone.now() - timedelta(hours=3)
+        self.event = Event.objects.create(
+            activity=self.activity,
+            start_datetime=start,
+            end_datetime=start + timedelta(hours=1),
+            status=Event.Status.COMPLETED
+        )
+        self.enrollments = [
+            Enrollment.objects.create(user=student, event=self.event) for student in self.students
+        ]
+
+    def test_compaction_records_attendance_and_purges(self):
+        """Test that waiting room presence becomes attendance and rows are deleted."""
+        from apps.meetings.models import Meeting, MeetingParticipant
+
+        WaitingRoomParticipant.objects.create(
+            event=self.event, user=self.students[0], status=WaitingRoomParticipant.Status.DISCONNECTED
+        )
+        meeting = Meeting.objects.create(
+            event=self.event,
+            meeting_url='https://meet.jit.si/test',
+            meeting_id='test-group-1',
+            start_time=self.event.start_datetime
+        )
+        MeetingParticipant.objects.create(meeting=meeting, user=self.students[1])
+
+        totals = compact_waiting_rooms()
+
+        self.assertEqual(totals, {'events': 1, 'attended': 2, 'no_show': 1, 'deleted': 1})
+        statuses = [Enrollment.objects.get(pk=enrollment.pk).status for enrollment in self.enrollments]
+        self.assertEqual(statuses, [
+            Enrollment.Status.ATTENDED, Enrollment.Status.ATTENDED, Enrollment.Status.NO_SHOW
+        ])
+        self.assertFalse(WaitingRoomParticipant.objects.exists())
+        self.assertEqual(compact_waiting_rooms()['events'], 0)
+
+    def test_compaction_skips_live_events(self):
+        """Test that events that have not finished are left alone."""
+        self.event.status = Event.Status.IN_PROGRESS
+        self.event.save()
+        WaitingRoomParticipant.objects.create(event=self.event, user=self.students[0])
+
+        self.assertEqual(compact_waiting_rooms()['events'], 0)
+        self.assertTrue(WaitingRoomParticipant.objects.exists())
+        self.assertFalse(Enrollment.objects.exclude(status=Enrollment.Status.ENROLLED).exists())
+
+    def test_compaction_of_cancelled_event(self):
+        """Test that cancelled events are purged without recording attendance."""
+        self.event.status = Event.Status.CANCELLED
+        self.event.save()
+        WaitingRoomParticipant.objects.create(event=self.event, user=self.students[0])
+
+        totals = compact_waiting_rooms()
+
+        self.assertEqual(totals['deleted'], 1)
+        self.assertEqual(totals['attended'] + totals['no_show'], 0)
+
+
+class StaleParticipantSweepTests(TestCase):
+    """Tests for the stale waiting room participant sweeper."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.teacher = User.objects.create_user(
+            user_code='teacher_001',
+            email='teacher@example.com',
+            password='teacherpass123',
+            role=User.Role.TEACHER
+        )
+        self.activity = Activity.objects.create(
+            code='ACT001',
+            title='Test Activity',
+            description='<p>Description</p>',
+            created_by=self.teacher
+        )
+        self.event = Event.objects.create(
+            activity=self.activity,
+            start_datetime=django_timezone.now(),
+            end_datetime=django_timezone.now() + timedelta(hours=1),
+            status=Event.Status.IN_PROGRESS
+        )
+
+        now = django_timezone.now()
+        self.participants = [
+            WaitingRoomParticipant.objects.create(
+                event=self.event,
+                user=User.objects.create_user(
+                    user_code=f'student_{index:03d}',
+                    email=f'student{index}@example.com',
+                    password='studentpass123'
+                ),
+                last_seen=last_seen
+            )
+            for index, last_seen in enumerate([now, now, now - timedelta(minutes=5)])
+        ]
+
+    def test_sweep_marks_stale_participants(self):
+        """Test that only participants not seen recently are disconnected."""
+        with self.assertNumQueries(1):
+            swept = sweep_stale_participants()
+
+        self.assertEqual(swept, 1)
+        statuses = [WaitingRoomParticipant.objects.get(pk=p.pk).status for p in self.participants]
+        self.assertEqual(statuses, [
+            WaitingRoomParticipant.Status.WAITING,
+            WaitingRoomParticipant.Status.WAITING,
+            WaitingRoomParticipant.Status.DISCONNECTED,
+        ])
+
+    def test_ping_revives_swept_participant(self):
+        """Test that a participant that pings again is back on the waiting list."""
+        sweep_stale_participants()
+        participant = WaitingRoomParticipant.objects.get(pk=self.participants[2].pk)
+
+        participant.update_last_seen()
+
+        participant.refresh_from_db()
+        self.assertEqual(participant.status, WaitingRoomParticipant.Status.WAITING)
+
+    @override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+    def test_meetings_exclude_stale_participants(self):
+        """Test that grouping sweeps stale participants first."""
+        from apps.meetings.models import MeetingParticipant
+        from .tasks import create_meetings_for_event
+
+        create_meetings_for_event(str(self.event.id))
+
+        self.assertEqual(
+            set(MeetingParticipant.objects.values_list('user_id', flat=True)),
+            {self.participants[0].user_id, self.participants[1].user_id}
+        )
+
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class WaitingRoomMetricsTests(TestCase):
+    """Tests for the waiting room WebSocket metrics."""
+
+    def setUp(self):
+        """Set up test data."""
+        cache.clear()
+        self.worker = worker_name()
+        teacher = User.objects.create_user(
+            user_code='teacher_001',
+            email='teacher@example.com',
+            password='teacherpass123',
+            role=User.Role.TEACHER
+        )
+        activity = Activity.objects.create(
+            code='ACT001',
+            title='Test Activity',
+            description='<p>Description</p>',
+            created_by=teacher
+        )
+        self.event = Event.objects.create(
+            activity=activity,
+            start_datetime=django_timezone.now() + timedelta(minutes=5),
+            end_datetime=django_timezone.now() + timedelta(hours=1),
+            status=Event.Status.IN_WAITING
+        )
+        self.student = User.objects.create_user(
+            user_code='student_001',
+            email='student@example.com',
+            password='studentpass123'
+        )
+        Enrollment.objects.create(user=self.student, event=self.event)
+
+    def run_session(self, messages=(), check_open=None):
+        """Connect, send `messages`, run `check_open` while connected, disconnect."""
+        scope = {
+            'type': 'websocket',
+            'path': f'/ws/waiting-room/{self.event.id}/',
+            'headers': [],
+            'subprotocols': [],
+            'user': self.student,
+            'url_route': {'kwargs': {'event_id': str(self.event.id)}},
+        }
+
+        async def session():
+            communicator = ApplicationCommunicator(WaitingRoomConsumer.as_asgi(), scope)
+            await communicator.send_input({'type': 'websocket.connect'})
+            self.assertEqual((await communicator.receive_output(1))['type'], 'websocket.accept')
+            await communicator.receive_output(1)  # participant list
+            for message in messages:
+                await communicator.send_input({'type': 'websocket.receive', 'text': json.dumps(message)})
+                await communicator.receive_output(1)
+            if check_open:
+                check_open()
+            await communicator.send_input({'type': 'websocket.disconnect', 'code': 1000})
+            await communicator.wait(1)
+
+        async_to_sync(session)()
+
+    def test_connection_gauges(self):
+        """Test that open sockets are counted per worker and per event."""
+        event_id = str(self.event.id)
+
+        def check_open():
+            self.assertEqual(socket_metrics.EVENT_CONNECTIONS.get(worker=self.worker, event=event_id), 1)
+
+        connections = socket_metrics.CONNECTIONS.get(worker=self.worker)
+        self.run_session(check_open=check_open)
+
+        self.assertEqual(socket_metrics.CONNECTIONS.get(worker=self.worker), connections)
+        self.assertNotIn((self.worker, event_id), socket_metrics.EVENT_CONNECTIONS.snapshot())
+
+    def test_messages_and_broadcasts(self):
+        """Test that messages, database calls and broadcasts are recorded."""
+        def count(direction, message_type):
+            return socket_metrics.MESSAGES.get(worker=self.worker, direction=direction, type=message_type)
+
+        pings = count('received', 'ping')
+        readies = count('received', 'ready')
+        pongs = count('sent', 'pong')
+        broadcasts = count('broadcast', 'participant_list')
+        db_calls = socket_metrics.DB_TIME.get(worker=self.worker, call='mark_ready')[0]
+        delivered = socket_metrics.DELIVERY_DELAY.get(worker=self.worker, type='participant_list')[0]
+
+        self.run_session(messages=[{'type': 'ping'}, {'type': 'ready'}])
+
+        self.assertEqual(count('received', 'ping'), pings + 1)
+        self.assertEqual(count('received', 'ready'), readies + 1)
+        self.assertEqual(count('sent', 'pong'), pongs + 1)
+        # On connect, on ready and on disconnect
+        self.assertEqual(count('broadcast', 'participant_list'), broadcasts + 3)
+        self.assertEqual(socket_metrics.DB_TIME.get(worker=self.worker, call='mark_ready')[0], db_calls + 1)
+        self.assertEqual(
+            socket_metrics.DELIVERY_DELAY.get(worker=self.worker, type='participant_list')[0], delivered + 2
+        )
+        self.assertGreater(socket_metrics.PAYLOAD_SIZE.get(worker=self.worker, type='pong')[1], 0)
+
+    def test_summary_command(self):
+        """Test that the command summarizes the published metrics."""
+        self.run_session(messages=[{'type': 'ping'}])
+
+        out = StringIO()
+        call_command('waiting_room_metrics', stdout=out)
+
+        output = out.getvalue()
+        self.assertIn('0 open sockets on 1 workers', output)
+        self.assertIn('received ping:', output)
+        self.assertIn('participant_list:', output)
+
+    def test_summary_command_without_metrics(self):
+        """Test that the command says when nothing was published."""
+        out = StringIO()
+        call_command('waiting_room_metrics', stdout=out)
+
+        self.assertIn('No worker has published', out.getvalue())
+
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class EventQueryCountTests(QueryCountTestMixin, APITestCase):
+    """Query budgets of the event endpoints, independent of the page size."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.teacher = User.objects.create_user(
+            user_code='teacher_001',
+            email='teacher@example.com',
+            password='teacherpass123',
+            role=User.Role.TEACHER
+        )
+        self.student = User.objects.create_user(
+            user_code='student_001',
+            email='student@example.com',
+            password='studentpass123'
+        )
+        self.activity = Activity.objects.create(
+            code='ACT001',
+            title='Test Activity',
+            description='<p>Description</p>',
+            created_by=self.teacher
+        )
+        self.event = self.create_event()
+        self.events = [self.event]
+        self.users = 0
+
+    def create_event(self, **kwargs):
+        start = django_timezone.now() + timedelta(days=1 + Event.objects.count())
+        return Event.objects.create(
+            activity=self.activity, start_datetime=start, end_datetime=start + timedelta(hours=1), **kwargs
+        )
+
+    def create_users(self, count):
+        users = User.objects.bulk_create([
+            User(user_code=f'student_{self.users + index:04d}', email=f'student{self.users + index}@example.com')
+            for index in range(count)
+        ])
+        self.users += count
+        return users
+
+    def enrollment(self, event, user):
+        # bulk_create skips save(), which generates the token
+        return Enrollment(event=event, user=user, unsubscribe_token=secrets.token_urlsafe(32))
+
+    def seed_events(self, count):
+        """Events with an enrollment of the student and of other users."""
+        events = [self.create_event() for _ in range(count)]
+        self.events += events
+        others = self.create_users(2)
+        Enrollment.objects.bulk_create(
+            [self.enrollment(event, self.student) for event in events]
+            + [self.enrollment(event, user) for event in events for user in others]
+        )
+
+    def seed_enrollments(self, count):
+        """Enrollments of new users in `self.event`, with waiting room and meeting rows."""
+        from apps.meetings.models import Meeting, MeetingParticipant
+
+        users = self.create_users(count)
+        Enrollment.objects.bulk_create([self.enrollment(self.event, user) for user in users])
+        WaitingRoomParticipant.objects.bulk_create([
+            WaitingRoomParticipant(event=self.event, user=user) for user in users
+        ])
+        meeting = Meeting.objects.create(
+            event=self.event,
+            meeting_url='https://meet.jit.si/test',
+            meeting_id=f'{self.event.id}-group-{Meeting.objects.count() + 1}',
+            start_time=django_timezone.now()
+        )
+        MeetingParticipant.objects.bulk_create([MeetingParticipant(meeting=meeting, user=user) for user in users])
+
+    def get(self, name, user=None, data=None, **kwargs):
+        self.client.force_authenticate(user=user or self.teacher)
+        return lambda: self.client.get(reverse(f'events:{name}', kwargs=kwargs or None), data)
+
+    def test_event_list(self):
+        self.assertQueriesDoNotGrow(self.get('event_list_create'), self.seed_events, max_queries=2)
+
+    def test_event_list_as_student(self):
+        self.assertQueriesDoNotGrow(
+            self.get('event_list_create', user=self.student), self.seed_events, max_queries=2
+        )
+
+    def test_event_detail(self):
+        self.assertQueriesDoNotGrow(
+            self.get('event_detail', pk=self.event.pk), self.seed_enrollments, max_queries=1
+        )
+
+    def test_my_enrollments(self):
+        self.assertQueriesDoNotGrow(
+            self.get('my_enrollments', user=self.student), self.seed_events, max_queries=2
+        )
+
+    def test_event_enrollments(self):
+        self.assertQueriesDoNotGrow(
+            self.get('event_enrollments', pk=self.event.pk), self.seed_enrollments, max_queries=2
+        )
+
+    def test_event_enrollments_export(self):
+        self.assertQueriesDoNotGrow(
+            self.get('event_enrollments_export', pk=self.event.pk, file_format='csv'),
+            self.seed_enrollments,
+            max_queries=2
+        )
+
+    def test_calendar_feeds(self):
+        from .calendar import make_feed_token
+
+        token = make_feed_token(self.student)
+        self.assertQueriesDoNotGrow(
+            self.get('my_events_calendar', token=token), self.seed_events, max_queries=3
+        )
+        self.assertQueriesDoNotGrow(
+            self.get('activity_calendar', token=token, code=self.activity.code), self.seed_events, max_queries=5
+        )
+
+    def test_schedule_list(self):
+        def seed(count):
+            EventSchedule.objects.bulk_create([
+                EventSchedule(
+                    activity=self.activity,
+                    rrule='FREQ=WEEKLY',
+                    dtstart=django_timezone.now(),
+                    created_by=self.teacher
+                )
+                for _ in range(count)
+            ])
+
+        self.assertQueriesDoNotGrow(self.get('schedule_list_create'), seed, max_queries=2)
+
+    def test_event_statistics(self):
+        self.assertQueriesDoNotGrow(
+            self.get('event_statistics', pk=self.event.pk), self.seed_enrollments, max_queries=1
+        )
+
+    def test_events_statistics(self):
+        def request():
+            ids = ','.join(str(event.pk) for event in self.events)
+            return self.get('events_statistics', data={'ids': ids})()
+
+        self.assertQueriesDoNotGrow(request, self.seed_events, max_queries=1)
+
+    def test_enroll(self):
+        def seed(count):
+            self.seed_events(count)
+            self.event = self.create_event()
+
+        def request():
+            self.client.force_authenticate(user=self.student)
+            return self.client.post(reverse('events:enroll_event'), {'event_id': str(self.event.pk)}, format='json')
+
+        self.assertQueriesDoNotGrow(request, seed, max_queries=7)
+
+    def test_admin_changelist_and_change_page(self):
+        """EventAdmin counts enrollments in the list query, not once per row."""
+        admin = User.objects.create_superuser(
+            user_code='admin_001', email='admin@example.com', password='adminpass123'
+        )
+        self.client.force_login(admin)
+
+        self.assertQueriesDoNotGrow(
+            lambda: self.client.get(reverse('admin:events_event_changelist')), self.seed_events, max_queries=6
+        )
+        response = self.assertQueriesDoNotGrow(
+            lambda: self.client.get(reverse('admin:events_event_change', args=[self.event.pk])),
+            self.seed_enrollments,
+            max_queries=8
+        )
+
+        # The inline stays editable: users are raw ids labelled without a query, rows can be added
+        content = response.content.decode()
+        enrollment = self.event.enrollments.select_related('user').first()
+        self.assertIn(f'name="enrollments-0-user" value="{enrollment.user_id}"', content)
+        self.assertIn(f'<strong><a href="/admin/users/user/{enrollment.user_id}/change/">', content)
+        self.assertIn('id="enrollments-empty"', content)
+
+    def test_consumer_handlers(self):
+        """Connecting, pinging and getting ready cost the same in a crowded waiting room."""
+        self.event.status = Event.Status.IN_WAITING
+        self.event.save()
+        Enrollment.objects.create(user=self.student, event=self.event)
+        scope = {
+            'type': 'websocket',
+            'path': f'/ws/waiting-room/{self.event.id}/',
+            'headers': [],
+            'subprotocols': [],
+            'user': self.student,
+            'url_route': {'kwargs': {'event_id': str(self.event.id)}},
+        }
+
+        async def session():
+            communicator = ApplicationCommunicator(WaitingRoomConsumer.as_asgi(), scope)
+            await communicator.send_input({'type': 'websocket.connect'})
+            await communicator.receive_output(1)  # accept
+            await communicator.receive_output(1)  # participant list
+            for message_type in ('ping', 'ready'):
+                await communicator.send_input({'type': 'websocket.receive', 'text': json.dumps({'type': message_type})})
+                await communicator.receive_output(1)
+            await communicator.send_input({'type': 'websocket.disconnect', 'code': 1000})
+            await communicator.wait(1)
+
+        self.assertQueriesDoNotGrow(async_to_sync(session), self.seed_enrollments, max_queries=17)
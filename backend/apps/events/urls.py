@@ -5,12 +5,21 @@ from .views import (
     EventDetailView,
     EventUpdateView,
     EventDeleteView,
+    EventScheduleListView,
+    EventScheduleDetailView,
+    schedule_occurrences,
     enroll_event,
     unenroll_event,
     MyEnrollmentsView,
     EventEnrollmentsView,
+    export_event_enrollments,
+    calendar_subscription,
+    my_events_calendar,
+    activity_calendar,
     convert_timezone,
+    convert_timezone_batch,
     event_statistics,
+    events_statistics,
 )
 from apps.meetings.views import MyMeetingRetrieveView
 
@@ -24,16 +33,29 @@ urlpatterns = [
     path('<uuid:pk>/update/', EventUpdateView.as_view(), name='event_update'),
     path('<uuid:pk>/delete/', EventDeleteView.as_view(), name='event_delete'),
 
+    # Recurring schedules
+    path('schedules/', EventScheduleListView.as_view(), name='schedule_list_create'),
+    path('schedules/<uuid:pk>/', EventScheduleDetailView.as_view(), name='schedule_detail'),
+    path('schedules/<uuid:pk>/occurrences/', schedule_occurrences, name='schedule_occurrences'),
+
     # Enrollments
     path('enroll/', enroll_event, name='enroll_event'),
     path('<uuid:event_id>/unenroll/', unenroll_event, name='unenroll_event'),
     path('my-enrollments/', MyEnrollmentsView.as_view(), name='my_enrollments'),
     path('<uuid:pk>/enrollments/', EventEnrollmentsView.as_view(), name='event_enrollments'),
+    path('<uuid:pk>/enrollments/export.<str:file_format>', export_event_enrollments, name='event_enrollments_export'),
+
+    # Calendar feeds
+    path('calendar/', calendar_subscription, name='calendar_subscription'),
+    path('calendar/<str:token>/my-events.ics', my_events_calendar, name='my_events_calendar'),
+    path('calendar/<str:token>/activities/<str:code>.ics', activity_calendar, name='activity_calendar'),
 
     # Meetings
     path('<uuid:event_id>/my-meeting/', MyMeetingRetrieveView.as_view(), name='my_meeting'),
 
     # Utilities
     path('convert-timezone/', convert_timezone, name='convert_timezone'),
+    path('convert-timezone/batch/', convert_timezone_batch, name='convert_timezone_batch'),
     path('<uuid:pk>/statistics/', event_statistics, name='event_statistics'),
+    path('statistics/', events_statistics, name='events_statistics'),
 ]
@@ -4,36 +4,105 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.exceptions import ValidationError
 from django.shortcuts import get_object_or_404
+from django.http import Http404
+from django.urls import reverse
+from django.views.decorators.http import require_GET
 from django.db.models import Q, Count
 from django.utils import timezone as django_timezone
 from django_filters.rest_framework import DjangoFilterBackend
-from datetime import datetime, timedelta
-import pytz
-
-from .models import Event, Enrollment
+from datetime import datetime, timedelta, timezone as dt_timezone
+from uuid import UUID
+
+from .models import Event, EventSchedule, Enrollment
+from .exports import EXPORT_FORMATS, enrollment_export_response
+from .statistics import MAX_STATISTICS_EVENTS, get_events_statistics
+from .scheduling import generate_slots, schedule_events, materialize_schedule, virtual_occurrences
+from .calendar import (
+    make_feed_token,
+    read_feed_token,
+    user_feed_events,
+    activity_feed_events,
+    activity_feed_occurrences,
+    calendar_response,
+)
 from .serializers import (
     EventSerializer,
     EventCreateSerializer,
     EventBulkCreateSerializer,
     EventUpdateSerializer,
+    EventScheduleSerializer,
     EnrollmentSerializer,
     EnrollmentCreateSerializer,
-    TimezoneConversionSerializer
+    TimezoneConversionSerializer,
+    TimezoneBatchConversionSerializer
 )
+from apps.users.models import User
 from apps.users.permissions import IsTeacherOrAdmin
 from apps.activities.models import Activity
+from apps.activities.search import RankedSearchFilter
+from apps.activities.views import visible_activities
+from apps.core.fieldsets import SparseFieldsetViewMixin
+
+
+def get_event_queryset(fields=None):
+    """
+    Events with the join and annotations used by EventSerializer.
+
+    When `fields` (the requested output fields) is given, only the
+    join and annotations those fields need are added.
+    """
+    queryset = Event.objects.all()
+
+    if fields is None or not fields.isdisjoint({'activity_code', 'activity_title'}):
+        queryset = queryset.select_related('activity')
+
+    annotations = {}
+    if fields is None or 'enrolled_count' in fields:
+        annotations['enrolled_count'] = Count('enrollments', filter=Q(enrollments__status='enrolled'))
+    if fields is None or 'attended_count' in fields:
+        annotations['attended_count'] = Count('enrollments', filter=Q(enrollments__status='attended'))
+
+    return queryset.annotate(**annotations)
+
+
+def get_enrollment_queryset(view):
+    """Enrollments with only the joins needed by the requested EnrollmentSerializer fields."""
+    related = []
+    if view.wants('activity_code', 'activity_title'):
+        related.append('event__activity')
+    elif view.wants('event_start', 'event_end'):
+        related.append('event')
+    if view.wants('user_code'):
+        related.append('user')
+
+    queryset = Enrollment.objects.all()
+    if related:
+        # select_related() without arguments would follow every foreign key
+        queryset = queryset.select_related(*related)
+    return queryset
+
+
+def parse_query_datetime(value):
+    """Parse an ISO date/datetime query parameter as UTC when naive; None if empty."""
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    if django_timezone.is_naive(parsed):
+        parsed = django_timezone.make_aware(parsed, dt_timezone.utc)
+    return parsed
 
 
-class EventListView(generics.ListCreateAPIView):
+class EventListView(SparseFieldsetViewMixin, generics.ListCreateAPIView):
     """
     List all events (GET) or create a single event (POST).
     - GET: Available to all authenticated users.
     - POST: Only teachers and admins can create events.
     """
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, RankedSearchFilter]
     filterset_fields = ['status', 'activity']
     search_fields = ['activity__code', 'activity__title']
+    search_activity_field = 'activity'
     ordering_fields = ['start_datetime', 'created_at']
     ordering = ['start_datetime']
 
@@ -50,11 +119,8 @@ class EventListView(generics.ListCreateAPIView):
         return [IsAuthenticated()]
 
     def get_queryset(self):
-        """Get events with enrollment counts."""
-        queryset = Event.objects.select_related('activity').annotate(
-            enrolled_count=Count('enrollments', filter=Q(enrollments__status='enrolled')),
-            attended_count=Count('enrollments', filter=Q(enrollments__status='attended'))
-        )
+        """Get events with enrollment counts (only those requested via ?fields=/?omit=)."""
+        queryset = get_event_queryset(self.get_requested_fields())
 
         # Filter by activity code if provided
         activity_code = self.request.query_params.get('activity_code')
@@ -99,70 +165,53 @@ def bulk_create_events(request):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     data = serializer.validated_data
-    activity = data['activity_code']
-    start_date = data['start_date']
-    end_date = data['end_date']
-    hours_utc = data['hours_utc']
-    duration_minutes = data['duration_minutes']
-    waiting_time_minutes = data['waiting_time_minutes']
-    first_reminder_minutes = data.get('first_reminder_minutes')
-    second_reminder_minutes = data.get('second_reminder_minutes')
-
-    # Generate event payloads and persist in bulk to keep DB writes consistent
-    events_to_create = []
-    current_date = start_date
-
-    while current_date <= end_date:
-        for hour_str in hours_utc:
-            hour_time = datetime.strptime(hour_str, '%H:%M').time()
-
-            start_datetime = datetime.combine(current_date, hour_time)
-            start_datetime = pytz.UTC.localize(start_datetime)
-            end_datetime = start_datetime + timedelta(minutes=duration_minutes)
-
-            # Skip if in the past
-            if start_datetime <= django_timezone.now():
-                continue
-
-            events_to_create.append(Event(
-                activity=activity,
-                start_datetime=start_datetime,
-                end_datetime=end_datetime,
-                waiting_time_minutes=waiting_time_minutes,
-                first_reminder_minutes=first_reminder_minutes,
-                second_reminder_minutes=second_reminder_minutes
-            ))
-
-        current_date += timedelta(days=1)
-
-    created_events = Event.objects.bulk_create(events_to_create)
-
-    # Re-fetch events with annotations for proper serialization
-    event_ids = [event.id for event in created_events]
-    events_with_annotations = Event.objects.filter(id__in=event_ids).select_related('activity').annotate(
-        enrolled_count=Count('enrollments', filter=Q(enrollments__status='enrolled')),
-        attended_count=Count('enrollments', filter=Q(enrollments__status='attended'))
-    ).order_by('start_datetime')
-
-    serializer = EventSerializer(events_with_annotations, many=True)
+    slots, skipped_past, skipped_duplicates = generate_slots(
+        data['start_date'],
+        data['end_date'],
+        data['times'],
+        timedelta(minutes=data['duration_minutes'])
+    )
 
-    return Response({
-        'message': f'Successfully created {len(created_events)} events',
-        'events': serializer.data
-    }, status=status.HTTP_201_CREATED)
+    result = schedule_events(
+        data['activity_code'],
+        slots,
+        on_conflict=data['on_conflict'],
+        waiting_time_minutes=data['waiting_time_minutes'],
+        first_reminder_minutes=data.get('first_reminder_minutes'),
+        second_reminder_minutes=data.get('second_reminder_minutes')
+    )
+    result.skipped_past = skipped_past
+    result.skipped_duplicates = skipped_duplicates
+
+    if result.conflicts and data['on_conflict'] == 'error':
+        return Response({
+            'error': f'{len(result.conflicts)} slots overlap existing events. No events were created.',
+            **result.summary()
+        }, status=status.HTTP_409_CONFLICT)
+
+    response_data = {
+        'message': f'Successfully created {len(result.created)} events',
+        **result.summary()
+    }
+    if data['return_events']:
+        response_data['events'] = [
+            {'id': event.id, 'start_datetime': event.start_datetime, 'end_datetime': event.end_datetime}
+            for event in result.created
+        ]
+
+    return Response(response_data, status=status.HTTP_201_CREATED)
 
 
-class EventDetailView(generics.RetrieveAPIView):
+class EventDetailView(SparseFieldsetViewMixin, generics.RetrieveAPIView):
     """
     Get details of a specific event.
     Available to all authenticated users.
     """
     serializer_class = EventSerializer
     permission_classes = [IsAuthenticated]
-    queryset = Event.objects.select_related('activity').annotate(
-        enrolled_count=Count('enrollments', filter=Q(enrollments__status='enrolled')),
-        attended_count=Count('enrollments', filter=Q(enrollments__status='attended'))
-    )
+
+    def get_queryset(self):
+        return get_event_queryset(self.get_requested_fields())
 
 
 class EventUpdateView(generics.UpdateAPIView):
@@ -200,6 +249,105 @@ class EventDeleteView(generics.DestroyAPIView):
         }, status=status.HTTP_204_NO_CONTENT)
 
 
+class EventScheduleListView(generics.ListCreateAPIView):
+    """
+    List recurring schedules (GET) or create one (POST).
+    Only teachers and admins can manage schedules.
+    Creating a schedule materializes its events up to the scheduling horizon.
+    """
+    serializer_class = EventScheduleSerializer
+    permission_classes = [IsAuthenticated, IsTeacherOrAdmin]
+
+    def get_queryset(self):
+        queryset = EventSchedule.objects.select_related('activity')
+
+        activity_code = self.request.query_params.get('activity_code')
+        if activity_code:
+            queryset = queryset.filter(activity__code=activity_code)
+
+        return queryset
+
+    def perform_create(self, serializer):
+        schedule = serializer.save(created_by=self.request.user)
+        materialize_schedule(schedule)
+
+
+class EventScheduleDetailView(generics.RetrieveDestroyAPIView):
+    """
+    Get or delete a recurring schedule.
+    Deleting a schedule also deletes its future events without enrollments;
+    past events and events with enrollments are kept.
+    """
+    serializer_class = EventScheduleSerializer
+    permission_classes = [IsAuthenticated, IsTeacherOrAdmin]
+    queryset = EventSchedule.objects.select_related('activity')
+
+    def perform_destroy(self, instance):
+        instance.events.filter(
+            start_datetime__gt=django_timezone.now(),
+            enrollments__isnull=True
+        ).delete()
+        instance.delete()
+
+
+# Largest window the occurrences endpoint expands at once
+MAX_OCCURRENCE_WINDOW_DAYS = 366
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def schedule_occurrences(request, pk):
+    """
+    List the occurrences of a schedule between `start` and `end`
+    (ISO datetimes; default the next 30 days).
+    Materialized occurrences include their event id and status; later ones
+    are expanded on the fly from the rule. Inactive schedules, and schedules
+    of activities the user cannot see, are not found.
+    """
+    schedules = EventSchedule.objects.select_related('activity').filter(
+        is_active=True,
+        activity__in=visible_activities(Activity.objects.all(), request.user)
+    )
+    schedule = get_object_or_404(schedules, pk=pk)
+
+    try:
+        start = parse_query_datetime(request.query_params.get('start')) or django_timezone.now()
+        end = parse_query_datetime(request.query_params.get('end')) or start + timedelta(days=30)
+    except ValueError:
+        return Response({
+            'error': 'Invalid date format. Use ISO format (YYYY-MM-DD or YYYY-MM-DDTHH:MM:SSZ).'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    if end <= start or end - start > timedelta(days=MAX_OCCURRENCE_WINDOW_DAYS):
+        return Response({
+            'error': f'end must be after start and at most {MAX_OCCURRENCE_WINDOW_DAYS} days later.'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    materialized = list(
+        schedule.events
+        .filter(start_datetime__gte=start, start_datetime__lt=end)
+        .order_by('start_datetime')
+        .values('id', 'start_datetime', 'end_datetime', 'status')
+    )
+    occurrences = [
+        {'event_id': event['id'], 'start_datetime': event['start_datetime'],
+         'end_datetime': event['end_datetime'], 'status': event['status'], 'materialized': True}
+        for event in materialized
+    ]
+    occurrences += [
+        {'event_id': None, 'start_datetime': occurrence['start_datetime'],
+         'end_datetime': occurrence['end_datetime'], 'status': occurrence['status'], 'materialized': False}
+        for occurrence in virtual_occurrences(schedule, start, end)
+    ]
+    occurrences.sort(key=lambda occurrence: occurrence['start_datetime'])
+
+    return Response({
+        'schedule_id': str(schedule.id),
+        'activity_code': schedule.activity.code,
+        'occurrences': occurrences
+    }, status=status.HTTP_200_OK)
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def enroll_event(request):
@@ -249,7 +397,7 @@ def unenroll_event(request, event_id):
     }, status=status.HTTP_200_OK)
 
 
-class MyEnrollmentsView(generics.ListAPIView):
+class MyEnrollmentsView(SparseFieldsetViewMixin, generics.ListAPIView):
     """
     List current user's enrollments.
     """
@@ -258,12 +406,12 @@ class MyEnrollmentsView(generics.ListAPIView):
 
     def get_queryset(self):
         """Get enrollments for current user."""
-        return Enrollment.objects.filter(
+        return get_enrollment_queryset(self).filter(
             user=self.request.user
-        ).select_related('event', 'event__activity', 'user').order_by('-enrolled_at')
+        ).order_by('-enrolled_at')
 
 
-class EventEnrollmentsView(generics.ListAPIView):
+class EventEnrollmentsView(SparseFieldsetViewMixin, generics.ListAPIView):
     """
     List enrollments for a specific event.
     Only teachers and admins can view enrollments.
@@ -274,9 +422,106 @@ class EventEnrollmentsView(generics.ListAPIView):
     def get_queryset(self):
         """Get enrollments for specific event."""
         event_id = self.kwargs['pk']
-        return Enrollment.objects.filter(
+        return get_enrollment_queryset(self).filter(
             event_id=event_id
-        ).select_related('event', 'event__activity', 'user').order_by('-enrolled_at')
+        ).order_by('-enrolled_at')
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsTeacherOrAdmin])
+def export_event_enrollments(request, pk, file_format):
+    """
+    Stream all enrollments of an event as CSV or NDJSON.
+    Only teachers and admins can export enrollments.
+    """
+    if file_format not in EXPORT_FORMATS:
+        return Response({
+            'error': f'Unsupported export format: {file_format}. Use one of: {", ".join(EXPORT_FORMATS)}.'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    event = get_object_or_404(Event, pk=pk)
+
+    return enrollment_export_response(
+        Enrollment.objects.filter(event=event),
+        file_format,
+        filename=f'enrollments-{event.id}'
+    )
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def calendar_subscription(request):
+    """
+    Return the iCalendar feed URLs for the current user.
+
+    Pass `?activity=<code>` to also get the feed of that activity.
+    """
+    token = make_feed_token(request.user)
+    data = {
+        'my_events_url': request.build_absolute_uri(
+            reverse('events:my_events_calendar', args=[token])
+        ),
+    }
+
+    activity_code = request.query_params.get('activity')
+    if activity_code:
+        activity = get_object_or_404(Activity, code=activity_code)
+        data['activity_url'] = request.build_absolute_uri(
+            reverse('events:activity_calendar', args=[token, activity.code])
+        )
+
+    return Response(data, status=status.HTTP_200_OK)
+
+
+def get_feed_user_role(token):
+    """Return the role of the active user a feed token belongs to, or raise 404."""
+    user_id = read_feed_token(token)
+    role = None
+    if user_id is not None:
+        role = User.objects.filter(pk=user_id, is_active=True).values_list('role', flat=True).first()
+    if role is None:
+        raise Http404('Invalid calendar token.')
+    return user_id, role
+
+
+@require_GET
+def my_events_calendar(request, token):
+    """iCalendar feed of the events the token's user is enrolled in."""
+    user_id, _ = get_feed_user_role(token)
+
+    return calendar_response(
+        request,
+        user_feed_events(user_id),
+        cache_prefix=f'calendar:user:{user_id}',
+        name='Talkabout - My events',
+        filename='my-events',
+        track_enrollments=True
+    )
+
+
+@require_GET
+def activity_calendar(request, token, code):
+    """
+    iCalendar feed of the recent and upcoming events of an activity.
+    Inactive activities are only available to teachers and admins.
+    """
+    _, role = get_feed_user_role(token)
+
+    activity = get_object_or_404(Activity, code=code)
+    if not activity.is_active and role not in (User.Role.TEACHER, User.Role.ADMIN):
+        raise Http404('Activity not found.')
+
+    occurrences, schedules_state = activity_feed_occurrences(activity)
+
+    return calendar_response(
+        request,
+        activity_feed_events(activity),
+        cache_prefix=f'calendar:activity:{activity.id}',
+        name=f'Talkabout - {activity.code}: {activity.title}',
+        filename=f'activity-{activity.code}',
+        extra=occurrences,
+        extra_state=schedules_state
+    )
 
 
 @api_view(['POST'])
@@ -295,31 +540,57 @@ def convert_timezone(request):
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def convert_timezone_batch(request):
+    """
+    Convert many UTC datetimes in one request.
+    Lets clients localize a whole page of events with a single round trip.
+    """
+    serializer = TimezoneBatchConversionSerializer(data=request.data)
+
+    if serializer.is_valid():
+        result = serializer.to_representation(serializer.validated_data)
+        return Response(result, status=status.HTTP_200_OK)
+
+    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def event_statistics(request, pk):
     """
     Get statistics for a specific event.
     """
-    event = get_object_or_404(Event, pk=pk)
+    statistics = get_events_statistics([pk]).get(pk)
+    if statistics is None:
+        raise Http404('Event not found.')
+
+    return Response(statistics, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def events_statistics(request):
+    """
+    Get statistics for several events in one request.
+    Pass the event ids as `?ids=<uuid>,<uuid>,...`; unknown ids are omitted.
+    """
+    raw_ids = [value.strip() for value in request.query_params.get('ids', '').split(',') if value.strip()]
+    if not raw_ids:
+        return Response({'error': 'ids is required.'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(raw_ids) > MAX_STATISTICS_EVENTS:
+        return Response({
+            'error': f'At most {MAX_STATISTICS_EVENTS} events per request.'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        event_ids = list(dict.fromkeys(UUID(value) for value in raw_ids))
+    except ValueError:
+        return Response({'error': 'ids must be a comma-separated list of UUIDs.'}, status=status.HTTP_400_BAD_REQUEST)
 
-    enrollments = event.enrollments.all()
-    total_enrolled = enrollments.filter(status=Enrollment.Status.ENROLLED).count()
-    total_cancelled = enrollments.filter(status=Enrollment.Status.CANCELLED).count()
-    total_attended = enrollments.filter(status=Enrollment.Status.ATTENDED).count()
-    total_no_show = enrollments.filter(status=Enrollment.Status.NO_SHOW).count()
+    statistics = get_events_statistics(event_ids)
 
     return Response({
-        'event_id': str(event.id),
-        'activity_code': event.activity.code,
-        'activity_title': event.activity.title,
-        'start_datetime': event.start_datetime,
-        'end_datetime': event.end_datetime,
-        'status': event.status,
-        'total_enrolled': total_enrolled,
-        'total_cancelled': total_cancelled,
-        'total_attended': total_attended,
-        'total_no_show': total_no_show,
-        'max_participants_per_meeting': event.activity.max_participants_per_meeting,
-        'meetings_count': event.meetings.count()
+        'results': [statistics[event_id] for event_id in event_ids if event_id in statistics]
     }, status=status.HTTP_200_OK)
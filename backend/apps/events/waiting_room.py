@@ -0,0 +1,126 @@
+"""
+Waiting room maintenance.
+
+`WaitingRoomParticipant` rows are only needed while an event is live.
+Once it has finished, `compact_waiting_rooms` folds them into the
+attendance of each enrollment (ATTENDED if the user showed up in the
+waiting room or a meeting, NO_SHOW otherwise) and deletes them in chunks,
+so the `(event, status)` index only covers live events.
+
+Clients ping the waiting room consumer to refresh `last_seen`. A client
+that vanishes without a close frame (network drop, crashed worker) never
+runs `disconnect`, so `sweep_stale_participants` marks participants not
+seen for WAITING_ROOM_STALE_SECONDS as disconnected; it runs right before
+participants are grouped into meetings and periodically.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from apps.meetings.models import MeetingParticipant
+
+from .models import Event, Enrollment, WaitingRoomParticipant
+
+logger = logging.getLogger(__name__)
+
+# Finished events processed per transaction
+COMPACTION_BATCH_SIZE = 200
+# Waiting room rows deleted per statement
+PURGE_CHUNK_SIZE = 5000
+FINISHED_STATUSES = (Event.Status.COMPLETED, Event.Status.CANCELLED)
+ACTIVE_STATUSES = (WaitingRoomParticipant.Status.WAITING, WaitingRoomParticipant.Status.READY)
+# Participants not seen for this long are considered gone
+STALE_AFTER = timedelta(seconds=getattr(settings, 'WAITING_ROOM_STALE_SECONDS', 60))
+
+
+def sweep_stale_participants(event_id=None, now=None):
+    """
+    Mark waiting/ready participants whose `last_seen` is older than
+    STALE_AFTER as disconnected, in a single UPDATE.
+
+    Limited to one event when `event_id` is given. Returns the number of
+    participants marked.
+    """
+    now = now or timezone.now()
+    participants = WaitingRoomParticipant.objects.filter(
+        status__in=ACTIVE_STATUSES,
+        last_seen__lt=now - STALE_AFTER
+    )
+    if event_id is not None:
+        participants = participants.filter(event_id=event_id)
+    return participants.update(status=WaitingRoomParticipant.Status.DISCONNECTED)
+
+
+def events_to_compact(now=None):
+    """
+    Finished events with waiting room rows left, or completed events with
+    enrollments whose attendance has not been recorded yet.
+    """
+    now = now or timezone.now()
+    has_participants = Exists(WaitingRoomParticipant.objects.filter(event=OuterRef('pk')))
+    has_pending = Exists(Enrollment.objects.filter(event=OuterRef('pk'), status=Enrollment.Status.ENROLLED))
+    return Event.objects.filter(
+        Q(has_participants) | (Q(status=Event.Status.COMPLETED) & Q(has_pending)),
+        status__in=FINISHED_STATUSES,
+        end_datetime__lt=now,
+    ).order_by('end_datetime')
+
+
+def record_attendance(event_ids, now=None):
+    """
+    Resolve the pending enrollments of the completed events among `event_ids`.
+
+    Runs two UPDATE statements; returns (attended, no_show).
+    """
+    now = now or timezone.now()
+    pending = Enrollment.objects.filter(
+        event_id__in=event_ids,
+        event__status=Event.Status.COMPLETED,
+        status=Enrollment.Status.ENROLLED,
+    )
+    showed_up = Exists(WaitingRoomParticipant.objects.filter(
+        event_id=OuterRef('event_id'), user_id=OuterRef('user_id')
+    )) | Exists(MeetingParticipant.objects.filter(
+        meeting__event_id=OuterRef('event_id'), user_id=OuterRef('user_id')
+    ))
+
+    # update() bypasses auto_now; updated_at is set so the rollups pick the change up
+    attended = pending.filter(showed_up).update(status=Enrollment.Status.ATTENDED, updated_at=now)
+    no_show = pending.update(status=Enrollment.Status.NO_SHOW, updated_at=now)
+    return attended, no_show
+
+
+def purge_waiting_room(event_ids, chunk_size=PURGE_CHUNK_SIZE):
+    """Delete the waiting room rows of `event_ids`, `chunk_size` rows per statement."""
+    deleted = 0
+    participants = WaitingRoomParticipant.objects.filter(event_id__in=event_ids)
+    while chunk := list(participants.values_list('pk', flat=True)[:chunk_size]):
+        deleted += WaitingRoomParticipant.objects.filter(pk__in=chunk).delete()[0]
+    return deleted
+
+
+def compact_waiting_rooms(batch_size=COMPACTION_BATCH_SIZE, now=None):
+    """
+    Record attendance and purge the waiting rooms of every finished event.
+
+    Returns a dict with the number of events processed, enrollments marked
+    attended / no-show, and waiting room rows deleted.
+    """
+    now = now or timezone.now()
+    totals = {'events': 0, 'attended': 0, 'no_show': 0, 'deleted': 0}
+
+    while event_ids := list(events_to_compact(now).values_list('pk', flat=True)[:batch_size]):
+        with transaction.atomic():
+            attended, no_show = record_attendance(event_ids, now)
+            deleted = purge_waiting_room(event_ids)
+
+        totals['events'] += len(event_ids)
+        totals['attended'] += attended
+        totals['no_show'] += no_show
+        totals['deleted'] += deleted
+
+    return totals
@@ -1,14 +1,23 @@
 from django.contrib import admin
+from django.db.models import Count, Q
+
 from .models import Meeting, MeetingParticipant
+from apps.core.admin import RawIdTabularInline
 
 
-class MeetingParticipantInline(admin.TabularInline):
+class MeetingParticipantInline(RawIdTabularInline):
     """Inline admin for meeting participants."""
     model = MeetingParticipant
     extra = 0
+    # A select would query and render every user once per row; see RawIdTabularInline
+    raw_id_fields = ('user',)
     readonly_fields = ('joined_at', 'updated_at')
     can_delete = False
 
+    def get_queryset(self, request):
+        # Each row is labelled with str(participant), which reaches the meeting
+        return super().get_queryset(request).select_related('user', 'meeting')
+
 
 @admin.register(Meeting)
 class MeetingAdmin(admin.ModelAdmin):
@@ -48,6 +57,17 @@ class MeetingAdmin(admin.ModelAdmin):
         }),
     )
 
+    def get_queryset(self, request):
+        """Count joined participants in the changelist query instead of once per row."""
+        return super().get_queryset(request).select_related('event__activity').annotate(
+            joined_count=Count('participants', filter=Q(participants__status=MeetingParticipant.Status.JOINED))
+        )
+
+    @admin.display(description='Participant count', ordering='joined_count')
+    def participant_count(self, obj):
+        """Get count of participants who joined."""
+        return obj.joined_count
+
 
 @admin.register(MeetingParticipant)
 class MeetingParticipantAdmin(admin.ModelAdmin):
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meetings', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='meetingparticipant',
+            index=models.Index(fields=['updated_at'], name='meeting_par_updated_8cc3f2_idx'),
+        ),
+    ]
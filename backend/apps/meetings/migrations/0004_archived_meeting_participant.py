@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:14
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('events', '0007_event_archive'),
+        ('meetings', '0003_updated_at_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedMeetingParticipant',
+            fields=[
+                ('id', models.UUIDField(editable=False, primary_key=True, serialize=False)),
+                ('meeting_id', models.CharField(max_length=255)),
+                ('joined_at', models.DateTimeField()),
+                ('status', models.CharField(choices=[('waiting', 'Waiting'), ('joined', 'Joined'), ('left', 'Left')], max_length=20)),
+                ('updated_at', models.DateTimeField()),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='meeting_participants', to='events.archivedevent')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_meeting_participations', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Archived Meeting Participant',
+                'verbose_name_plural': 'Archived Meeting Participants',
+                'db_table': 'archived_meeting_participants',
+                'ordering': ['joined_at'],
+                'indexes': [models.Index(fields=['event', 'meeting_id'], name='archived_me_event_i_ed44b7_idx')],
+            },
+        ),
+    ]
@@ -1,7 +1,7 @@
 import uuid
 from django.db import models
 from django.utils.timezone import now as timezone_now
-from apps.events.models import Event
+from apps.events.models import ArchivedEvent, Event
 from apps.users.models import User
 
 
@@ -89,6 +89,7 @@ class MeetingParticipant(models.Model):
         indexes = [
             models.Index(fields=['meeting', 'status']),
             models.Index(fields=['user', 'status']),
+            models.Index(fields=['updated_at']),  # For incremental statistics rollups
         ]
 
     def __str__(self):
@@ -103,3 +104,40 @@ class MeetingParticipant(models.Model):
         """Mark participant as left."""
         self.status = self.Status.LEFT
         self.save()
+
+
+class ArchivedMeetingParticipant(models.Model):
+    """
+    Meeting participation of an archived event.
+
+    The meeting row is not archived; `meeting_id` (the provider id) groups
+    the participants of each meeting.
+    """
+
+    id = models.UUIDField(primary_key=True, editable=False)
+    event = models.ForeignKey(
+        ArchivedEvent,
+        on_delete=models.CASCADE,
+        related_name='meeting_participants'
+    )
+    meeting_id = models.CharField(max_length=255)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_meeting_participations'
+    )
+    joined_at = models.DateTimeField()
+    status = models.CharField(max_length=20, choices=MeetingParticipant.Status.choices)
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'archived_meeting_participants'
+        verbose_name = 'Archived Meeting Participant'
+        verbose_name_plural = 'Archived Meeting Participants'
+        ordering = ['joined_at']
+        indexes = [
+            models.Index(fields=['event', 'meeting_id']),
+        ]
+
+    def __str__(self):
+        return f"{self.user.user_code} in {self.meeting_id} (archived)"
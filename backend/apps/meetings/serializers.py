@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import Meeting, MeetingParticipant
+from apps.core.fieldsets import SparseFieldsetSerializerMixin
 
 
 class MeetingParticipantSerializer(serializers.ModelSerializer):
@@ -12,12 +13,15 @@ class MeetingParticipantSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'joined_at']
 
 
-class MeetingSerializer(serializers.ModelSerializer):
+class MeetingSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     """Serializer for returning meeting details to the assigned user."""
     participants = MeetingParticipantSerializer(many=True, read_only=True)
     participant_count = serializers.SerializerMethodField()
 
     def get_participant_count(self, obj):
+        # Reuse the prefetched participants instead of issuing a COUNT
+        if 'participants' in getattr(obj, '_prefetched_objects_cache', {}):
+            return len(obj.participants.all())
         return obj.participants.count()
 
     class Meta:
@@ -0,0 +1,181 @@
+from django.urls import reverse
+from django.utils import timezone as django_timezone
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+from datetime import timedelta
+
+from apps.core.testing import QueryCountTestMixin
+from apps.users.models import User
+from apps.activities.models import Activity
+from apps.events.models import Event
+from .models import Meeting, MeetingParticipant
+
+
+class MyMeetingAPITests(APITestCase):
+    """Tests for the my-meeting endpoint."""
+
+    def setUp(self):
+        """Set up an in-progress event with one meeting."""
+        self.client = APIClient()
+
+        self.teacher = User.objects.create_user(
+            user_code='teacher_001',
+            email='teacher@example.com',
+            password='teacherpass123',
+            role=User.Role.TEACHER
+        )
+
+        self.activity = Activity.objects.create(
+            code='ACT001',
+            title='Test Activity',
+            description='<p>Description</p>',
+            created_by=self.teacher
+        )
+
+        now = django_timezone.now()
+        self.event = Event.objects.create(
+            activity=self.activity,
+            start_datetime=now - timedelta(minutes=5),
+            end_datetime=now + timedelta(minutes=55),
+            status=Event.Status.IN_PROGRESS
+        )
+
+        self.meeting = Meeting.objects.create(
+            event=self.event,
+            meeting_url='https://meet.jit.si/talkabout-test',
+            meeting_id=f'{self.event.id}-group-1',
+            start_time=now
+        )
+
+        self.students = []
+        for index in range(4):
+            student = User.objects.create_user(
+                user_code=f'student_{index:03d}',
+                email=f'student{index}@example.com',
+                password='studentpass123'
+            )
+            MeetingParticipant.objects.create(meeting=self.meeting, user=student)
+            self.students.append(student)
+
+        self.url = reverse('events:my_meeting', kwargs={'event_id': self.event.id})
+
+    def test_get_my_meeting(self):
+        """Test that participants are loaded without one query per participant."""
+        self.client.force_authenticate(user=self.students[0])
+
+        # event + meeting + participants (with users)
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['participant_count'], 4)
+        self.assertEqual(len(response.data['participants']), 4)
+
+    def test_get_my_meeting_sparse_fieldset(self):
+        """Test that participants are not loaded when not requested."""
+        self.client.force_authenticate(user=self.students[0])
+
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, {'fields': 'meeting_url,meeting_provider'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data.keys()), {'meeting_url', 'meeting_provider'})
+
+    def test_get_my_meeting_not_assigned(self):
+        """Test that users without a meeting get a 404."""
+        self.client.force_authenticate(user=self.teacher)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class MeetingQueryCountTests(QueryCountTestMixin, APITestCase):
+    """Query budgets of the meeting endpoints, independent of the meeting size."""
+
+    def setUp(self):
+        """Set up an in-progress event with one meeting."""
+        teacher = User.objects.create_user(
+            user_code='teacher_001',
+            email='teacher@example.com',
+            password='teacherpass123',
+            role=User.Role.TEACHER
+        )
+        activity = Activity.objects.create(
+            code='ACT001',
+            title='Test Activity',
+            description='<p>Description</p>',
+            created_by=teacher
+        )
+        now = django_timezone.now()
+        self.event = Event.objects.create(
+            activity=activity,
+            start_datetime=now - timedelta(minutes=5),
+            end_datetime=now + timedelta(minutes=55),
+            status=Event.Status.IN_PROGRESS
+        )
+        self.meeting = Meeting.objects.create(
+            event=self.event,
+            meeting_url='https://meet.jit.si/talkabout-test',
+            meeting_id=f'{self.event.id}-group-1',
+            start_time=now
+        )
+        self.student = User.objects.create_user(
+            user_code='student_000',
+            email='student0@example.com',
+            password='studentpass123'
+        )
+        MeetingParticipant.objects.create(meeting=self.meeting, user=self.student)
+
+    def seed_participants(self, count):
+        offset = User.objects.count()
+        users = User.objects.bulk_create([
+            User(user_code=f'student_{index:03d}', email=f'student{index}@example.com')
+            for index in range(offset, offset + count)
+        ])
+        MeetingParticipant.objects.bulk_create([
+            MeetingParticipant(meeting=self.meeting, user=user, status=MeetingParticipant.Status.JOINED)
+            for user in users
+        ])
+
+    def seed_meetings(self, count):
+        offset = Meeting.objects.count()
+        meetings = Meeting.objects.bulk_create([
+            Meeting(
+                event=self.event,
+                meeting_url=f'https://meet.jit.si/talkabout-{index}',
+                meeting_id=f'{self.event.id}-group-{index + 1}',
+                start_time=django_timezone.now()
+            )
+            for index in range(offset, offset + count)
+        ])
+        MeetingParticipant.objects.bulk_create([
+            MeetingParticipant(meeting=meeting, user=self.student, status=MeetingParticipant.Status.JOINED)
+            for meeting in meetings
+        ])
+
+    def test_my_meeting(self):
+        self.client.force_authenticate(user=self.student)
+        url = reverse('events:my_meeting', kwargs={'event_id': self.event.id})
+
+        response = self.assertQueriesDoNotGrow(lambda: self.client.get(url), self.seed_participants, max_queries=3)
+
+        self.assertEqual(response.data['participant_count'], 1 + 15)
+
+    def test_admin_changelist_and_change_page(self):
+        """MeetingAdmin counts participants in the list query, not once per row."""
+        admin = User.objects.create_superuser(
+            user_code='admin_001', email='admin@example.com', password='adminpass123'
+        )
+        self.client.force_login(admin)
+
+        self.assertQueriesDoNotGrow(
+            lambda: self.client.get(reverse('admin:meetings_meeting_changelist')),
+            self.seed_meetings,
+            max_queries=6
+        )
+        self.assertQueriesDoNotGrow(
+            lambda: self.client.get(reverse('admin:meetings_meeting_change', args=[self.meeting.pk])),
+            self.seed_participants,
+            max_queries=8
+        )
@@ -1,14 +1,16 @@
 from rest_framework import generics, permissions
 from rest_framework.response import Response
 from rest_framework.exceptions import NotFound, PermissionDenied
+from django.db.models import Prefetch
 from django.shortcuts import get_object_or_404
 
 from apps.events.models import Event
+from apps.core.fieldsets import SparseFieldsetViewMixin
 from .models import Meeting, MeetingParticipant
 from .serializers import MeetingSerializer
 
 
-class MyMeetingRetrieveView(generics.RetrieveAPIView):
+class MyMeetingRetrieveView(SparseFieldsetViewMixin, generics.RetrieveAPIView):
     """
     API view to retrieve the specific meeting assigned to the authenticated user for a given event.
     """
@@ -26,12 +28,15 @@ class MyMeetingRetrieveView(generics.RetrieveAPIView):
         if event.status not in [Event.Status.IN_PROGRESS, Event.Status.COMPLETED]:
             raise PermissionDenied("Meetings for this event have not been generated yet or the event is already over.")
 
-        # Find the specific meeting participant record for this user and event
-        try:
-            participant = MeetingParticipant.objects.select_related('meeting').get(
-                user=user,
-                meeting__event=event
-            )
-            return participant.meeting
-        except MeetingParticipant.DoesNotExist:
+        # Find the meeting this user was assigned to for this event
+        meetings = Meeting.objects.filter(event=event, participants__user=user)
+        if self.wants('participants', 'participant_count'):
+            meetings = meetings.prefetch_related(Prefetch(
+                'participants',
+                queryset=MeetingParticipant.objects.select_related('user')
+            ))
+
+        meeting = meetings.first()
+        if meeting is None:
             raise NotFound("You are not assigned to any meeting for this event. (You may not have been in the waiting room).")
+        return meeting
@@ -0,0 +1,111 @@
+"""
+Bulk GDPR anonymization of inactive users.
+
+`User.anonymize` handles a single user who asks to be forgotten. Expired
+cohorts are anonymized here instead, in chunks of ANONYMIZE_CHUNK_SIZE
+users: each chunk is one UPDATE (through `bulk_update`) in its own short
+transaction, so the users table is never locked for long. Their refresh
+tokens are blacklisted and their cached copies dropped, so access tokens
+still in flight are rejected as belonging to an inactive user.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from .cache import invalidate_users
+from .models import User
+
+logger = logging.getLogger(__name__)
+
+ANONYMIZE_CHUNK_SIZE = getattr(settings, 'USER_ANONYMIZE_CHUNK_SIZE', 500)
+ANONYMIZED_FIELDS = ['email', 'user_code', 'is_anonymized', 'is_active', 'updated_at']
+
+
+def inactive_users(inactive_days, role=User.Role.STUDENT, now=None):
+    """
+    Users that have shown no activity for `inactive_days` days.
+
+    Inactive means created before the cutoff and, since then, none of:
+    - `last_login`: password logins (SimpleJWT's UPDATE_LAST_LOGIN) and
+      edX launches (refreshed at most daily, see EdxUserRegistrationSerializer)
+    - an enrollment
+    - an issued refresh token (registration, rotation); expired ones are
+      purged after a week, so this only covers the last few days
+    Staff and already anonymized users are never selected; `role=None`
+    selects every role.
+    """
+    from apps.events.models import Enrollment
+
+    cutoff = (now or timezone.now()) - timedelta(days=inactive_days)
+    users = User.objects.filter(
+        Q(last_login__isnull=True) | Q(last_login__lt=cutoff),
+        is_anonymized=False,
+        is_staff=False,
+        is_superuser=False,
+        created_at__lt=cutoff,
+    ).exclude(
+        Exists(Enrollment.objects.filter(user=OuterRef('pk'), enrolled_at__gte=cutoff))
+    ).exclude(
+        Exists(OutstandingToken.objects.filter(user=OuterRef('pk'), created_at__gte=cutoff))
+    )
+    if role:
+        users = users.filter(role=role)
+    return users
+
+
+def revoke_tokens(user_ids, now=None):
+    """Blacklist the unexpired refresh tokens of `user_ids`; returns how many."""
+    now = now or timezone.now()
+    token_ids = list(
+        OutstandingToken.objects
+        .filter(user_id__in=user_ids, expires_at__gt=now, blacklistedtoken__isnull=True)
+        .values_list('pk', flat=True)
+    )
+    BlacklistedToken.objects.bulk_create(
+        [BlacklistedToken(token_id=token_id) for token_id in token_ids],
+        ignore_conflicts=True
+    )
+    return len(token_ids)
+
+
+def anonymize_chunk(user_ids, now=None):
+    """Anonymize the given users with one UPDATE; returns how many."""
+    now = now or timezone.now()
+    users = [
+        # Same values as User.anonymize
+        User(
+            id=user_id,
+            email=None,
+            user_code=f'anonymous_{user_id}',
+            is_anonymized=True,
+            is_active=False,
+            updated_at=now,
+        )
+        for user_id in user_ids
+    ]
+    with transaction.atomic():
+        User.objects.bulk_update(users, ANONYMIZED_FIELDS, batch_size=len(users) or None)
+        revoke_tokens(user_ids, now)
+
+    # bulk_update skips the post_save signal that drops the cached user
+    invalidate_users(user_ids)
+    return len(users)
+
+
+def anonymize_users(queryset, chunk_size=ANONYMIZE_CHUNK_SIZE, now=None):
+    """
+    Anonymize every not yet anonymized user in `queryset`, `chunk_size`
+    users per transaction. Returns the number of users anonymized.
+    """
+    now = now or timezone.now()
+    anonymized = 0
+    queryset = queryset.filter(is_anonymized=False).order_by('pk')
+    while user_ids := list(queryset.values_list('pk', flat=True)[:chunk_size]):
+        anonymized += anonymize_chunk(user_ids, now)
+        logger.info(f'Anonymized {anonymized} users so far')
+    return anonymized
@@ -0,0 +1,58 @@
+"""
+Short-lived cache of authenticated users.
+
+Every API request and WebSocket connect resolves the user id in its JWT
+to a `User`. Instead of a primary-key SELECT per request, the user's
+fields (everything but the password hash) are cached for
+AUTH_USER_CACHE_TIMEOUT seconds and rebuilt into a `User` instance with
+the password deferred: reading it, e.g. to change it, loads it on demand,
+and saving the instance only writes the loaded fields.
+
+Entries are dropped by the `User` post_save/post_delete signals (profile
+updates, role changes, deactivation, anonymization). Code that changes
+users with `QuerySet.update()` must call `invalidate_users` itself. With
+the per-process memory cache other processes may serve the previous data
+until the timeout, so keep it short or set CACHE_URL.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import User
+
+USER_CACHE_TIMEOUT = getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 60)
+# Never cached; loaded from the database when accessed
+DEFERRED_FIELDS = ('password',)
+
+
+def user_cache_key(user_id):
+    return f'auth_user:{user_id}'
+
+
+def _cached_fields():
+    return [field.attname for field in User._meta.concrete_fields if field.attname not in DEFERRED_FIELDS]
+
+
+def get_cached_user(user_id):
+    """
+    Return the `User` with primary key `user_id`, from the cache when
+    possible, or None if there is no such user.
+    """
+    key = user_cache_key(user_id)
+    values = cache.get(key)
+
+    if values is None:
+        fields = _cached_fields()
+        values = User.objects.filter(pk=user_id).values(*fields).first()
+        if values is None:
+            return None
+        cache.set(key, values, USER_CACHE_TIMEOUT)
+
+    return User.from_db(User.objects.db, list(values), list(values.values()))
+
+
+def invalidate_user(user_id):
+    cache.delete(user_cache_key(user_id))
+
+
+def invalidate_users(user_ids):
+    cache.delete_many([user_cache_key(user_id) for user_id in user_ids])
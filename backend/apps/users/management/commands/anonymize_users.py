@@ -0,0 +1,50 @@
+"""
+Anonymize users that have been inactive for a number of days, in chunks.
+
+Usage:
+    python manage.py anonymize_users --inactive-days 730 [--role student|teacher|all] [--chunk-size N] [--dry-run]
+"""
+from django.core.management.base import BaseCommand
+
+from apps.users.anonymization import ANONYMIZE_CHUNK_SIZE, anonymize_users, inactive_users
+from apps.users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Anonymize users without any activity for the given number of days.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--inactive-days',
+            type=int,
+            required=True,
+            help='Anonymize users inactive for at least this many days'
+        )
+        parser.add_argument(
+            '--role',
+            choices=[*User.Role.values, 'all'],
+            default=User.Role.STUDENT,
+            help='Only anonymize users with this role (default: student)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=ANONYMIZE_CHUNK_SIZE,
+            help=f'Users anonymized per transaction (default: {ANONYMIZE_CHUNK_SIZE})'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many users would be anonymized'
+        )
+
+    def handle(self, *args, **options):
+        role = None if options['role'] == 'all' else options['role']
+        users = inactive_users(options['inactive_days'], role=role)
+
+        if options['dry_run']:
+            self.stdout.write(f'{users.count()} users would be anonymized.')
+            return
+
+        anonymized = anonymize_users(users, chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Anonymized {anonymized} users.'))
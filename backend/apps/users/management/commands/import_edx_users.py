@@ -0,0 +1,38 @@
+"""
+Create or update edX learners from a course export CSV.
+
+The file needs a header row with `edx_user_id` and `email` columns and
+may have a `timezone` column.
+
+Usage:
+    python manage.py import_edx_users learners.csv [--batch-size N]
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.users.provisioning import IMPORT_BATCH_SIZE, import_edx_users
+
+
+class Command(BaseCommand):
+    help = 'Import edX learners from a CSV file (edx_user_id, email, timezone).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file to import')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=IMPORT_BATCH_SIZE,
+            help=f'Rows upserted per statement (default: {IMPORT_BATCH_SIZE})'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], newline='', encoding='utf-8-sig') as stream:
+                result = import_edx_users(stream, batch_size=options['batch_size'])
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        for error in result.errors:
+            self.stderr.write(f"Line {error['line']}: {error['error']}")
+        self.stdout.write(self.style.SUCCESS(
+            f'Inserted {result.inserted}, updated {result.updated}, rejected {result.rejected} users.'
+        ))
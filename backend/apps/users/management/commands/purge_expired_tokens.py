@@ -0,0 +1,46 @@
+"""
+Delete expired JWT tokens from the SimpleJWT blacklist tables in chunks.
+
+Usage:
+    python manage.py purge_expired_tokens [--chunk-size N] [--dry-run]
+"""
+from django.core.management.base import BaseCommand
+
+from apps.users.tokens import (
+    PURGE_CHUNK_SIZE,
+    purge_expired_tokens,
+    record_token_table_stats,
+    token_table_stats,
+)
+
+
+class Command(BaseCommand):
+    help = 'Delete expired outstanding and blacklisted JWT tokens in chunks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=PURGE_CHUNK_SIZE,
+            help=f'Rows deleted per transaction (default: {PURGE_CHUNK_SIZE})'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report the table sizes'
+        )
+
+    def handle(self, *args, **options):
+        stats = token_table_stats()
+        self.stdout.write(
+            f"Outstanding tokens: {stats['outstanding']} ({stats['outstanding_expired']} expired); "
+            f"blacklisted tokens: {stats['blacklisted']} ({stats['blacklisted_expired']} expired)."
+        )
+        if options['dry_run']:
+            return
+
+        outstanding, blacklisted = purge_expired_tokens(chunk_size=options['chunk_size'])
+        record_token_table_stats(token_table_stats())
+        self.stdout.write(self.style.SUCCESS(
+            f'Purged {outstanding} outstanding and {blacklisted} blacklisted expired tokens.'
+        ))
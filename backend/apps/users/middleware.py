@@ -0,0 +1,81 @@
+"""
+JWT authentication for WebSocket connections.
+
+Browsers cannot set an Authorization header on a WebSocket, so the access
+token is taken from the `token` query parameter or from the subprotocol
+list (`new WebSocket(url, ['bearer', token])`). The token is verified
+locally (signature, expiry, type) and its user comes from the user cache,
+so a connect normally touches neither the sessions nor the users table.
+
+Connections without a token fall back to Django session authentication.
+"""
+import logging
+from urllib.parse import parse_qs
+
+from channels.auth import AuthMiddlewareStack
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from django.contrib.auth.models import AnonymousUser
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+
+from .authentication import CachedJWTAuthentication
+
+logger = logging.getLogger(__name__)
+
+TOKEN_QUERY_PARAM = 'token'
+TOKEN_SUBPROTOCOL = 'bearer'
+
+
+def get_scope_token(scope):
+    """
+    Return (token, subprotocol) from the connection scope.
+
+    `subprotocol` is the subprotocol the server must accept when the token
+    came in the subprotocol list, else None. The token is None when absent.
+    """
+    subprotocols = scope.get('subprotocols') or []
+    if TOKEN_SUBPROTOCOL in subprotocols:
+        index = subprotocols.index(TOKEN_SUBPROTOCOL)
+        if index + 1 < len(subprotocols):
+            return subprotocols[index + 1], TOKEN_SUBPROTOCOL
+
+    query = parse_qs(scope.get('query_string', b'').decode())
+    tokens = query.get(TOKEN_QUERY_PARAM)
+    return (tokens[0], None) if tokens else (None, None)
+
+
+@database_sync_to_async
+def get_token_user(raw_token):
+    """Return the user of a valid access token, or AnonymousUser."""
+    authentication = CachedJWTAuthentication()
+    try:
+        return authentication.get_user(authentication.get_validated_token(raw_token))
+    except (InvalidToken, AuthenticationFailed) as e:
+        logger.warning(f'Rejected WebSocket token ({e.__class__.__name__})')
+        return AnonymousUser()
+
+
+class JWTAuthMiddleware(BaseMiddleware):
+    """
+    Populate scope["user"] from a JWT access token, or from the session
+    when the connection carries no token.
+    """
+
+    def __init__(self, inner):
+        super().__init__(inner)
+        self.session_auth = AuthMiddlewareStack(inner)
+
+    async def __call__(self, scope, receive, send):
+        token, subprotocol = get_scope_token(scope)
+        if token is None:
+            return await self.session_auth(scope, receive, send)
+
+        scope = dict(scope)
+        scope['user'] = await get_token_user(token)
+        # The consumer must echo the subprotocol or browsers drop the connection
+        scope['auth_subprotocol'] = subprotocol
+        return await self.inner(scope, receive, send)
+
+
+def JWTAuthMiddlewareStack(inner):
+    return JWTAuthMiddleware(inner)
@@ -1,10 +1,11 @@
 import uuid
-import pytz
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.core.exceptions import ValidationError
 from django.db import models
 from django.utils.timezone import now as timezone_now
 
+from apps.core.timezones import is_valid_timezone
+
 
 class UserManager(BaseUserManager):
     """Custom user manager for User model."""
@@ -79,13 +80,10 @@ class User(AbstractBaseUser, PermissionsMixin):
         super().clean()
 
         # Validate timezone
-        if self.timezone:
-            try:
-                pytz.timezone(self.timezone)
-            except pytz.UnknownTimeZoneError:
-                raise ValidationError({
-                    'timezone': f'Invalid timezone: "{self.timezone}". Must be a valid pytz timezone (e.g., "America/Mexico_City", "UTC").'
-                })
+        if self.timezone and not is_valid_timezone(self.timezone):
+            raise ValidationError({
+                'timezone': f'Invalid timezone: "{self.timezone}". Must be a valid pytz timezone (e.g., "America/Mexico_City", "UTC").'
+            })
 
     def save(self, *args, **kwargs):
         """Override save to validate custom fields."""
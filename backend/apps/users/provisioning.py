@@ -0,0 +1,138 @@
+"""
+Bulk provisioning of edX learners from a course export.
+
+The CSV (columns `edx_user_id`, `email` and optionally `timezone`) is read
+as a stream and processed in batches. Each batch costs two lookups (which
+user codes and emails already exist) and one INSERT ... ON CONFLICT
+(user_code) DO UPDATE, instead of one registration request per learner.
+Rows with an empty id, an invalid email or an unknown timezone, or whose
+email belongs to another user, are rejected and reported.
+"""
+import csv
+import hashlib
+from dataclasses import dataclass, field
+from itertools import islice
+
+import pytz
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+
+from .cache import invalidate_users
+from .models import User
+
+IMPORT_BATCH_SIZE = 2000
+# Number of rejected rows echoed back in the result
+MAX_REPORTED_ERRORS = 50
+KNOWN_TIMEZONES = frozenset(pytz.all_timezones)
+
+
+@dataclass
+class ImportResult:
+    """Outcome of an import run."""
+
+    inserted: int = 0
+    updated: int = 0
+    rejected: int = 0
+    errors: list = field(default_factory=list)
+
+    def reject(self, line, reason):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'error': reason})
+
+    def summary(self):
+        return {
+            'inserted': self.inserted,
+            'updated': self.updated,
+            'rejected': self.rejected,
+            'errors': self.errors,
+        }
+
+
+def hash_edx_user_id(edx_user_id):
+    """The user_code of an edX user (see EdxUserRegistrationSerializer)."""
+    return hashlib.sha1(edx_user_id.encode()).hexdigest()
+
+
+def _parse_rows(rows, result):
+    """
+    Validate (line, row) pairs; return {user_code: (line, email, timezone)}.
+
+    A learner listed twice in the batch keeps its last row.
+    """
+    learners = {}
+    for line, row in rows:
+        edx_user_id = (row.get('edx_user_id') or '').strip()
+        email = User.objects.normalize_email((row.get('email') or '').strip())
+        timezone = (row.get('timezone') or '').strip() or 'UTC'
+
+        if not edx_user_id:
+            result.reject(line, 'edx_user_id is required.')
+            continue
+        try:
+            validate_email(email)
+        except ValidationError:
+            result.reject(line, f'Invalid email: "{email}".')
+            continue
+        if timezone not in KNOWN_TIMEZONES:
+            result.reject(line, f'Invalid timezone: "{timezone}".')
+            continue
+
+        learners[hash_edx_user_id(edx_user_id)] = (line, email, timezone)
+    return learners
+
+
+def import_batch(rows, result):
+    """Upsert one batch of (line, row) pairs, updating `result`."""
+    learners = _parse_rows(rows, result)
+    if not learners:
+        return
+
+    existing = dict(
+        User.objects.filter(user_code__in=learners).values_list('user_code', 'id')
+    )
+    email_owners = dict(
+        User.objects.filter(email__in=[email for _, email, _ in learners.values()])
+        .values_list('email', 'user_code')
+    )
+
+    users = []
+    for user_code, (line, email, timezone) in learners.items():
+        owner = email_owners.setdefault(email, user_code)
+        if owner != user_code:
+            result.reject(line, f'Email "{email}" belongs to another user.')
+            existing.pop(user_code, None)
+            continue
+        users.append(User(user_code=user_code, email=email, timezone=timezone, role=User.Role.STUDENT))
+
+    with transaction.atomic():
+        User.objects.bulk_create(
+            users,
+            update_conflicts=True,
+            unique_fields=['user_code'],
+            update_fields=['email', 'timezone', 'updated_at'],
+        )
+
+    result.updated += len(existing)
+    result.inserted += len(users) - len(existing)
+    invalidate_users(existing.values())
+
+
+def import_edx_users(stream, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Import learners from a text stream with a CSV header row.
+
+    Returns an ImportResult.
+    """
+    result = ImportResult()
+    reader = csv.DictReader(stream)
+    missing = {'edx_user_id', 'email'} - set(reader.fieldnames or ())
+    if missing:
+        raise ValueError(f"Missing CSV columns: {', '.join(sorted(missing))}.")
+
+    rows = ((reader.line_num, row) for row in reader)
+    while batch := list(islice(rows, batch_size)):
+        import_batch(batch, result)
+
+    return result
@@ -1,8 +1,20 @@
 import hashlib
+import secrets
+from datetime import timedelta
 from rest_framework import serializers
 from django.contrib.auth.password_validation import validate_password
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from apps.core.timezones import is_valid_timezone
+from .cache import invalidate_user
 from .models import User
 
+# Hex digits of the email hash in generated user codes (80 bits)
+USER_CODE_HASH_LENGTH = 20
+USER_CODE_ATTEMPTS = 3
+# edX launches record `last_login` (activity, for anonymization) at most this often
+EDX_LAST_LOGIN_INTERVAL = timedelta(days=1)
+
 
 class UserSerializer(serializers.ModelSerializer):
     """Serializer for User model - read operations."""
@@ -50,31 +62,45 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         return attrs
 
     def create(self, validated_data):
-        """Create user with auto-generated user_code."""
+        """
+        Create user with auto-generated user_code.
+
+        The code is derived from the (unique) email with enough hash bits
+        that collisions are practically impossible, so registration is a
+        single INSERT; on the off chance of a collision it is retried with
+        a random suffix instead of probing for a free code first.
+        """
         validated_data.pop('password_confirm')
         password = validated_data.pop('password')
 
-        # Generate unique user_code based on email
         email = validated_data['email']
-        user_code = f"user_{hashlib.sha1(email.encode()).hexdigest()[:12]}"
-
-        # Ensure uniqueness
-        counter = 1
-        original_code = user_code
-        while User.objects.filter(user_code=user_code).exists():
-            user_code = f"{original_code}_{counter}"
-            counter += 1
-
-        user = User.objects.create_user(
-            user_code=user_code,
-            password=password,
-            **validated_data
-        )
-        return user
+        user_code = f"user_{hashlib.sha256(email.encode()).hexdigest()[:USER_CODE_HASH_LENGTH]}"
+
+        for attempt in range(USER_CODE_ATTEMPTS):
+            try:
+                with transaction.atomic():
+                    return User.objects.create_user(
+                        user_code=user_code,
+                        password=password,
+                        **validated_data
+                    )
+            except IntegrityError:
+                # A parallel sign-up with the same email won the race
+                if User.objects.filter(email=User.objects.normalize_email(email)).exists():
+                    raise serializers.ValidationError({'email': 'user with this email already exists.'})
+                user_code = f"user_{hashlib.sha256(email.encode()).hexdigest()[:USER_CODE_HASH_LENGTH]}_{secrets.token_hex(4)}"
+
+        raise serializers.ValidationError('Could not generate a unique user code, please try again.')
 
 
 class EdxUserRegistrationSerializer(serializers.Serializer):
-    """Serializer for edX user registration (uses edX USER_ID)."""
+    """
+    Serializer for edX user registration (uses edX USER_ID).
+
+    Called on every LMS launch, so returning users cost one indexed read;
+    the row is only written when the email or timezone actually changed,
+    or to refresh `last_login` once per EDX_LAST_LOGIN_INTERVAL.
+    """
 
     edx_user_id = serializers.CharField(
         required=True,
@@ -86,6 +112,11 @@ class EdxUserRegistrationSerializer(serializers.Serializer):
         default='UTC',
         help_text="User's timezone (e.g., 'America/Mexico_City')"
     )
+    access_only = serializers.BooleanField(
+        required=False,
+        default=False,
+        help_text="Return only an access token (no refresh token is issued or stored)"
+    )
 
     def validate_edx_user_id(self, value):
         """Validate and hash the edX user ID."""
@@ -96,25 +127,51 @@ class EdxUserRegistrationSerializer(serializers.Serializer):
         hashed_id = hashlib.sha1(value.encode()).hexdigest()
         return hashed_id
 
+    def validate_timezone(self, value):
+        """Validate the timezone here; the fast path below skips User.clean()."""
+        if not is_valid_timezone(value):
+            raise serializers.ValidationError(f'Invalid timezone: "{value}".')
+        return value
+
     def create(self, validated_data):
-        """Create user with edX user_code (hashed)."""
-        user_code = validated_data.pop('edx_user_id')
-
-        # Check if user already exists
-        user, created = User.objects.get_or_create(
-            user_code=user_code,
-            defaults={
-                'email': validated_data['email'],
-                'timezone': validated_data.get('timezone', 'UTC'),
-                'role': User.Role.STUDENT
-            }
-        )
-
-        # If user exists but email/timezone changed, update them
-        if not created:
-            user.email = validated_data['email']
-            user.timezone = validated_data.get('timezone', user.timezone)
-            user.save()
+        """Create the edX user, or update it only if email/timezone changed."""
+        user_code = validated_data['edx_user_id']
+        now = timezone.now()
+        changes = {
+            'email': User.objects.normalize_email(validated_data['email']),
+            'timezone': validated_data['timezone'],
+        }
+
+        user = User.objects.filter(user_code=user_code).first()
+        if user is None:
+            try:
+                with transaction.atomic():
+                    return User.objects.create_user(
+                        user_code=user_code, role=User.Role.STUDENT, last_login=now, **changes
+                    )
+            except IntegrityError:
+                # Concurrent first launch of the same user, or an email in use
+                user = User.objects.filter(user_code=user_code).first()
+                if user is None:
+                    raise serializers.ValidationError({'email': 'This email is already in use.'})
+
+        changes = {field: value for field, value in changes.items() if getattr(user, field) != value}
+        if changes:
+            changes['updated_at'] = now
+        # A launch counts as a login, or the user would look inactive to anonymize_users
+        if changes or user.last_login is None or user.last_login <= now - EDX_LAST_LOGIN_INTERVAL:
+            changes['last_login'] = now
+
+        if changes:
+            try:
+                with transaction.atomic():
+                    User.objects.filter(pk=user.pk).update(**changes)
+            except IntegrityError:
+                raise serializers.ValidationError({'email': 'This email is already in use.'})
+            # update() skips the post_save signal that drops the cached user
+            invalidate_user(user.pk)
+            for field, value in changes.items():
+                setattr(user, field, value)
 
         return user
 
@@ -0,0 +1,15 @@
+"""
+Signals that keep the authenticated user cache (see cache.py) current.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import invalidate_user
+from .models import User
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    """Profile updates, role changes, deactivation and anonymization all save the user."""
+    invalidate_user(instance.pk)
@@ -0,0 +1,49 @@
+"""
+Celery tasks for user accounts and tokens.
+"""
+import logging
+from celery import shared_task
+from django.conf import settings
+
+from .anonymization import anonymize_users, inactive_users
+
+from .tokens import purge_expired_tokens, record_token_table_stats, token_table_stats
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def purge_expired_jwt_tokens():
+    """
+    Celery task to delete expired JWT outstanding/blacklisted tokens and
+    record the size of the blacklist tables.
+
+    This task should be run periodically (e.g., once per day).
+    """
+    outstanding, blacklisted = purge_expired_tokens()
+    stats = token_table_stats()
+    record_token_table_stats(stats)
+
+    logger.info(
+        f'Purged {outstanding} outstanding and {blacklisted} blacklisted expired tokens; '
+        f"{stats['outstanding']} outstanding and {stats['blacklisted']} blacklisted tokens remain"
+    )
+    return f'Purged {outstanding} expired tokens'
+
+
+@shared_task
+def anonymize_inactive_users(inactive_days=None):
+    """
+    Celery task to anonymize students inactive for USER_ANONYMIZE_INACTIVE_DAYS
+    (disabled while the setting is empty).
+
+    This task should be run periodically (e.g., once per week).
+    """
+    inactive_days = inactive_days or settings.USER_ANONYMIZE_INACTIVE_DAYS
+    if not inactive_days:
+        return 'Anonymization of inactive users is disabled'
+
+    anonymized = anonymize_users(inactive_users(inactive_days))
+
+    logger.info(f'Anonymized {anonymized} users inactive for {inactive_days} days')
+    return f'Anonymized {anonymized} users'
@@ -1,8 +1,19 @@
+from datetime import timedelta
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
 from django.test import TestCase
 from django.urls import reverse
+from django.utils import timezone as django_timezone
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+from apps.core.testing import QueryCountTestMixin
+from .anonymization import anonymize_users, inactive_users
+from .cache import get_cached_user
+from .middleware import JWTAuthMiddlewareStack
 from .models import User
+from .tokens import get_token_table_stats, purge_expired_tokens
 import hashlib
 
 
@@ -95,6 +106,21 @@ class AuthenticationAPITests(APITestCase):
         self.assertIn('user', response.data)
         self.assertEqual(response.data['user']['email'], 'newuser@example.com')
 
+    def test_user_registration_code_collision(self):
+        """Test that a taken user_code is retried with a random suffix."""
+        email = 'collision@example.com'
+        taken_code = f"user_{hashlib.sha256(email.encode()).hexdigest()[:20]}"
+        User.objects.create_user(user_code=taken_code, email='other@example.com')
+
+        response = self.client.post(reverse('users:register'), {
+            'email': email,
+            'password': 'newpass123!',
+            'password_confirm': 'newpass123!'
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(response.data['user']['user_code'].startswith(f'{taken_code}_'))
+
     def test_edx_user_registration(self):
         """Test edX user registration endpoint."""
         url = reverse('users:register_edx')
@@ -248,3 +274,446 @@ class AuthenticationAPITests(APITestCase):
         self.assertTrue(self.student.is_anonymized)
         self.assertIsNone(self.student.email)
         self.assertIn('anonymous_', self.student.user_code)
+
+
+class CachedJWTAuthenticationTests(APITestCase):
+    """Tests for JWT authentication through the user cache."""
+
+    def setUp(self):
+        """Create a user and authenticate with a real access token."""
+        cache.clear()
+        self.student = User.objects.create_user(
+            user_code='student_001',
+            email='student@example.com',
+            password='studentpass123',
+            role=User.Role.STUDENT
+        )
+        token = AccessToken.for_user(self.student)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_cached_user_needs_no_query(self):
+        """Test that repeated requests do not load the user."""
+        url = reverse('users:profile')
+        self.client.get(url)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['user_code'], 'student_001')
+
+    def test_profile_update_invalidates_cache(self):
+        """Test that saving the user drops the cached copy and keeps the password."""
+        self.client.get(reverse('users:profile'))
+
+        self.client.put(reverse('users:profile_update'), {
+            'email': 'new@example.com',
+            'timezone': 'Asia/Tokyo'
+        }, format='json')
+        response = self.client.get(reverse('users:profile'))
+
+        self.assertEqual(response.data['email'], 'new@example.com')
+        self.student.refresh_from_db()
+        self.assertTrue(self.student.check_password('studentpass123'))
+
+    def test_deactivated_user_rejected(self):
+        """Test that deactivating a user takes effect despite the cache."""
+        self.client.get(reverse('users:profile'))
+
+        self.student.is_active = False
+        self.student.save()
+        response = self.client.get(reverse('users:profile'))
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_change_password_with_cached_user(self):
+        """Test that the deferred password is loaded when needed."""
+        self.client.get(reverse('users:profile'))
+
+        response = self.client.post(reverse('users:change_password'), {
+            'old_password': 'studentpass123',
+            'new_password': 'newsecurepass123!',
+            'new_password_confirm': 'newsecurepass123!'
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.student.refresh_from_db()
+        self.assertTrue(self.student.check_password('newsecurepass123!'))
+
+
+class JWTWebSocketMiddlewareTests(TestCase):
+    """Tests for the WebSocket JWT authentication middleware."""
+
+    def setUp(self):
+        """Create a user, a token and a middleware around a scope-capturing app."""
+        cache.clear()
+        self.student = User.objects.create_user(
+            user_code='student_001',
+            email='student@example.com',
+            password='studentpass123'
+        )
+        self.token = str(AccessToken.for_user(self.student))
+        self.scopes = []
+
+        async def app(scope, receive, send):
+            self.scopes.append(scope)
+
+        self.middleware = JWTAuthMiddlewareStack(app)
+
+    def _connect(self, **scope):
+        scope = {'type': 'websocket', 'headers': [], 'query_string': b'', **scope}
+        async_to_sync(self.middleware)(scope, None, None)
+        return self.scopes[-1]
+
+    def test_token_in_query_string(self):
+        """Test authenticating with ?token=."""
+        scope = self._connect(query_string=f'token={self.token}'.encode())
+
+        self.assertEqual(scope['user'].pk, self.student.pk)
+        self.assertIsNone(scope['auth_subprotocol'])
+
+    def test_token_in_subprotocol(self):
+        """Test authenticating with the bearer subprotocol."""
+        scope = self._connect(subprotocols=['bearer', self.token])
+
+        self.assertEqual(scope['user'].pk, self.student.pk)
+        self.assertEqual(scope['auth_subprotocol'], 'bearer')
+
+    def test_cached_user_needs_no_query(self):
+        """Test that connects with a cached user do not query the database."""
+        self._connect(query_string=f'token={self.token}'.encode())
+
+        with self.assertNumQueries(0):
+            scope = self._connect(query_string=f'token={self.token}'.encode())
+
+        self.assertTrue(scope['user'].is_authenticated)
+
+    def test_invalid_token(self):
+        """Test that an invalid token leaves the connection anonymous."""
+        scope = self._connect(query_string=b'token=invalid')
+
+        self.assertFalse(scope['user'].is_authenticated)
+
+    def test_without_token_falls_back_to_session(self):
+        """Test that connections without a token use session authentication."""
+        scope = self._connect()
+
+        self.assertIn('session', scope)
+        self.assertFalse(scope['user'].is_authenticated)
+
+
+class EdxLaunchTests(APITestCase):
+    """Tests for the edX registration/login fast path."""
+
+    def setUp(self):
+        """Create a returning edX user."""
+        cache.clear()
+        self.url = reverse('users:register_edx')
+        self.data = {
+            'edx_user_id': 'edx_user_1',
+            'email': 'edx@example.com',
+            'timezone': 'Europe/Madrid'
+        }
+        self.user = User.objects.create_user(
+            user_code=hashlib.sha1(b'edx_user_1').hexdigest(),
+            email='edx@example.com',
+            timezone='Europe/Madrid',
+            last_login=django_timezone.now()
+        )
+
+    def test_unchanged_launch_is_a_single_read(self):
+        """Test that a returning user launching again the same day costs one query."""
+        with self.assertNumQueries(1):
+            response = self.client.post(self.url, {**self.data, 'access_only': True}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['user']['id'], str(self.user.id))
+        self.assertEqual(set(response.data['tokens']), {'access'})
+        self.assertFalse(OutstandingToken.objects.exists())
+
+    def test_launch_records_last_login_daily(self):
+        """Test that a launch counts as activity for the inactive users cohort."""
+        long_ago = django_timezone.now() - timedelta(days=400)
+        User.objects.filter(pk=self.user.pk).update(created_at=long_ago, last_login=long_ago)
+        self.assertTrue(inactive_users(365).filter(pk=self.user.pk).exists())
+
+        response = self.client.post(self.url, {**self.data, 'access_only': True}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(inactive_users(365).filter(pk=self.user.pk).exists())
+
+    def test_changed_launch_updates_user(self):
+        """Test that changed fields are written and the user cache dropped."""
+        get_cached_user(self.user.pk)
+
+        response = self.client.post(self.url, {**self.data, 'timezone': 'Asia/Tokyo'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('refresh', response.data['tokens'])
+        self.assertEqual(response.data['user']['timezone'], 'Asia/Tokyo')
+        self.assertEqual(get_cached_user(self.user.pk).timezone, 'Asia/Tokyo')
+
+    def test_invalid_timezone_rejected(self):
+        """Test that unknown timezones are a validation error."""
+        response = self.client.post(self.url, {**self.data, 'timezone': 'Mars/Olympus'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('timezone', response.data)
+
+    def test_email_in_use_rejected(self):
+        """Test that a new edX user cannot take another user's email."""
+        response = self.client.post(self.url, {**self.data, 'edx_user_id': 'edx_user_2'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('email', response.data)
+
+
+class ExpiredTokenPurgeTests(TestCase):
+    """Tests for purging expired JWT tokens."""
+
+    def setUp(self):
+        """Issue refresh tokens, expire some of them and blacklist one."""
+        from datetime import timedelta
+        from django.utils import timezone
+
+        user = User.objects.create_user(user_code='student_001', email='student@example.com')
+        tokens = [RefreshToken.for_user(user) for _ in range(3)]
+        tokens[0].blacklist()
+        tokens[2].blacklist()
+        OutstandingToken.objects.filter(
+            jti__in=[tokens[0]['jti'], tokens[1]['jti']]
+        ).update(expires_at=timezone.now() - timedelta(days=1))
+
+    def test_purge_deletes_only_expired_tokens(self):
+        """Test that expired tokens and their blacklist entries are deleted in chunks."""
+        outstanding, blacklisted = purge_expired_tokens(chunk_size=1)
+
+        self.assertEqual((outstanding, blacklisted), (2, 1))
+        self.assertEqual(OutstandingToken.objects.count(), 1)
+        self.assertEqual(BlacklistedToken.objects.count(), 1)
+
+    def test_purge_command_dry_run(self):
+        """Test that --dry-run reports sizes without deleting."""
+        from io import StringIO
+        from django.core.management import call_command
+
+        out = StringIO()
+        call_command('purge_expired_tokens', '--dry-run', stdout=out)
+
+        self.assertIn('Outstanding tokens: 3 (2 expired)', out.getvalue())
+        self.assertEqual(OutstandingToken.objects.count(), 3)
+
+    def test_purge_task_records_stats(self):
+        """Test that the periodic task stores the table sizes."""
+        from .tasks import purge_expired_jwt_tokens
+
+        purge_expired_jwt_tokens()
+
+        stats = get_token_table_stats()
+        self.assertEqual(stats['outstanding'], 1)
+        self.assertEqual(stats['outstanding_expired'], 0)
+
+    def test_token_table_stats_on_metrics(self):
+        """Test that the recorded table sizes are exposed as gauges on /metrics."""
+        from .tasks import purge_expired_jwt_tokens
+
+        purge_expired_jwt_tokens()
+
+        response = self.client.get(reverse('metrics'))
+
+        content = response.content.decode()
+        self.assertIn('jwt_token_table_rows{table="outstanding"} 1\n', content)
+        self.assertIn('jwt_token_table_expired_rows{table="blacklisted"} 0\n', content)
+        self.assertIn('jwt_token_table_measured_timestamp_seconds ', content)
+
+
+class EdxUserImportTests(APITestCase):
+    """Tests for bulk provisioning of edX learners."""
+
+    def setUp(self):
+        """Create an admin and an existing edX learner."""
+        self.admin = User.objects.create_superuser(
+            user_code='admin_001',
+            email='admin@example.com',
+            password='adminpass123'
+        )
+        self.existing = User.objects.create_user(
+            user_code=hashlib.sha1(b'edx_1').hexdigest(),
+            email='one@example.com'
+        )
+        self.csv = (
+            'edx_user_id,email,timezone\n'
+            'edx_1,one@example.com,Europe/Madrid\n'
+            'edx_2,two@example.com,\n'
+            'edx_3,not-an-email,UTC\n'
+            'edx_4,four@example.com,Mars/Olympus\n'
+            'edx_5,admin@example.com,UTC\n'
+            ',six@example.com,UTC\n'
+        )
+
+    def test_import_counts(self):
+        """Test inserted, updated and rejected counts."""
+        from io import StringIO
+        from .provisioning import import_edx_users
+
+        result = import_edx_users(StringIO(self.csv), batch_size=2)
+
+        self.assertEqual((result.inserted, result.updated, result.rejected), (1, 1, 4))
+        self.assertEqual(sorted(error['line'] for error in result.errors), [4, 5, 6, 7])
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.timezone, 'Europe/Madrid')
+        new_user = User.objects.get(user_code=hashlib.sha1(b'edx_2').hexdigest())
+        self.assertEqual((new_user.email, new_user.timezone, new_user.role), ('two@example.com', 'UTC', User.Role.STUDENT))
+
+    def test_import_command(self):
+        """Test the management command."""
+        import tempfile
+        from io import StringIO
+        from django.core.management import call_command
+
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as handle:
+            handle.write(self.csv)
+
+        out = StringIO()
+        call_command('import_edx_users', handle.name, stdout=out, stderr=StringIO())
+
+        self.assertIn('Inserted 1, updated 1, rejected 4 users.', out.getvalue())
+
+    def test_import_endpoint(self):
+        """Test uploading a CSV as an administrator."""
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        self.client.force_authenticate(user=self.admin)
+        upload = SimpleUploadedFile('learners.csv', self.csv.encode(), content_type='text/csv')
+
+        response = self.client.post(reverse('users:import_edx'), {'file': upload}, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['inserted'], 1)
+        self.assertEqual(response.data['rejected'], 4)
+
+    def test_import_endpoint_requires_admin(self):
+        """Test that only administrators can import users."""
+        self.client.force_authenticate(user=self.existing)
+
+        response = self.client.post(reverse('users:import_edx'), {}, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class BulkAnonymizationTests(TestCase):
+    """Tests for anonymizing inactive users in bulk."""
+
+    def setUp(self):
+        """Create inactive and active students."""
+        from datetime import timedelta
+        from django.utils import timezone
+
+        cache.clear()
+        long_ago = timezone.now() - timedelta(days=1000)
+        self.inactive = [
+            User.objects.create_user(
+                user_code=f'old_{index}',
+                email=f'old{index}@example.com',
+                created_at=long_ago
+            )
+            for index in range(3)
+        ]
+        self.recent_login = User.objects.create_user(
+            user_code='recent_login', email='recent@example.com', created_at=long_ago
+        )
+        self.recent_login.last_login = timezone.now()
+        self.recent_login.save()
+        self.teacher = User.objects.create_user(
+            user_code='old_teacher', email='teacher@example.com',
+            role=User.Role.TEACHER, created_at=long_ago
+        )
+        # An old refresh token that has not expired yet
+        self.refresh = RefreshToken.for_user(self.inactive[0])
+        OutstandingToken.objects.update(created_at=long_ago)
+
+    def test_anonymize_inactive_students(self):
+        """Test that only inactive students are anonymized, in chunks."""
+        get_cached_user(self.inactive[0].pk)
+
+        anonymized = anonymize_users(inactive_users(730), chunk_size=2)
+
+        self.assertEqual(anonymized, 3)
+        for user in self.inactive:
+            user.refresh_from_db()
+            self.assertTrue(user.is_anonymized)
+            self.assertFalse(user.is_active)
+            self.assertIsNone(user.email)
+            self.assertEqual(user.user_code, f'anonymous_{user.id}')
+        self.assertFalse(get_cached_user(self.inactive[0].pk).is_active)
+        self.assertTrue(BlacklistedToken.objects.filter(token__jti=self.refresh['jti']).exists())
+        self.assertFalse(User.objects.filter(pk__in=[self.recent_login.pk, self.teacher.pk], is_anonymized=True).exists())
+
+    def test_anonymize_command_dry_run(self):
+        """Test that --dry-run counts without anonymizing."""
+        from io import StringIO
+        from django.core.management import call_command
+
+        out = StringIO()
+        call_command('anonymize_users', '--inactive-days', '730', '--role', 'all', '--dry-run', stdout=out)
+
+        self.assertIn('4 users would be anonymized', out.getvalue())
+        self.assertFalse(User.objects.filter(is_anonymized=True).exists())
+
+
+class UserQueryCountTests(QueryCountTestMixin, APITestCase):
+    """Query budgets of the user endpoints, independent of how much a user has."""
+
+    def setUp(self):
+        """Create a student and an admin."""
+        self.user = User.objects.create_user(
+            user_code='student_001',
+            email='student@example.com',
+            password='studentpass123'
+        )
+        self.admin = User.objects.create_superuser(
+            user_code='admin_001',
+            email='admin@example.com',
+            password='adminpass123'
+        )
+        self.rows = []
+
+    def seed_tokens(self, count):
+        """Refresh tokens issued to the student (e.g. one per device)."""
+        for _ in range(count):
+            RefreshToken.for_user(self.user)
+
+    def seed_rows(self, count):
+        offset = len(self.rows)
+        self.rows += [f'edx_{index},learner{index}@example.com,UTC' for index in range(offset, offset + count)]
+
+    def test_login(self):
+        def request():
+            return self.client.post(
+                reverse('users:login'),
+                {'user_code': 'student_001', 'password': 'studentpass123'},
+                format='json'
+            )
+
+        self.assertQueriesDoNotGrow(request, self.seed_tokens, max_queries=3)
+
+    def test_profile_with_bearer_token(self):
+        access = str(AccessToken.for_user(self.user))
+
+        def request():
+            return self.client.get(reverse('users:profile'), HTTP_AUTHORIZATION=f'Bearer {access}')
+
+        self.assertQueriesDoNotGrow(request, self.seed_tokens, max_queries=1)
+
+    def test_import_edx(self):
+        """One batch costs the same whether it holds a few learners or many."""
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        self.client.force_authenticate(user=self.admin)
+
+        def request():
+            csv = '\n'.join(['edx_user_id,email,timezone'] + self.rows).encode()
+            upload = SimpleUploadedFile('learners.csv', csv, content_type='text/csv')
+            return self.client.post(reverse('users:import_edx'), {'file': upload}, format='multipart')
+
+        self.assertQueriesDoNotGrow(request, self.seed_rows, max_queries=5)
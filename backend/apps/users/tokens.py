@@ -0,0 +1,100 @@
+"""
+Maintenance of the SimpleJWT blacklist tables.
+
+Every refresh (with rotation) and every edX launch issuing a refresh token
+inserts into `token_blacklist_outstandingtoken`, and rotation blacklists
+the previous token. Expired rows are useless (an expired token is
+rejected before the blacklist is consulted) but nothing removes them, so
+`purge_expired_tokens` deletes them in chunks, blacklist entries first.
+
+SimpleJWT's own `flushexpiredtokens` deletes every expired row in a single
+`delete()`: one transaction holding locks on the whole backlog, after the
+collector has loaded every row (and its blacklist entry) into memory to
+cascade. Chunks keep each transaction, and the memory it needs, small.
+
+The table sizes recorded after each purge are exposed on `/metrics` by
+`token_table_metrics`.
+"""
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from apps.core.metrics import Registry
+
+logger = logging.getLogger(__name__)
+
+# Rows deleted per statement
+PURGE_CHUNK_SIZE = getattr(settings, 'TOKEN_PURGE_CHUNK_SIZE', 5000)
+TOKEN_STATS_CACHE_KEY = 'token_blacklist:stats'
+
+
+def token_table_stats(now=None):
+    """Row counts of the blacklist tables, and how many of them have expired."""
+    now = now or timezone.now()
+    return {
+        'outstanding': OutstandingToken.objects.count(),
+        'outstanding_expired': OutstandingToken.objects.filter(expires_at__lte=now).count(),
+        'blacklisted': BlacklistedToken.objects.count(),
+        'blacklisted_expired': BlacklistedToken.objects.filter(token__expires_at__lte=now).count(),
+    }
+
+
+def record_token_table_stats(stats):
+    """Keep the latest counts, with the time they were taken, in the cache."""
+    cache.set(TOKEN_STATS_CACHE_KEY, {**stats, 'measured_at': timezone.now()}, None)
+
+
+def get_token_table_stats():
+    """The counts recorded by the last purge, or None."""
+    return cache.get(TOKEN_STATS_CACHE_KEY)
+
+
+def token_table_metrics():
+    """A Registry with the counts recorded by the last purge, for `/metrics`."""
+    registry = Registry()
+    stats = get_token_table_stats()
+    if stats is None:
+        return registry
+
+    rows = registry.gauge(
+        'jwt_token_table_rows', 'Rows of the SimpleJWT blacklist tables at the last purge.', ['table'])
+    expired = registry.gauge(
+        'jwt_token_table_expired_rows', 'Expired rows of the SimpleJWT blacklist tables at the last purge.',
+        ['table'])
+    for table in ('outstanding', 'blacklisted'):
+        rows.set(stats[table], table=table)
+        expired.set(stats[f'{table}_expired'], table=table)
+    registry.gauge(
+        'jwt_token_table_measured_timestamp_seconds', 'Unix time at which the table sizes were measured.'
+    ).set(stats['measured_at'].timestamp())
+    return registry
+
+
+def _delete_in_chunks(queryset, chunk_size):
+    model = queryset.model
+    deleted = 0
+    while chunk := list(queryset.values_list('pk', flat=True)[:chunk_size]):
+        with transaction.atomic():
+            deleted += model.objects.filter(pk__in=chunk).delete()[1].get(model._meta.label, 0)
+    return deleted
+
+
+def purge_expired_tokens(chunk_size=PURGE_CHUNK_SIZE, now=None):
+    """
+    Delete expired outstanding tokens and their blacklist entries,
+    `chunk_size` rows per transaction.
+
+    Returns (outstanding_deleted, blacklisted_deleted).
+    """
+    now = now or timezone.now()
+    blacklisted = _delete_in_chunks(
+        BlacklistedToken.objects.filter(token__expires_at__lte=now), chunk_size
+    )
+    outstanding = _delete_in_chunks(
+        OutstandingToken.objects.filter(expires_at__lte=now), chunk_size
+    )
+    return outstanding, blacklisted
@@ -9,6 +9,7 @@ from .views import (
     UserProfileUpdateView,
     change_password_view,
     anonymize_user_view,
+    import_edx_users_view,
 )
 
 app_name = 'users'
@@ -22,6 +23,7 @@ urlpatterns = [
     # Registration
     path('auth/register/', UserRegistrationView.as_view(), name='register'),
     path('auth/register/edx/', EdxUserRegistrationView.as_view(), name='register_edx'),
+    path('import/edx/', import_edx_users_view, name='import_edx'),
 
     # Profile
     path('profile/', UserProfileView.as_view(), name='profile'),
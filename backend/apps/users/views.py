@@ -1,11 +1,14 @@
+import io
 from rest_framework import status, generics
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from .models import User
+from .permissions import IsAdmin
+from .provisioning import import_edx_users
 from .serializers import (
     UserSerializer,
     UserRegistrationSerializer,
@@ -68,6 +71,8 @@ class EdxUserRegistrationView(generics.CreateAPIView):
     """
     Register or get a user from edX.
     Uses edX USER_ID (hashed with SHA-1) as user_code.
+    With `access_only`, only a short-lived access token is returned, which
+    skips the refresh token bookkeeping (a row in the blacklist tables).
     """
     serializer_class = EdxUserRegistrationSerializer
     permission_classes = [AllowAny]
@@ -78,15 +83,19 @@ class EdxUserRegistrationView(generics.CreateAPIView):
         user = serializer.save()
 
         # Generate tokens for the user
-        refresh = RefreshToken.for_user(user)
+        if serializer.validated_data['access_only']:
+            tokens = {'access': str(AccessToken.for_user(user))}
+        else:
+            refresh = RefreshToken.for_user(user)
+            tokens = {
+                'refresh': str(refresh),
+                'access': str(refresh.access_token),
+            }
 
         return Response({
             'message': 'User registered/retrieved successfully',
             'user': UserSerializer(user).data,
-            'tokens': {
-                'refresh': str(refresh),
-                'access': str(refresh.access_token),
-            }
+            'tokens': tokens
         }, status=status.HTTP_200_OK)
 
 
@@ -174,3 +183,22 @@ def anonymize_user_view(request):
     return Response({
         'message': 'User data anonymized successfully. You have been logged out.'
     }, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@permission_classes([IsAdmin])
+def import_edx_users_view(request):
+    """
+    Create or update edX learners from an uploaded course export CSV.
+    Upload the file as `file` (multipart); columns: edx_user_id, email, timezone.
+    """
+    upload = request.FILES.get('file')
+    if upload is None:
+        return Response({'error': 'file is required.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        result = import_edx_users(io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline=''))
+    except (UnicodeDecodeError, ValueError) as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response(result.summary(), status=status.HTTP_200_OK)
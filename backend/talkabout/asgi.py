@@ -11,7 +11,6 @@ import os
 
 from django.core.asgi import get_asgi_application
 from channels.routing import ProtocolTypeRouter, URLRouter
-from channels.auth import AuthMiddlewareStack
 from channels.security.websocket import AllowedHostsOriginValidator
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'talkabout.settings')
@@ -22,12 +21,13 @@ django_asgi_app = get_asgi_application()
 
 # Import websocket routing
 from apps.events import routing as events_routing
+from apps.users.middleware import JWTAuthMiddlewareStack
 # from apps.meetings import routing as meeting_routing (for future phases)
 
 application = ProtocolTypeRouter({
     "http": django_asgi_app,
     "websocket": AllowedHostsOriginValidator(
-        AuthMiddlewareStack(
+        JWTAuthMiddlewareStack(
             URLRouter(
                 events_routing.websocket_urlpatterns +
                 # meeting_routing.websocket_urlpatterns +  (for future phases)
@@ -24,6 +24,30 @@ app.conf.beat_schedule = {
         'task': 'apps.events.tasks.create_meetings_for_events',
         'schedule': crontab(minute='*/1'),  # Run every minute
     },
+    'refresh-activity-rollups': {
+        'task': 'apps.activities.tasks.refresh_activity_rollups',
+        'schedule': crontab(minute='*/5'),  # Run every 5 minutes
+    },
+    'materialize-event-schedules': {
+        'task': 'apps.events.tasks.materialize_event_schedules',
+        'schedule': crontab(minute=0),  # Run every hour
+    },
+    'sweep-waiting-rooms': {
+        'task': 'apps.events.tasks.sweep_waiting_rooms',
+        'schedule': crontab(minute='*/1'),  # Run every minute
+    },
+    'compact-waiting-rooms': {
+        'task': 'apps.events.tasks.compact_waiting_rooms',
+        'schedule': crontab(minute=30),  # Run every hour
+    },
+    'purge-expired-jwt-tokens': {
+        'task': 'apps.users.tasks.purge_expired_jwt_tokens',
+        'schedule': crontab(hour=3, minute=15),  # Run once a day
+    },
+    'anonymize-inactive-users': {
+        'task': 'apps.users.tasks.anonymize_inactive_users',
+        'schedule': crontab(day_of_week='sunday', hour=4, minute=0),  # Run once a week
+    },
 }
 
 @app.task(bind=True, ignore_result=True)
@@ -45,6 +45,7 @@ INSTALLED_APPS = [
     'django_filters',
 
     # Local apps
+    'apps.core',
     'apps.users',
     'apps.activities',
     'apps.events',
@@ -60,6 +61,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'apps.core.middleware.RequestMetricsMiddleware',
 ]
 
 ROOT_URLCONF = 'talkabout.urls'
@@ -152,7 +154,7 @@ CORS_ALLOW_CREDENTIALS = os.getenv('CORS_ALLOW_CREDENTIALS', 'True') == 'True'
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.users.authentication.CachedJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -191,6 +193,53 @@ CHANNEL_LAYERS = {
     },
 }
 
+# Cache Configuration
+# Shared Redis cache when CACHE_URL is set; per-process memory cache otherwise
+if os.getenv('CACHE_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('CACHE_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Authenticated users are cached this long instead of being loaded on every request
+AUTH_USER_CACHE_TIMEOUT = int(os.getenv('AUTH_USER_CACHE_TIMEOUT', 60))  # seconds
+
+# Students without activity for this many days are anonymized weekly (empty: disabled)
+USER_ANONYMIZE_INACTIVE_DAYS = int(os.getenv('USER_ANONYMIZE_INACTIVE_DAYS') or 0) or None
+
+# Calendar feeds (.ics)
+CALENDAR_FEED_CACHE_TIMEOUT = int(os.getenv('CALENDAR_FEED_CACHE_TIMEOUT', 3600))  # seconds
+CALENDAR_ACTIVITY_FEED_PAST_DAYS = 30
+CALENDAR_ACTIVITY_FEED_FUTURE_DAYS = 90
+
+# Statistics of events in their waiting room or in progress are cached this long
+EVENT_STATISTICS_CACHE_TIMEOUT = 10  # seconds
+
+# Recurring event schedules are materialized as events this many days ahead
+EVENT_SCHEDULE_HORIZON_DAYS = int(os.getenv('EVENT_SCHEDULE_HORIZON_DAYS', 14))
+
+# Waiting room participants that have not pinged for this long are marked disconnected
+WAITING_ROOM_STALE_SECONDS = int(os.getenv('WAITING_ROOM_STALE_SECONDS', 60))
+
+# `manage.py archive_events` moves finished events older than this to the archive tables
+EVENT_ARCHIVE_AFTER_DAYS = int(os.getenv('EVENT_ARCHIVE_AFTER_DAYS', 180))
+EVENT_ARCHIVE_BATCH_SIZE = 500
+
+# Request metrics: slower requests are logged with their top queries
+SLOW_REQUEST_MS = int(os.getenv('SLOW_REQUEST_MS', 1000))
+# Clients allowed to read /metrics
+METRICS_ALLOWED_IPS = [ip.strip() for ip in os.getenv('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',') if ip.strip()]
+# ASGI workers publish their waiting room socket metrics at most this often
+SOCKET_METRICS_PUBLISH_SECONDS = 15
+
 # Celery Configuration
 CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', 'redis://redis:6379/0')
 CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND', 'redis://redis:6379/0')
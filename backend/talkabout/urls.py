@@ -6,9 +6,12 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from apps.core.views import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('talkabout.api_urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
 
 # Serve media files in development